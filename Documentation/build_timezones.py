@@ -0,0 +1,270 @@
+# Compiles IANA time zones into the clock's time zone database (timezones.dat, read by Source Code/timezones.py)
+#   Run on a computer (CPython 3.9+) with the IANA time zone files (/usr/share/zoneinfo on Linux and macOS, or the
+#   tzdata package), then copy timezones.dat to the Pico with the rest of the Source Code
+#
+#   python "Documentation/build_timezones.py"                            zones of zone1970.tab (one per region)
+#   python "Documentation/build_timezones.py" America/New_York Europe/Paris   chosen zones
+#   python "Documentation/build_timezones.py" --all                      every zone
+import argparse
+import datetime
+import os
+import struct
+import zoneinfo
+
+# Seconds from the NTP epoch (01-Jan-1900) to the Unix epoch (01-Jan-1970)
+UNIX_EPOCH = 2_208_988_800
+
+# Default output, the Source Code folder next to this one
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Source Code', 'timezones.dat')
+
+
+def tzif_path(name):
+    """
+    Return the path of a zone's TZif file (the tzdata package is used when there are no system time zone files)
+    """
+    for folder in zoneinfo.TZPATH:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    import importlib.resources
+    package, _, resource = ('tzdata.zoneinfo/' + name).rpartition('/')
+    return str(importlib.resources.files(package.replace('/', '.')).joinpath(resource))
+
+
+def zone1970():
+    """
+    Return the zones of zone1970.tab, the zones tzselect offers (one per region whose clocks agree since 1970)
+    """
+    for folder in zoneinfo.TZPATH:
+        path = os.path.join(folder, 'zone1970.tab')
+        if os.path.isfile(path):
+            with open(path) as f:
+                return sorted(line.split('\t')[2].strip() for line in f if not line.startswith('#'))
+    raise FileNotFoundError('zone1970.tab not found, name the zones to compile')
+
+
+def read_tzif(name):
+    """
+    Return the transitions ([(Unix seconds, seconds ahead of UTC),...]), the offset before the first transition and
+    the POSIX TZ string for times after the last transition of a zone's TZif file (RFC 8536, version 2 or later)
+    """
+    with open(tzif_path(name), 'rb') as f:
+        data = f.read()
+    if data[:4] != b'TZif' or data[4] < ord('2'):
+        raise ValueError(f'{name}: not a TZif file of version 2 or later')
+
+    # Skip the version 1 data (32-bit times), the version 2 header and data follow
+    counts = struct.unpack('>6l', data[20:44])
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts
+    pos = 44 + timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8 + isstdcnt + isutcnt
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = struct.unpack('>6l', data[pos + 20:pos + 44])
+    pos += 44
+
+    times = struct.unpack(f'>{timecnt}q', data[pos:pos + timecnt * 8])
+    pos += timecnt * 8
+    indices = data[pos:pos + timecnt]
+    pos += timecnt
+    offsets = [struct.unpack('>lBB', data[pos + k * 6:pos + k * 6 + 6])[0] for k in range(typecnt)]
+    pos += typecnt * 6 + charcnt + leapcnt * 12 + isstdcnt + isutcnt
+
+    footer = data[pos:].strip(b'\n').decode('ascii')
+    return [(t, offsets[k]) for t, k in zip(times, indices)], offsets[0], footer
+
+
+def parse_posix(tz):
+    """
+    Return the rule of a POSIX TZ string (e.g. EST5EDT,M3.2.0,M11.1.0): (standard offset, daylight offset, start, end)
+    in seconds ahead of UTC, start and end (month, week, weekday, seconds after midnight local time) or None
+    """
+    pos = 0
+
+    def name():
+        nonlocal pos
+        if tz[pos] == '<':
+            pos = tz.index('>', pos) + 1
+        else:
+            while pos < len(tz) and tz[pos].isalpha():
+                pos += 1
+
+    def seconds():
+        # [+-]hh[:mm[:ss]]
+        nonlocal pos
+        sign = 1
+        if tz[pos] in '+-':
+            sign = -1 if tz[pos] == '-' else 1
+            pos += 1
+        end = pos
+        while end < len(tz) and (tz[end].isdigit() or tz[end] == ':'):
+            end += 1
+        parts = [int(part) for part in tz[pos:end].split(':')] + [0, 0]
+        pos = end
+        return sign * (parts[0] * 3600 + parts[1] * 60 + parts[2])
+
+    def date():
+        # Mm.w.d[/time], the Julian day forms (Jn, n) are not used by the IANA zones
+        nonlocal pos
+        if tz[pos] != 'M':
+            raise ValueError(f'{tz}: only Mm.w.d dates are supported')
+        end = pos
+        while end < len(tz) and tz[end] not in ',/':
+            end += 1
+        month, week, weekday = (int(part) for part in tz[pos + 1:end].split('.'))
+        pos = end
+        time = 7200
+        if pos < len(tz) and tz[pos] == '/':
+            pos += 1
+            time = seconds()
+        return (month, week, weekday, time)
+
+    # POSIX offsets are west of Greenwich (EST5 is 5 hours behind UTC)
+    name()
+    std = -seconds()
+    if pos == len(tz):
+        return (std, std, None, None)
+    name()
+    dst = std + 3600
+    if tz[pos] != ',':
+        dst = -seconds()
+    pos += 1
+    start = date()
+    pos += 1
+    end = date()
+    return (std, dst, start, end)
+
+
+def rule_transitions(rule, year):
+    """
+    Return the transitions ([(NTP seconds, offset),...] in order) of a rule in a year (as JMBTime._dst_table)
+    """
+    std, dst, start, end = rule
+    if start is None:
+        return []
+
+    def utc(date, offset):
+        month, week, weekday, time = date
+        first = datetime.date(year, month, 1)
+        day = first + datetime.timedelta(days=(weekday - (first.weekday() + 1)) % 7 + (week - 1) * 7)
+        if day.month != month:
+            day -= datetime.timedelta(days=7)
+        return (day - datetime.date(1900, 1, 1)).days * 86_400 + time - offset
+
+    return sorted([(utc(start, std), dst), (utc(end, dst), std)])
+
+
+def offsets(initial, transitions, rule, first, last):
+    """
+    Return the offset at the start of the first year and the changes of offset ([(NTP seconds, offset),...]) through
+    the last year as the clock works them out (JMBTime._dst_table): the transitions, then the rule after the last one
+    """
+    last_t = transitions[-1][0] if transitions else None
+    changes = []
+    offset = None
+    for year in range(first, last + 1):
+        year_start = (datetime.date(year, 1, 1) - datetime.date(1900, 1, 1)).days * 86_400
+        year_end = (datetime.date(year + 1, 1, 1) - datetime.date(1900, 1, 1)).days * 86_400
+        year_offset = initial
+        table = []
+        for t, o in transitions:
+            if t <= year_start:
+                year_offset = o
+            elif t < year_end:
+                table.append((t, o))
+        if last_t is None or last_t < year_end:
+            ruled = [(t, o) for t, o in rule_transitions(rule, year) if year_start <= t < year_end]
+            if last_t is None or last_t <= year_start:
+                year_offset = ruled[-1][1] if ruled else rule[0]
+            table += [(t, o) for t, o in ruled if last_t is None or t > last_t]
+
+        if offset is None:
+            offset = start = year_offset
+        for t, o in [(year_start, year_offset)] + table:
+            if o != offset:
+                changes.append((t, o))
+                offset = o
+    return start, changes
+
+
+def compile_zone(name, since):
+    """
+    Return the record of a zone (see timezones.py): the zone's transitions from the start of the since year, less those
+    the rule gives the same way (most zones keep no transitions at all)
+    """
+    since_t = (datetime.date(since, 1, 1) - datetime.date(1900, 1, 1)).days * 86_400
+    tzif, initial, footer = read_tzif(name)
+    rule = parse_posix(footer)
+
+    # Changes of offset from the since year (a change of abbreviation or of daylight savings alone is not needed)
+    transitions = []
+    for t, offset in tzif:
+        t += UNIX_EPOCH
+        if t <= since_t:
+            initial = offset
+        elif offset != (transitions[-1][1] if transitions else initial):
+            transitions.append((t, offset))
+
+    # Fewest transitions that give the same offsets as all of them, through the year after the last one
+    last = max(since, (datetime.date(1900, 1, 1) + datetime.timedelta(seconds=transitions[-1][0])).year + 1
+               if transitions else since)
+    expected = offsets(initial, transitions, rule, since, last)
+    for keep in range(len(transitions) + 1):
+        if offsets(initial, transitions[:keep], rule, since, last) == expected:
+            transitions = transitions[:keep]
+            break
+
+    # Offsets and times in minutes
+    for value in [initial, *rule[:2], *(t for pair in transitions for t in pair)] + \
+            ([rule[2][3], rule[3][3]] if rule[2] else []):
+        if value % 60 != 0:
+            raise ValueError(f'{name}: {value} seconds is not whole minutes')
+    record = struct.pack('<hH', initial // 60, len(transitions))
+    record += b''.join(struct.pack('<Ih', t // 60, offset // 60) for t, offset in transitions)
+    start = rule[2] if rule[2] else (0, 0, 0, 0)
+    end = rule[3] if rule[3] else (0, 0, 0, 0)
+    record += struct.pack('<hhBBBhBBBh', rule[0] // 60, rule[1] // 60, *start[:3], start[3] // 60, *end[:3], end[3] // 60)
+    return record
+
+
+def build(zones, file=OUTPUT, since=2021):
+    """
+    Compile the zones into a time zone database file
+
+    zones ([str,...]) - IANA time zone names
+    file (str) - output file
+    since (int) - first year the clock needs, earlier times use the offset of that year (default: 2021, the RTC starts
+        at 01-Jan-2021 after a reset)
+
+    return (dict) - record size in bytes of each zone
+    """
+    names = sorted(set(zones))
+    records = [compile_zone(name, since) for name in names]
+    encoded = [name.encode('utf-8') for name in names]
+
+    # Header, index, names, records
+    names_pos = 8 + len(names) * 8
+    records_pos = names_pos + sum(1 + len(name) for name in encoded)
+    index = b''
+    for name, record in zip(encoded, records):
+        index += struct.pack('<II', names_pos, records_pos)
+        names_pos += 1 + len(name)
+        records_pos += len(record)
+
+    with open(file, 'wb') as f:
+        f.write(struct.pack('<4sBBH', b'TZDB', 1, 0, len(names)))
+        f.write(index)
+        f.write(b''.join(bytes([len(name)]) + name for name in encoded))
+        f.write(b''.join(records))
+    return {name: len(record) for name, record in zip(names, records)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile IANA time zones into the clock\'s time zone database')
+    parser.add_argument('zones', nargs='*', help='IANA time zone names (default: the zones of zone1970.tab)')
+    parser.add_argument('--all', action='store_true', help='compile every zone')
+    parser.add_argument('--since', type=int, default=2021, help='first year the clock needs (default: 2021)')
+    parser.add_argument('--output', default=OUTPUT, help='output file (default: Source Code/timezones.dat)')
+    args = parser.parse_args()
+
+    zones = sorted(zoneinfo.available_timezones()) if args.all else args.zones or zone1970()
+    sizes = build(zones, args.output, args.since)
+    transitions = sum((size - 18) // 6 for size in sizes.values())
+    print(f'{len(sizes)} zones, {transitions} transitions, {os.path.getsize(args.output):,} bytes: {os.path.normpath(args.output)}')
@@ -0,0 +1,1365 @@
+# Use this script to run the clock's display code on a computer (CPython 3), no Pico required
+#   Fake machine/rp2 modules and a simulated clock replace the hardware, a motor model turns the displays from the
+#   frames written to a fake shift register so the results (flaps shown, steps, timing) can be measured and checked
+import asyncio
+import gc
+import sys
+import time
+import types
+
+sys.path.insert(0, __file__.rsplit('/', 2)[0] + '/Source Code')
+
+########## Simulated Clock
+
+class SimClock:
+    """
+    Virtual microsecond clock used in place of the Pico's time functions (sleeping advances the clock instantly)
+    Set real = True to follow the computer's clock instead (needed when asyncio tasks run alongside the display)
+    """
+
+    def __init__(self):
+        self.us = 0
+        self._real = False
+
+    @property
+    def real(self):
+        return self._real
+
+    @real.setter
+    def real(self, value):
+        # CPython's garbage collector can pause for tens of milliseconds once earlier tests have recorded millions of
+        # frames, it is paused while timing follows the computer's clock
+        self._real = value
+        if value:
+            gc.collect()
+            gc.disable()
+        else:
+            gc.enable()
+
+    def ticks_us(self):
+        if self._real:
+            return int(time.perf_counter() * 1_000_000)
+        return self.us
+
+    def ticks_ms(self):
+        return self.ticks_us() // 1000
+
+    def sleep_us(self, us):
+        if us > 0:
+            if self._real:
+                # Busy wait like the Pico's sleep_us
+                end = time.perf_counter() + us / 1_000_000
+                while time.perf_counter() < end:
+                    pass
+            else:
+                self.us += us
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+clock = SimClock()
+
+# MicroPython time functions (ticks wrap around at 2^30 as on the Pico)
+TICKS_MAX = (1 << 30) - 1
+TICKS_HALF = 1 << 29
+time.ticks_us = lambda: clock.ticks_us() & TICKS_MAX
+time.ticks_ms = lambda: clock.ticks_ms() & TICKS_MAX
+time.sleep_us = clock.sleep_us
+time.sleep_ms = clock.sleep_ms
+time.ticks_add = lambda ticks, delta: (ticks + delta) & TICKS_MAX
+time.ticks_diff = lambda ticks_1, ticks_2: ((ticks_1 - ticks_2 + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+# MicroPython asyncio functions (sleeping advances the simulated clock unless it follows the computer's clock)
+def sleep_ms(ms):
+    if clock.real:
+        return asyncio.sleep(ms / 1000)
+    clock.sleep_ms(ms)
+    return asyncio.sleep(0)
+
+asyncio.sleep_ms = sleep_ms
+
+########## Fake machine and rp2 modules
+
+class FakePin:
+    """
+    Fake machine.Pin, every pin created is kept in FakePin.pins by GPIO number so the simulation can drive inputs
+    Setting the value of an input (value or inject) calls its IRQ handler on a matching edge, like a hard IRQ
+    An input created again on the same GPIO (e.g. a simulated restart) keeps the value driven onto it
+    """
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+    pins = {}
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 1 if pull == FakePin.PULL_UP else 0
+        if value is not None:
+            self._value = value
+        if mode == FakePin.IN and id in FakePin.pins:
+            self._value = FakePin.pins[id]._value
+        self._handler = None
+        self._trigger = 0
+        FakePin.pins[id] = self
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        if value != self._value:
+            self._value = value
+            if self._handler is not None and self._trigger & (FakePin.IRQ_RISING if value else FakePin.IRQ_FALLING):
+                self._handler(self)
+
+    def inject(self, *values):
+        """
+        Inject edges: set the pin to each value in turn (e.g. inject(0, 1) = a short glitch on a pulled up input)
+        """
+        for value in values:
+            self.value(value)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def low(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+class FakeSPI:
+    MSB = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def write(self, buf):
+        pass
+
+class FakeRTC:
+    """
+    Fake machine.RTC following the simulated clock: datetime() = (year, month, day, weekday (0=Monday), hour, min, sec, subsec)
+    The RTC counts whole seconds like the Pico's (subsec is always 0)
+    """
+    base = None
+    base_us = 0
+
+    def datetime(self, dt=None):
+        import datetime
+        if dt is not None:
+            FakeRTC.base = datetime.datetime(dt[0], dt[1], dt[2], dt[4], dt[5], dt[6])
+            FakeRTC.base_us = clock.ticks_us()
+            return
+        now = FakeRTC.base + datetime.timedelta(microseconds=clock.ticks_us() - FakeRTC.base_us)
+        return (now.year, now.month, now.day, now.weekday(), now.hour, now.minute, now.second, 0)
+
+machine = types.ModuleType('machine')
+machine.Pin = FakePin
+machine.SPI = FakeSPI
+machine.RTC = FakeRTC
+sys.modules['machine'] = machine
+
+class FakePIO:
+    OUT_LOW = 0
+    SHIFT_RIGHT = 1
+
+def fake_asm_pio(**kwargs):
+    """
+    Fake rp2.asm_pio: keeps the program's options (out pins, pull threshold) for FakeStateMachine
+    """
+    def decorator(program):
+        program.pio_options = kwargs
+        return program
+    return decorator
+
+class FakeStateMachine:
+    """
+    Fake rp2.StateMachine running the HC595 program (see _hc595_program in shiftregister.py): each frame is y+1 bit
+    times, a bit time outputs the next bits of the OSR to the consecutive serial pins (one per chain) and pulses the
+    clock, a new FIFO word is auto-pulled every pull_thresh bits, the frame ends with a latch pulse
+
+    Attributes:
+    frame_us (float) - time the state machine takes to shift and latch one frame (4 cycles per bit time)
+    """
+
+    def __init__(self, id, program, freq, sideset_base, set_base, out_base):
+        options = program.pio_options
+        self.out_count = len(options['out_init'])
+        self.pull_thresh = options['pull_thresh']
+        self.pin_clock = sideset_base
+        self.pin_latch = set_base
+        self.pins_out = [FakePin.pins.get(out_base.id + i) or FakePin(out_base.id + i) for i in range(self.out_count)]
+        self.freq = freq
+        self.frame_us = 0
+        self._fifo = []
+        self._osr = 0
+        self._shift = 32
+        self._y = 0
+        self._active = False
+
+    def exec(self, instruction):
+        if instruction == 'pull()':
+            self._osr = self._fifo.pop(0)
+            self._shift = 0
+        elif instruction == 'mov(y, osr)':
+            self._y = self._osr
+        elif instruction == 'out(null, 32)':
+            self._shift = 32
+
+    def active(self, value):
+        self._active = bool(value)
+
+    def put(self, value):
+        self._fifo.extend([value] if isinstance(value, int) else list(value))
+        while self._active and self._available() >= (self._y + 1) * self.out_count:
+            self._frame()
+
+    def _available(self):
+        return max(self.pull_thresh - self._shift, 0) + len(self._fifo) * self.pull_thresh
+
+    def _frame(self):
+        mask = (1 << self.out_count) - 1
+        for _ in range(self._y + 1):
+            if self._shift >= self.pull_thresh:
+                self._osr = self._fifo.pop(0)
+                self._shift = 0
+            bits = (self._osr >> self._shift) & mask
+            self._shift += self.out_count
+            self.pin_clock.value(0)
+            for i, pin in enumerate(self.pins_out):
+                pin.value((bits >> i) & 1)
+            self.pin_clock.value(1)
+        self.pin_clock.value(0)
+        self.pin_latch.value(1)
+        self.pin_latch.value(0)
+        # mov, 4 cycles per bit time, latch pulse
+        self.frame_us = (1 + 4 * (self._y + 1) + 3) * 1_000_000 / self.freq
+
+rp2 = types.ModuleType('rp2')
+rp2.PIO = FakePIO
+rp2.asm_pio = fake_asm_pio
+rp2.StateMachine = FakeStateMachine
+sys.modules['rp2'] = rp2
+
+from display import Display
+from shiftregister import ShiftRegisterBitBang, ShiftRegisterPIO, ShiftRegisterSPI
+
+########## Fake Output Backend
+
+class ShiftRegisterFake:
+    """
+    Host-side shift register output: records every frame with its latch time (simulated microseconds)
+
+    Attributes:
+    frames ([(int, bytes),...]) - (ticks_us, data) of each frame written
+    listeners ([function,...]) - called with the data of each frame (used by the motor model)
+    write_us (int) - simulated time taken to write one frame (default: 0, PIO/SPI frames take a few microseconds)
+    write_seconds (float) - computer time spent in write (recording and listeners), excluded from benchmarks
+    """
+
+    def __init__(self, pins_sr, shift_register_count, write_us=0):
+        self.shift_register_count = shift_register_count
+        self.frames = []
+        self.listeners = []
+        self.write_us = write_us
+        self.write_seconds = 0
+
+    def write(self, data):
+        start = time.perf_counter()
+        clock.sleep_us(self.write_us)
+        self.frames.append((clock.ticks_us(), bytes(data)))
+        for listener in self.listeners:
+            listener(data)
+        self.write_seconds += time.perf_counter() - start
+
+    def step_rate(self):
+        """
+        Return the steps (frames) per second between the first and last recorded frame
+        """
+        if len(self.frames) < 2:
+            return 0
+        return (len(self.frames) - 1) * 1_000_000 / (self.frames[-1][0] - self.frames[0][0])
+
+class BitBangRecorder(ShiftRegisterBitBang):
+    """
+    Original bit-bang output with frame recording (timing comes from its sleep_us calls)
+    """
+
+    def __init__(self, pins_sr, shift_register_count):
+        super().__init__(pins_sr, shift_register_count)
+        self.frames = []
+        self.listeners = []
+
+    def write(self, data):
+        super().write(data)
+        self.frames.append((clock.ticks_us(), bytes(data)))
+        for listener in self.listeners:
+            listener(data)
+
+    step_rate = ShiftRegisterFake.step_rate
+
+class HC595Chains:
+    """
+    Host fake of 74HC595 chains sharing a clock and latch pin (one serial input per chain): every rising clock edge
+    shifts each chain's serial input into its first shift register (QH' carries into the next), every rising latch edge
+    records the outputs of all shift registers
+
+    Attributes:
+    bits ([[int,...],...]) - bit stream received on each chain's serial input (one bit per clock)
+    frames ([bytes,...]) - outputs latched by each frame, one byte per shift register (Display numbering, see shiftregister.py)
+    listeners ([function,...]) - called with the data of each latched frame (used by the motor model)
+    """
+
+    def __init__(self, pins_sr, shift_register_count):
+        self.shift_register_count = shift_register_count
+        self.chain_count = len(pins_sr) - 2
+        self.chain_length = -(-shift_register_count // self.chain_count)
+        self.pins_serial = [FakePin.pins[pin] for pin in pins_sr[2:]]
+        self.registers = [[0] * self.chain_length for _ in range(self.chain_count)]
+        self.bits = [[] for _ in range(self.chain_count)]
+        self.frames = []
+        self.listeners = []
+        FakePin.pins[pins_sr[0]].irq(self._clock, FakePin.IRQ_RISING)
+        FakePin.pins[pins_sr[1]].irq(self._latch, FakePin.IRQ_RISING)
+
+    def _clock(self, pin):
+        for chain, registers in enumerate(self.registers):
+            carry = self.pins_serial[chain].value()
+            self.bits[chain].append(carry)
+            # First bit in ends up in bit 0 once a whole byte has been shifted in
+            for j in range(self.chain_length):
+                out = registers[j] & 1
+                registers[j] = (registers[j] >> 1) | (carry << 7)
+                carry = out
+
+    def _latch(self, pin):
+        data = bytes(self.registers[r // self.chain_length][r % self.chain_length] for r in range(self.shift_register_count))
+        self.frames.append(data)
+        for listener in self.listeners:
+            listener(data)
+
+########## Motor Model
+
+class MotorModel:
+    """
+    Simulates the stepper motors, flap drums and hall sensors of a display from the frames it outputs
+
+    Each display's 4-bit coil pattern is decoded from its shift register byte (see the Display layout), the rotor
+    follows the half-step sequence: a change to a later pattern advances the drum (earlier pattern = back), one half-step
+    per pattern (two for full step and wave drive)
+    """
+    seq = [1, 3, 2, 6, 4, 12, 8, 9]
+
+    def __init__(self, display, steps_rev=2048, magnet_width=180, magnet_start=None, half_steps=False, max_rate=None):
+        """
+        display (Display) - display to simulate, its output must record frames (listeners)
+        steps_rev (int or [int,...]) - steps per drum revolution (one value for all displays or one per display)
+        magnet_width (int or [int,...]) - number of steps the hall sensor reads the magnet
+        magnet_start ([int,...]) - step position of each drum where the magnet is first read (default: spread out)
+        half_steps (bool) - positions (and the values above) count half-steps instead of full steps, needed for the
+            half-step drive mode
+        max_rate (int or [int,...]) - steps per second above which a motor loses every 4th step (default: None = never)
+        """
+        self.display = display
+        self.unit = 1 if half_steps else 2
+        self._half = [0] * display.display_count
+        self.steps_rev = steps_rev if isinstance(steps_rev, list) else [steps_rev] * display.display_count
+        self.magnet_width = magnet_width if isinstance(magnet_width, list) else [magnet_width] * display.display_count
+        self.magnet_start = magnet_start or [(300 * i + 100) % self.steps_rev[i] for i in range(display.display_count)]
+        self.position = [0] * display.display_count
+        self.phase = [7] * display.display_count
+        self.steps = 0
+        self.max_rate = max_rate if isinstance(max_rate, list) else [max_rate] * display.display_count
+        self.lost = [0] * display.display_count
+        self._fast = [0] * display.display_count
+        self._last_step = [0] * display.display_count
+        display.output.listeners.append(self.frame)
+        self._update_hall()
+
+    def frame(self, data):
+        for i in range(self.display.display_count):
+            nibble = display_nibble(self.display, data, i)
+            if nibble in self.seq:
+                diff = (self.seq.index(nibble) - self.phase[i]) % 8
+                if diff != 0 and self._lose_step(i):
+                    self.steps += 1
+                elif diff != 0:
+                    # Half-steps forward (1, 2) or back (7, 6), positions move every unit half-steps
+                    self._half[i] += diff if diff < 4 else diff - 8
+                    moved = self._half[i] // self.unit
+                    self._half[i] -= moved * self.unit
+                    self.position[i] += moved
+                    self.steps += 1
+                self.phase[i] = self.seq.index(nibble)
+        self._update_hall()
+
+    def _lose_step(self, display_index):
+        """
+        Return True if a step is lost: every 4th step faster than the display's max_rate
+        """
+        now = clock.ticks_us()
+        interval = now - self._last_step[display_index]
+        self._last_step[display_index] = now
+        max_rate = self.max_rate[display_index]
+        if max_rate is None or interval * max_rate >= 1_000_000:
+            return False
+        self._fast[display_index] += 1
+        if self._fast[display_index] % 4 == 0:
+            self.lost[display_index] += 1
+            return True
+        return False
+
+    def _update_hall(self):
+        for i in range(self.display.display_count):
+            offset = (self.position[i] - self.magnet_start[i]) % self.steps_rev[i]
+            self.display.pins_hall[i].value(0 if offset < self.magnet_width[i] else 1)
+
+    def flap(self, display_index):
+        """
+        Return the index of the flap shown by a display (flap 0 is home_reads steps past the magnet)
+        """
+        home = self.magnet_start[display_index] + self.display.home_reads[display_index] * self.scale(display_index)
+        offset = (self.position[display_index] - home) % self.steps_rev[display_index]
+        flap_count = self.display.flap_count[display_index]
+        return round(offset * flap_count / self.steps_rev[display_index]) % flap_count
+
+    def scale(self, display_index):
+        """
+        Return the positions per step of a display in its drive mode (2 = full steps counted in half-steps)
+        """
+        return 2 // self.display.drive_modes[self.display.drive_mode[display_index]][1] // self.unit
+
+    def flaps(self):
+        return [self.flap(i) for i in range(self.display.display_count)]
+
+########## Previous Implementation (benchmark reference)
+
+class LegacyDisplay(Display):
+    """
+    Display with the step loop and planner as they were before the frame tables (list comprehension per step,
+    re-summing steps, homing on every decrease)
+    """
+
+    # Motor step sequence: frame byte of each sequence step, 0 = no display turns, 1 = right-only, 2 = left-only, 3 = both
+    seq = [[0,3,48,51],[0,6,96,102],[0,12,192,204],[0,9,144,153]]
+
+    def display_datetime(self, dt):
+        h = f'{dt[4]:2}'
+        m = f'{dt[5]:02}'
+        self.flap_value_target = [self.flap_values_digit.index(h[:1]), self.flap_values_digit.index(h[1:]),
+            self.flap_values_digit.index(m[:1]), self.flap_values_digit.index(m[1:]), self.flap_values_dow.index(f'{dt[3]}-{dt[7]}')]
+        seq_index = 0
+        max_attempts = 3
+        steps_remaining = [self._calculate_steps(i) for i in range(self.display_count)]
+        steps_remaining.append(0)
+        while sum(map(abs, steps_remaining)) > 0 and max_attempts > 0:
+            steps_max = 2560
+            while sum(map(abs, steps_remaining)) > 0 and steps_max > 0:
+                bytes_seq = [self.seq[seq_index][(0 if steps_remaining[i] == 0 else 1) * 2 + (0 if steps_remaining[i+1] == 0 else 1)] for i in range(0, self.display_count, 2)]
+                self._bytes_out(bytes_seq)
+                for i in range(self.display_count):
+                    if steps_remaining[i] > 0:
+                        steps_remaining[i] -= 1
+                    elif steps_remaining[i] == -1:
+                        if self.pins_hall[i].value() == 1:
+                            steps_remaining[i] = -2
+                    elif steps_remaining[i] == -2:
+                        if self.pins_hall[i].value() == 0:
+                            steps_remaining[i] = self.home_reads[i]
+                steps_max -= 1
+                seq_index = (seq_index + 1) if seq_index < 3 else 0
+            if steps_max < 0:
+                self.flap_value_current = [None] * self.display_count
+            steps_remaining = [self._calculate_steps(i) for i in range(self.display_count)]
+            steps_remaining.append(0)
+            max_attempts -= 1
+        self._bytes_out([0] * self.shift_register_count)
+
+    def _calculate_steps(self, display_index):
+        if self.flap_value_current[display_index] is None or self.flap_value_target[display_index] < self.flap_value_current[display_index]:
+            self.flap_value_current[display_index] = 0
+            return -1 if self.pins_hall[display_index].value() == 0 else -2
+        if self.flap_value_current[display_index] == self.flap_value_target[display_index]:
+            return 0
+        steps = int(round(2048 * ((self.flap_value_target[display_index] - self.flap_value_current[display_index]) / self.flap_count[display_index] ), 0))
+        self.flap_value_current[display_index] = self.flap_value_target[display_index]
+        return steps
+
+########## Helpers
+
+def dt_tuple(hour24, minute, weekday=0):
+    """
+    Return a datetime tuple as used by Display.display_datetime for a 24-hour time
+    """
+    hr = hour24 % 12
+    return (2025, 1, 5, weekday, 12 if hr == 0 else hr, minute, 0, 'AM' if hour24 < 12 else 'PM')
+
+def display_nibble(display, data, display_index):
+    """
+    Return a display's 4-bit coil pattern from the bytes of a frame (see the Display layout)
+    """
+    return data[display._register[display_index]] >> display._shift[display_index] & 15
+
+def create_display(output=ShiftRegisterFake, display_class=Display, layout=None, **motor_options):
+    """
+    Create a display with a motor model on the given output backend (motor_options: see MotorModel)
+    """
+    FakePin.pins = {}
+    pins_hall = list(range(1, (len(layout) if layout else 5) + 1))
+    display = display_class([15,14,13], pins_hall, output=output, layout=layout)
+    motors = MotorModel(display, **motor_options)
+    return display, motors
+
+########## Tests
+
+def step_rate(output=ShiftRegisterFake, rate=500, minutes=((11, 59), (12, 0), (12, 37))):
+    """
+    Move the display through several times at a constant rate and report steps per second and the time of each transition
+    """
+    display, motors = create_display(output)
+    display.set_profile(rate, rate, 0)
+    print(f'---------- Step Rate: {output.__name__} ----------')
+    for (h, m) in minutes:
+        start = clock.ticks_us()
+        frames = len(display.output.frames)
+        display.display_datetime(dt_tuple(h, m))
+        print(f'{h:02}:{m:02} - {len(display.output.frames) - frames} steps in {(clock.ticks_us() - start) / 1_000_000:.2f} s')
+        assert motors.flaps() == display.flap_value_target, f'Display shows {motors.flaps()}, expected {display.flap_value_target}'
+
+    rate = display.output.step_rate()
+    print(f'Steps per second: {rate:.0f}')
+    return rate
+
+def step_rate_regression():
+    """
+    Fake backend must step at the profile's rate, and much faster than the original bit-bang output
+    """
+    expected = 500
+    rate_bitbang = step_rate(BitBangRecorder, expected)
+    rate = step_rate(ShiftRegisterFake, expected)
+    assert abs(rate - expected) / expected < 0.01, f'Step rate {rate:.0f}, expected {expected:.0f}'
+    assert rate > 5 * rate_bitbang
+    print(f'Step rate regression passed: {rate / rate_bitbang:.1f}x faster than bit-bang')
+
+def step_loop_benchmark(hours=24):
+    """
+    Compare the processing speed of the step loop with the previous implementation (no waiting between steps)
+    Time spent in the fake output and motor model is excluded, CPython shows the relative difference
+    """
+    print('---------- Step Loop Benchmark ----------')
+    results = {}
+    for display_class in (LegacyDisplay, Display):
+        display, motors = create_display(display_class=display_class)
+        display.set_profile(1_000_000, 1_000_000, 0)
+        start = time.perf_counter()
+        for h in range(hours):
+            for m in range(0, 60, 7):
+                display.display_datetime(dt_tuple(h, m))
+        elapsed = time.perf_counter() - start - display.output.write_seconds
+        results[display_class.__name__] = motors.steps / elapsed
+        print(f'{display_class.__name__}: {motors.steps} steps, {motors.steps / elapsed:.0f} steps per second')
+        assert motors.flaps() == display.flap_value_target
+
+    # Displays stepping together on one profile take the shared cadence runs of the step loop
+    print(f'Relative speed: {results["Display"] / results["LegacyDisplay"]:.2f}x')
+    assert results['Display'] > results['LegacyDisplay']
+
+def async_motion(rate=2000):
+    """
+    Run move_to alongside a task that should wake every millisecond (like the button and LED tasks)
+    The longest burst must stay within the display's burst_us (plus a step) and bound the delay of that task,
+    cancel must stop the move
+    """
+    print('---------- Async Motion ----------')
+    display, motors = create_display()
+    display.set_profile(rate, rate, 0)
+    clock.real = True
+
+    async def ticker(status):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep_ms(1)
+            status['lag_max_ms'] = max(status['lag_max_ms'], (time.perf_counter() - start) * 1000 - 1)
+            status['ticks'] += 1
+
+    async def run():
+        status = {'lag_max_ms': 0, 'ticks': 0}
+        task = asyncio.create_task(ticker(status))
+
+        # Full transition
+        finished = await display.move_to(display.datetime_targets(dt_tuple(11, 59)))
+        assert finished and motors.flaps() == display.flap_value_target
+        print(f'Steps: {display.steps_taken}, longest burst: {display.lag_max_us / 1000:.1f} ms, task ran {status["ticks"]} times, largest task delay: {status["lag_max_ms"]:.1f} ms')
+        # Each burst may overrun by one step (plus processing and the computer's scheduler preempting the process, up to
+        # about 15 ms on a busy machine), CPython's asyncio needs up to 3 loop passes to wake a sleeping task (1 on the Pico)
+        lag_bound_us = display.burst_us + 1_000_000 // rate + 15000
+        assert display.lag_max_us <= lag_bound_us
+        assert status['lag_max_ms'] < 3 * lag_bound_us / 1000
+
+        # Cancel part way through
+        move = asyncio.create_task(display.move_to(display.datetime_targets(dt_tuple(12, 37))))
+        await asyncio.sleep_ms(100)
+        print(f'Progress before cancel: {display.progress():.0%}')
+        display.cancel()
+        assert await move is False
+        print(f'Positions after cancel: {display.flap_value_current}')
+        assert None in display.flap_value_current
+
+        # Displays recover on the next move
+        assert await display.move_to(display.datetime_targets(dt_tuple(12, 37)))
+        assert motors.flaps() == display.flap_value_target
+        task.cancel()
+
+    asyncio.run(run())
+    clock.real = False
+
+def core_motion(rate=2000, requests=20):
+    """
+    Run the step generator on a second thread (core 1 on the Pico) while an asyncio web server answers requests
+    Confirms motion and web serving overlap and reports the request times and the step timing while serving, then that
+    a move right after a canceled one waits for core 1 to stop the canceled move
+    """
+    print('---------- Core 1 Motion ----------')
+    display, motors = create_display()
+    display.set_profile(rate, rate, 0)
+    clock.real = True
+    display.start_core()
+
+    async def serve_request(sreader, swriter):
+        # Same pattern as WIFIAP.serve_request: read the request, write a page
+        while await sreader.readline() not in (b'\r\n', b''):
+            pass
+        swriter.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n<p>Clock Configuration</p>')
+        await swriter.drain()
+        swriter.close()
+        await swriter.wait_closed()
+
+    async def run():
+        server = await asyncio.start_server(serve_request, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        move = asyncio.create_task(display.move_to(display.datetime_targets(dt_tuple(11, 59))))
+        await asyncio.sleep_ms(20)
+
+        # Requests while the displays move
+        times = []
+        for _ in range(requests):
+            start = clock.ticks_us()
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET / HTTP/1.1\r\n\r\n')
+            assert b'200 OK' in await reader.read()
+            writer.close()
+            times.append((start, clock.ticks_us()))
+
+        assert await move
+        server.close()
+
+        # Move canceled by its awaiting task, then a new move at once: it must wait for core 1 to stop the canceled move
+        #   (a late status of the canceled move must not end the new one)
+        move = asyncio.create_task(display.move_to(display.datetime_targets(dt_tuple(12, 37))))
+        await asyncio.sleep_ms(50)
+        move.cancel()
+        try:
+            await move
+        except asyncio.CancelledError:
+            pass
+        assert await display.move_to(display.datetime_targets(dt_tuple(3, 14)))
+        assert motors.flaps() == display.flap_value_target == display.datetime_targets(dt_tuple(3, 14))
+        print(f'Canceled move to 12:37, then moved to 3:14: {display.motion_status}')
+        return times
+
+    times = asyncio.run(run())
+    display.stop_core()
+    clock.real = False
+
+    frames = display.output.frames
+    overlap = sum(1 for (start, end) in times if frames[0][0] < start and end < frames[-1][0])
+    intervals = [frames[i][0] - frames[i - 1][0] for i in range(1, len(frames)) if times[0][0] <= frames[i][0] <= times[-1][1]]
+    print(f'Steps: {len(frames)}, requests answered during motion: {overlap} of {requests}, longest request: {max(end - start for (start, end) in times) / 1000:.1f} ms')
+    print(f'Step interval while serving: average {sum(intervals) / len(intervals):.0f} us, longest {max(intervals)} us (expected {1_000_000 // rate} us)')
+    assert overlap == requests
+    assert motors.flaps() == display.flap_value_target
+
+def day_transitions(home_interval, minutes=1440):
+    """
+    Move the display through every minute of a day, return the total steps, total motion time and homing searches
+    Checks the flaps shown after every minute and that expected_steps matches the steps of each transition
+    """
+    display, motors = create_display()
+    display.home_interval = home_interval
+    display.display_datetime(dt_tuple(23, 59))
+    steps = motors.steps
+    start = clock.ticks_us()
+    homing = 0
+    for minute in range(minutes):
+        dt = dt_tuple(minute // 60, minute % 60)
+        targets = display.datetime_targets(dt)
+        expected = display.expected_steps(targets)
+        homing += sum(1 for i in range(display.display_count) if targets[i] < display.flap_value_current[i] and display.home_passes[i] + 1 >= home_interval)
+        before = list(motors.position)
+        display.display_datetime(dt)
+        assert motors.flaps() == targets, f'{dt}: display shows {motors.flaps()}, expected {targets}'
+        moved = [motors.position[i] - before[i] for i in range(display.display_count)]
+        assert moved == expected, f'{dt}: moved {moved}, expected {expected}'
+
+    return motors.steps - steps, (clock.ticks_us() - start) / 1_000_000, homing
+
+def wrap_planning():
+    """
+    Compare homing on every decrease (home_interval = 1, the original planner) with forward wrap-around planning
+    """
+    print('---------- Wrap-Around Planning (1,440 minute transitions) ----------')
+    results = []
+    for home_interval in (1, 24, 144):
+        steps, seconds, homing = day_transitions(home_interval)
+        results.append((steps, seconds, homing))
+        print(f'home_interval={home_interval}: {steps} steps, {seconds:.0f} s moving, {homing} home searches')
+    print(f'Reduction: {1 - results[1][0] / results[0][0]:.1%} steps, {1 - results[1][1] / results[0][1]:.1%} time, {1 - results[1][2] / results[0][2]:.0%} home searches')
+
+    # A home search travels the same forward path as wrapping, the saving is in hall sensor searches (and their failures)
+    assert results[1][0] <= results[0][0] and results[1][1] <= results[0][1] and results[1][2] < results[0][2]
+
+def drift(moves=1000, seed=1):
+    """
+    Make thousands of random moves with no home searches, every display must land on the exact step of its target flap
+    """
+    print('---------- Drift ----------')
+    import random
+    rnd = random.Random(seed)
+    display, motors = create_display()
+    display.home_interval = moves + 1
+    display.display_datetime(dt_tuple(0, 0))
+    for _ in range(moves):
+        hour = rnd.randrange(24)
+        dt = dt_tuple(hour, rnd.randrange(60), rnd.randrange(7))
+        display.display_datetime(dt)
+        for i in range(display.display_count):
+            home = motors.magnet_start[i] + display.home_reads[i]
+            error = (motors.position[i] - home - display.flap_step(display.flap_value_target[i], i)) % motors.steps_rev[i]
+            assert error == 0, f'Display {i} is {error} steps off after {moves} moves'
+    print(f'{moves} moves, {motors.steps} steps, drift: 0 steps')
+
+def motion_profiles(transitions=((0, 0), (11, 59), (12, 0), (12, 37), (12, 59), (13, 0), (23, 59))):
+    """
+    Compare transition times at a constant rate (500 steps per second) with the default trapezoid profile
+    Checks expected_duration_us against the simulated time of every display that moves
+    """
+    print('---------- Motion Profiles ----------')
+    totals = []
+    for profile in ((500, 500, 0), None):
+        display, motors = create_display()
+        if profile:
+            display.set_profile(*profile)
+        display.display_datetime(dt_tuple(23, 58))
+        total = 0
+        for (h, m) in transitions:
+            targets = display.datetime_targets(dt_tuple(h, m))
+            expected = display.expected_steps(targets)
+            frames = len(display.output.frames)
+            start = clock.ticks_us()
+            display.display_datetime(dt_tuple(h, m))
+            total += clock.ticks_us() - start
+            assert motors.flaps() == targets
+
+            # Time from each display's first to last step (frames where its nibble changes to a new sequence step)
+            for i in range(display.display_count):
+                times = []
+                last = 0
+                for (t, data) in display.output.frames[frames:]:
+                    nibble = display_nibble(display, data, i)
+                    if nibble and nibble != last:
+                        times.append(t)
+                    last = nibble
+                if expected[i] > 1:
+                    duration = times[-1] - times[0]
+                    predicted = display.expected_duration_us(i, expected[i])
+                    assert abs(duration - predicted) <= 2 * len(times), f'Display {i}: {duration} us, predicted {predicted} us'
+        totals.append(total)
+        print(f'Profile {display.profiles[0]}: {total / 1_000_000:.2f} s for {len(transitions)} transitions')
+
+    print(f'Trapezoid profile transitions take {totals[1] / totals[0]:.0%} of the constant rate time')
+    assert totals[1] < totals[0]
+
+def calibration(moves=200, seed=2):
+    """
+    Calibrate displays whose drums differ from the nominal 2048 steps per revolution, save and load the calibration file
+    (a home offset cleared on the calibration page returns to the default), then compare the landing error of random
+    moves (no home searches) with nominal and calibrated values
+    """
+    print('---------- Calibration ----------')
+    import os
+    import random
+    import tempfile
+    from calibration import Calibration
+
+    steps_rev = [2038, 2040, 2048, 2036, 2042]
+    magnet_width = [150, 180, 200, 170, 190]
+    errors = []
+    for calibrated in (False, True):
+        display, motors = create_display(steps_rev=steps_rev, magnet_width=magnet_width)
+        if calibrated:
+            start = clock.ticks_us()
+            results = asyncio.run(display.calibrate())
+            print(f'Measured [steps_rev, magnet_width]: {results} in {(clock.ticks_us() - start) / 1_000_000:.1f} s')
+            assert results == [[steps_rev[i], magnet_width[i]] for i in range(display.display_count)]
+            assert motors.flaps() == [0] * display.display_count
+
+            # Save and load the calibration table (as main.py does at startup)
+            cal = Calibration(display.display_count)
+            cal.file = os.path.join(tempfile.mkdtemp(), 'calibration.dat')
+            cal.steps_rev = list(display.steps_rev)
+            cal.magnet_width = list(display.magnet_width)
+            cal.write()
+            display, motors = create_display(steps_rev=steps_rev, magnet_width=magnet_width)
+            loaded = Calibration(display.display_count)
+            loaded.file = cal.file
+            loaded.read()
+            display.load_calibration(loaded)
+            assert display.steps_rev == steps_rev and loaded.is_calibrated()
+
+            # Home offset set then cleared on the calibration page (blank = default): the default is used again
+            for home_reads in (120, None):
+                loaded.home_reads[0] = home_reads
+                display.load_calibration(loaded)
+            assert display.home_reads[0] == Calibration.home_reads_default
+
+        rnd = random.Random(seed)
+        display.home_interval = moves + 1
+        display.display_datetime(dt_tuple(0, 0))
+        error_max = 0
+        for _ in range(moves):
+            display.display_datetime(dt_tuple(rnd.randrange(24), rnd.randrange(60), rnd.randrange(7)))
+            for i in range(display.display_count):
+                # Steps from the centre of the target flap on the drum (drum's real steps per revolution)
+                home = motors.magnet_start[i] + display.home_reads[i]
+                flap = (2 * display.flap_value_target[i] * steps_rev[i] + display.flap_count[i]) // (2 * display.flap_count[i])
+                error = (motors.position[i] - home - flap) % steps_rev[i]
+                error_max = max(error_max, min(error, steps_rev[i] - error))
+        errors.append(error_max)
+        print(f'{"Calibrated" if calibrated else "Nominal 2048"}: largest landing error over {moves} moves: {error_max} steps')
+
+    assert errors[1] == 0 and errors[0] > 0
+
+def hall_edges():
+    """
+    Hall sensor edges captured by the pin IRQs must be on the exact step of each magnet edge, and glitches injected
+    while a display searches for home must not move its home position
+    """
+    print('---------- Hall Edges ----------')
+    display, motors = create_display()
+    display.display_datetime(dt_tuple(12, 37))
+    display.display_datetime(dt_tuple(11, 58))
+    edges = display.hall_edges()
+    for (i, value, step, ticks) in edges:
+        # Step counts match the motor position (both count forward steps from startup)
+        edge = motors.magnet_start[i] if value == 0 else motors.magnet_start[i] + motors.magnet_width[i]
+        assert (step - edge) % motors.steps_rev[i] == 0, f'Display {i}: edge {value} at step {step}, magnet edge at {edge}'
+    print(f'{len(edges)} edges captured on the exact magnet step, {display.edges_dropped} dropped')
+
+    # Glitches (magnet read for less than a step) and bounces at the magnet edge during home searches
+    display, motors = create_display()
+    injected = [0, 0]
+    def inject(data):
+        for i in range(display.display_count):
+            if display._steps_remaining[i] == -2 and motors.position[i] % 97 == 0:
+                display.pins_hall[i].inject(0, 1)
+                injected[0] += 1
+            elif display._steps_remaining[i] == -2 and display.pins_hall[i].value() == 0:
+                display.pins_hall[i].inject(1, 0)
+                injected[1] += 1
+    display.output.listeners.append(inject)
+    display.display_datetime(dt_tuple(12, 37))
+    assert motors.flaps() == display.flap_value_target, f'Display shows {motors.flaps()}, expected {display.flap_value_target}'
+    print(f'{injected[0]} glitches and {injected[1]} bounces injected during home searches, all displays home correctly')
+
+    # Ring buffer keeps the last edge_buffer_size edges
+    display.hall_edges()
+    dropped = display.edges_dropped
+    for _ in range(display.edge_buffer_size // 2 + 3):
+        display.pins_hall[0].inject(0, 1)
+    edges = display.hall_edges()
+    assert len(edges) == display.edge_buffer_size and display.edges_dropped - dropped == 6
+
+def slip_detection(moves=300, seed=3, slip_steps=4):
+    """
+    Make random moves without home searches while the motor model loses steps at random (skipped steps), with slip
+    detection off and on. Slip detection must correct the position at every magnet pass and count each slip in the health
+    counters, which are flushed to a health file
+    """
+    print('---------- Slip Detection ----------')
+    import os
+    import random
+    import tempfile
+    from health import Health
+
+    results = []
+    for slip_tolerance in (10_000, 2):
+        rnd = random.Random(seed)
+        display, motors = create_display()
+        display.slip_tolerance = slip_tolerance
+        display.home_interval = moves + 1
+        display.display_datetime(dt_tuple(0, 0))
+
+        # Lose slip_steps steps about every 2,000 steps of each display (drum falls behind the coils)
+        lost = [0]
+        def lose(data):
+            for i in range(display.display_count):
+                if display._steps_remaining[i] > 0 and rnd.randrange(2000) == 0:
+                    motors.position[i] -= slip_steps
+                    lost[0] += 1
+        display.output.listeners.insert(0, lose)
+        display.health_counters()
+
+        error_max = 0
+        for _ in range(moves):
+            display.display_datetime(dt_tuple(rnd.randrange(24), rnd.randrange(60), rnd.randrange(7)))
+            for i in range(display.display_count):
+                home = motors.magnet_start[i] + display.home_reads[i]
+                error = (motors.position[i] - home - display.flap_step(display.flap_value_target[i], i)) % motors.steps_rev[i]
+                error_max = max(error_max, min(error, motors.steps_rev[i] - error))
+
+        counters = display.health_counters()
+        results.append((error_max, lost[0], counters))
+        print(f'slip_tolerance={slip_tolerance}: {lost[0]} slips injected, {sum(counters["slips"])} detected, largest landing error {error_max} steps')
+
+    # Detection off: errors accumulate; on: corrected at every magnet pass (only slips after the last pass remain)
+    (error_off, lost, _), (error_on, _, counters) = results
+    assert error_on < error_off and error_on <= 4 * slip_steps
+    assert 0 < sum(counters['slips']) <= lost and sum(counters['moves']) > 0
+
+    # Flush to the health file and read it back
+    health = Health(display.display_count)
+    health.file = os.path.join(tempfile.mkdtemp(), 'health.dat')
+    health.read()
+    health.add(counters)
+    health.write()
+    health.read()
+    assert health.counters['slips'] == counters['slips']
+    print(f'Health file: slips per 1,000 moves {[round(health.slip_rate(i), 1) for i in range(display.display_count)]}')
+
+def current_budget(transitions=(((0, 0, 0), (12, 37, 0)), ((9, 59, 1), (10, 0, 1)), ((11, 59, 2), (12, 0, 2)), ((12, 59, 3), (13, 0, 3)), ((23, 59, 4), (0, 0, 5)))):
+    """
+    Run transitions with a current budget (max_energized) of no limit, 3, 2 and 1 motors
+    Prints the makespan (time from the first to the last frame) and peak concurrency (motors energized in one frame) of each
+    transition, the peak must stay within the budget and every display must reach its target
+    """
+    print('---------- Current Budget ----------')
+    print('Budget     ' + ''.join(f'{h0:02}:{m0:02}>{h1:02}:{m1:02}   ' for ((h0, m0, d0), (h1, m1, d1)) in transitions))
+    for budget in (None, 3, 2, 1):
+        results = []
+        for ((h0, m0, d0), (h1, m1, d1)) in transitions:
+            display, motors = create_display()
+            display.max_energized = budget
+            display.display_datetime(dt_tuple(h0, m0, d0))
+            frames = len(display.output.frames)
+            display.display_datetime(dt_tuple(h1, m1, d1))
+            assert motors.flaps() == display.flap_value_target, f'Budget {budget}: display shows {motors.flaps()}, expected {display.flap_value_target}'
+
+            # Energized motors in each frame (non-zero nibbles)
+            new = display.output.frames[frames:]
+            peak = max(sum(1 for i in range(display.display_count) if display_nibble(display, data, i)) for (t, data) in new)
+            makespan = new[-1][0] - new[0][0]
+            assert budget is None or peak <= budget, f'Budget {budget}: {peak} motors energized'
+            results.append((makespan, peak))
+        print(f'{str(budget or "None"):<11}' + ''.join(f'{makespan / 1_000_000:5.2f} s ({peak})  ' for (makespan, peak) in results))
+    print('Makespan in seconds, (peak motors energized)')
+
+def layout_scaling(module_counts=(5, 8, 12, 16), moves=60, seed=4):
+    """
+    Benchmark the step loop (no waiting between steps) with layouts of more displays: two displays per shift register,
+    showing hours, minutes and seconds in turn. Prints the frames and motor steps processed per second and the processing
+    time per frame per shift register, which must not grow with the number of displays
+    """
+    print('---------- Layout Scaling ----------')
+    import random
+    fields = ['hour_tens', 'hour_ones', 'minute_tens', 'minute_ones', 'second_tens', 'second_ones']
+    results = []
+    for count in module_counts:
+        rnd = random.Random(seed)
+        layout = [(k // 2, 1 - k % 2, ['0','1','2','3','4','5','6','7','8','9',',',':','!',' '], fields[k % len(fields)]) for k in range(count)]
+        display, motors = create_display(layout=layout)
+        display.set_profile(1_000_000, 1_000_000, 0)
+        display.display_datetime((2025, 1, 5, 0, 12, 0, 0, 'AM'))
+        frames = len(display.output.frames)
+        steps = motors.steps
+        display.output.write_seconds = 0
+        start = time.perf_counter()
+        for _ in range(moves):
+            dt = (2025, 1, 5, 0, rnd.randrange(1, 13), rnd.randrange(60), rnd.randrange(60), 'AM')
+            display.display_datetime(dt)
+            assert motors.flaps() == display.flap_value_target
+        elapsed = time.perf_counter() - start - display.output.write_seconds
+        frames = len(display.output.frames) - frames
+        steps = motors.steps - steps
+        per_register = elapsed * 1_000_000 / frames / display.shift_register_count
+        results.append(per_register)
+        print(f'{count} displays, {display.shift_register_count} shift registers: {frames / elapsed:.0f} frames per second, {steps / elapsed:.0f} motor steps per second, {per_register:.1f} us per frame per shift register')
+
+    # Per-step cost grows with the number of shift registers, not faster
+    assert results[-1] < 1.5 * results[0]
+
+def chain_stream(data, chain, chain_count, shift_register_count, pad_bits=0):
+    """
+    Return the bits a chain's serial input must receive for a frame: padding, then each of its shift registers from the
+    farthest to the first, least significant bit first
+    """
+    length = -(-shift_register_count // chain_count)
+    bits = [0] * pad_bits
+    for j in range(length - 1, -1, -1):
+        r = chain * length + j
+        byte = data[r] if r < shift_register_count else 0
+        bits.extend((byte >> bit) & 1 for bit in range(8))
+    return bits
+
+def parallel_chains(configs=((3, 1), (3, 2), (3, 3), (8, 1), (8, 2), (8, 3), (8, 4), (16, 2), (16, 4), (16, 8)), frames=40, seed=5):
+    """
+    Write random frames through the bit-bang and PIO backends with the shift registers split into parallel chains.
+    The fake chains (HC595Chains) must receive the exact bit stream on each serial input and latch every frame.
+    Prints the time to shift one frame, which depends on the chain length, not the number of shift registers. Then runs
+    8 displays on 2 chains through the PIO backend with the motor model turning the drums from the latched outputs
+    """
+    print('---------- Parallel Chains ----------')
+    import random
+    rnd = random.Random(seed)
+    print('Shift registers, chains: bit-bang frame ms, PIO frame us')
+    frame_times = {}
+    for count, chain_count in configs:
+        pins_sr = [11, 12] + list(range(16, 16 + chain_count))
+        times = []
+        for output in (ShiftRegisterBitBang, ShiftRegisterPIO):
+            FakePin.pins = {}
+            backend = output(pins_sr, count)
+            chains = HC595Chains(pins_sr, count)
+            sent = [bytes(rnd.randrange(256) for _ in range(count)) for _ in range(frames)]
+            start = clock.ticks_us()
+            for data in sent:
+                backend.write(data)
+            if output is ShiftRegisterBitBang:
+                times.append((clock.ticks_us() - start) / frames / 1000)
+                pad_bits = 0
+            else:
+                times.append(backend.sm.frame_us)
+                pad_bits = backend._pad * (8 // backend._groups)
+            assert chains.frames == sent, (output.__name__, count, chain_count)
+            for chain in range(chain_count):
+                expected = [bit for data in sent for bit in chain_stream(data, chain, chain_count, count, pad_bits)]
+                assert chains.bits[chain] == expected, (output.__name__, count, chain_count, chain)
+        frame_times[count, chain_count] = times
+        print(f'{count}, {chain_count}: {times[0]:.1f} ms, {times[1]:.1f} us')
+
+    # Same chain length = same frame time
+    assert frame_times[3, 1] == frame_times[8, 3]
+    assert frame_times[3, 2] == frame_times[8, 4] == frame_times[16, 8]
+    assert frame_times[8, 2] == frame_times[16, 4]
+
+    # SPI has a single data output
+    try:
+        ShiftRegisterSPI([11, 12, 16, 17], 4)
+        assert False
+    except ValueError:
+        pass
+
+    # Displays on 2 parallel chains (PIO serial inputs on consecutive pins)
+    FakePin.pins = {}
+    layout = [(k // 2, 1 - k % 2, ['0','1','2','3','4','5','6','7','8','9',',',':','!',' '], ['hour_tens', 'hour_ones', 'minute_tens', 'minute_ones'][k % 4]) for k in range(8)]
+    pins_sr = [11, 12, 16, 17]
+    display = Display(pins_sr, list(range(1, 9)), output=ShiftRegisterPIO, layout=layout)
+    chains = HC595Chains(pins_sr, display.shift_register_count)
+    display.output.listeners = chains.listeners
+    motors = MotorModel(display)
+    for minutes in ((11, 59), (12, 0), (12, 37)):
+        display.display_datetime(dt_tuple(*minutes))
+        assert motors.flaps() == display.flap_value_target
+    print(f'8 displays on 2 chains: {len(chains.frames)} frames latched, flaps {motors.flaps()}')
+
+def drive_modes(transitions=((11, 59), (12, 0), (12, 37), (12, 59), (13, 0), (23, 59), (0, 0))):
+    """
+    Move the display through several transitions in each drive mode (motor model counting half-steps). Every move must
+    land on the target flaps, steps per revolution must follow the mode (half step = 4096). Prints the steps per
+    revolution, average coils energized per motor and the transition and revolution times from drive_mode_stats.
+    Then switches one display between the modes, each switch searches for home and the next moves land on their targets
+    """
+    print('---------- Drive Modes ----------')
+    print('Mode: steps per revolution, coils energized, transition ms, revolution ms')
+    for mode in ('wave', 'full', 'half'):
+        display, motors = create_display(steps_rev=4096, magnet_width=360, half_steps=True)
+        display.set_drive_mode(mode)
+        assert display.steps_rev == [2048 * display.drive_modes[mode][1]] * display.display_count
+        display.output.frames = []
+        for minutes in transitions:
+            display.display_datetime(dt_tuple(*minutes))
+            assert motors.flaps() == display.flap_value_target, (mode, minutes)
+
+        coils = [bin(display_nibble(display, data, i)).count('1') for (_, data) in display.output.frames for i in range(display.display_count)]
+        coils = [c for c in coils if c]
+        stats = display.drive_mode_stats(0)[mode]
+        print(f'{mode}: {stats["steps_rev"]}, {sum(coils) / len(coils):.2f}, {stats["transition_ms"]}, {stats["revolution_ms"]}')
+        assert sum(coils) / len(coils) == {'wave': 1, 'full': 2}.get(mode, sum(coils) / len(coils))
+
+    # Switching modes
+    display, motors = create_display(steps_rev=4096, magnet_width=360, half_steps=True)
+    for mode, minutes in (('half', (12, 37)), ('wave', (1, 5)), ('full', (13, 59)), ('half', (18, 24))):
+        display.set_drive_mode(mode, 1)
+        assert display.flap_value_current[1] is None
+        display.display_datetime(dt_tuple(*minutes))
+        assert motors.flaps() == display.flap_value_target, (mode, minutes)
+        display.display_datetime(dt_tuple(minutes[0], minutes[1] + 1))
+        assert motors.flaps() == display.flap_value_target, (mode, minutes)
+    print(f'Display 2 modes: {[(mode, stats["moves"]) for mode, stats in display.drive_mode_stats(1).items()]}')
+
+def rate_tuning(max_rate=(900, 1300, 1700, 2100, 2600), moves=200, seed=6):
+    """
+    Run tune_rate with a motor model that loses steps above a different rate for each display. The tuned max rate of each
+    display must be below its limit (margin included) and within 20% of it, then random moves at the tuned rates must
+    land on their targets without a single lost step. Prints the tuned rates, tuning time and the transition time gained
+    """
+    print('---------- Rate Tuning ----------')
+    import random
+    from calibration import Calibration
+    rnd = random.Random(seed)
+    display, motors = create_display(max_rate=list(max_rate))
+    start = clock.ticks_us()
+    rates = asyncio.run(display.tune_rate())
+    seconds = (clock.ticks_us() - start) / 1_000_000
+    print(f'Limits: {list(max_rate)}, tuned max rates: {rates} in {seconds:.0f} s, steps lost while tuning: {motors.lost}')
+    for i in range(display.display_count):
+        assert 0.8 * 0.85 * max_rate[i] <= rates[i] <= 0.85 * max_rate[i], (i, rates[i])
+
+    # Tuned rates are saved to and loaded from the calibration file
+    cal = Calibration(display.display_count)
+    cal.file = '/tmp/simulate_display_calibration.dat'
+    cal.rate_max = rates
+    cal.write()
+    display, motors = create_display(max_rate=list(max_rate))
+    slow = display.expected_duration_us(0, 2048)
+    cal.read()
+    display.load_calibration(cal)
+    assert [profile[1] for profile in display.profiles] == rates
+
+    display.home_interval = 1_000_000
+    display.display_datetime(dt_tuple(0, 0))
+    for _ in range(moves):
+        display.display_datetime(dt_tuple(rnd.randrange(24), rnd.randrange(60), rnd.randrange(7)))
+        assert motors.flaps() == display.flap_value_target
+    assert sum(motors.lost) == 0 and sum(display.health_counters()['slips']) == 0
+    fast = [display.expected_duration_us(i, 2048) for i in range(display.display_count)]
+    print(f'One revolution: {slow / 1000:.0f} ms with the default profile, {[round(t / 1000) for t in fast]} ms tuned')
+
+def minute_alignment(transitions=(((11, 58), (11, 59)), ((11, 59), (12, 0)), ((12, 36), (12, 37)), ((12, 59), (13, 0)), ((23, 59), (0, 0)))):
+    """
+    Land moves on a time (move_to land_us) as the clock does on each minute boundary. Each display starts its expected
+    duration early, the landing error (land_error_us) must be within land_tolerance_us, also with a current budget.
+    Prints how late the flaps would land if the move started at the boundary instead. Moves that take longer than
+    expected (slow output backend) must be corrected by land_bias_us within a few minutes. Then checks the millisecond
+    minute boundary and next minute of JMBTime against a simulated RTC
+    """
+    print('---------- Minute Alignment ----------')
+    from jmbtime import JMBTime
+
+    print('Transition: move ms, landing error ms (budget none, 2), late by ms if started at the boundary')
+    for start, end in transitions:
+        errors = []
+        for budget in (None, 2):
+            display, motors = create_display()
+            display.max_energized = budget
+            display.display_datetime(dt_tuple(*start))
+            targets = display.datetime_targets(dt_tuple(*end))
+            expected = display.expected_move_us(targets) if budget is None else expected
+            land = time.ticks_add(time.ticks_us(), 10_000_000)
+            asyncio.run(display.move_to(targets, land))
+            assert motors.flaps() == display.flap_value_target
+            assert abs(display.land_error_us) <= display.land_tolerance_us, (start, end, budget, display.land_error_us)
+            errors.append(display.land_error_us / 1000)
+        print(f'{start[0]}:{start[1]:02} > {end[0]}:{end[1]:02}: {expected / 1000:.0f} ms, {errors[0]:.1f} / {errors[1]:.1f} ms, {expected / 1000:.0f} ms late')
+
+    # Slow output: frames take 3 ms to write, slower than the start rate, so moves take longer than expected
+    display, motors = create_display()
+    display.output.write_us = 3000
+    display.display_datetime(dt_tuple(12, 0))
+    errors = []
+    for minute in range(1, 8):
+        land = time.ticks_add(time.ticks_us(), 10_000_000)
+        asyncio.run(display.move_to(display.datetime_targets(dt_tuple(12, minute)), land))
+        errors.append(round(display.land_error_us / 1000))
+    print(f'Slow output landing errors (ms): {errors}, bias {display.land_bias_us // 1000} ms')
+    assert abs(errors[-1]) <= display.land_tolerance_us / 1000 and errors[0] > display.land_tolerance_us / 1000
+
+    # JMBTime: millisecond boundary from the ticks anchor, next minute across the year end (Thursday 1 January 2026)
+    jmbtime = JMBTime(None)
+    jmbtime.set_rtc(2025, 12, 31, 23, 59)
+    clock.sleep_us(12_345_678)
+    asyncio.run(jmbtime.sync_ticks())
+    clock.sleep_us(30_000_000 + 123_000)
+    true_ms = 60_000 - (clock.ticks_us() - FakeRTC.base_us) // 1000 % 60_000
+    assert abs(jmbtime.ms_to_minute() - true_ms) <= 1, (jmbtime.ms_to_minute(), true_ms)
+    assert jmbtime.get_localtime() == (2025, 12, 31, 3, 11, 59, 43, 'PM')
+    assert jmbtime.get_localtime(1) == (2026, 1, 1, 4, 12, 0, 0, 'AM')
+    jmbtime.set_rtc(2025, 1, 5, 9, 0)
+    assert jmbtime.get_localtime()[3] == 0 # Sunday
+    print(f'JMBTime: {jmbtime.ms_to_minute()} ms to the minute after setting the RTC (whole seconds until sync_ticks)')
+
+def position_restore(transitions=((12, 36), (3, 17), (9, 58), (6, 0), (6, 1)), seed=3):
+    """
+    Simulated restarts: the display saves its positions (Positions) around its moves, a new Display created
+    with the same drums (the motor model keeps its positions, hall inputs keep their values) restores them. Prints the
+    cold start time to show the correct time without a positions file (every display searches for home) and with one.
+    Restarts come at random minutes between writes of the positions file (the moves since are in its journal).
+    Displays cut off part way through a move, or turned by hand onto the magnet, must search for home while the others
+    are restored. Every display must land on the exact step of its target flap (the coil phase is restored too)
+    """
+    print('---------- Position Restore ----------')
+    import os
+    import random
+    import tempfile
+    from calibration import Calibration
+    from positions import Positions
+    rnd = random.Random(seed)
+    folder = tempfile.mkdtemp()
+
+    def exact(display, motors):
+        for i in range(display.display_count):
+            home = motors.magnet_start[i] + display.home_reads[i]
+            error = (motors.position[i] - home - display.flap_step(display.flap_value_target[i], i)) % motors.steps_rev[i]
+            assert error == 0, f'Display {i} is {error} steps off'
+
+    def boot(motors, file):
+        """
+        Restart: new Calibration, Positions and Display as main.py creates them, on the motor model's drums
+        """
+        calibration = Calibration(motors.display.display_count)
+        calibration.steps_rev = [2048] * calibration.display_count
+        calibration.magnet_width = list(motors.magnet_width)
+        positions = None
+        if file is not None:
+            positions = attach(Positions(motors.display.display_count))
+        display = Display([15,14,13], list(range(1, motors.display.display_count + 1)), output=ShiftRegisterFake, calibration=calibration, positions=positions)
+        motors.display = display
+        display.output.listeners.append(motors.frame)
+        return display
+
+    def show(display, hour, minute):
+        """
+        Return the milliseconds from the restart to showing the time and the home searches made
+        """
+        homing = display.health_counters()['homing']
+        display.display_datetime(dt_tuple(hour, minute))
+        assert motors.flaps() == display.flap_value_target
+        exact(display, motors)
+        return (clock.ticks_us() - boot_us) / 1000, [a + b for a, b in zip(homing, display.health_counters()['homing'])]
+
+    def attach(positions):
+        positions.file = file
+        positions.journal = journal
+        positions.read()
+        return positions
+
+    def run(display, hour, minute, minutes):
+        """
+        Minute updates from a time for a number of minutes, return the time shown last
+        """
+        for _ in range(minutes):
+            clock.sleep_ms(60_000)
+            hour, minute = (hour + (minute + 1) // 60) % 24, (minute + 1) % 60
+            display.display_datetime(dt_tuple(hour, minute))
+        return hour, minute
+
+    # First start (no positions file yet), then restarts at random minutes between writes of the positions file (the
+    # moves since the last write are in the journal): each from the same drum positions without and with the file
+    display, motors = create_display()
+    file = os.path.join(folder, 'positions.dat')
+    journal = os.path.join(folder, 'moves.dat')
+    print('Restart: time shown, minutes run before the restart (no positions file write since), ms to show it without the positions file (home searches) and restoring the positions')
+    for k, (hour, minute) in enumerate(transitions):
+        if k > 0:
+            minutes = rnd.randrange(1, display.positions_interval_ms // 60_000)
+            run(display, *shown, minutes)
+            assert os.path.getsize(journal) > 0
+        drums = (list(motors.position), list(motors.phase), list(motors._half))
+        boot_us = clock.ticks_us()
+        display = boot(motors, None)
+        cold_ms, homing = show(display, hour, minute)
+        assert all(homing)
+        shown = (hour, minute)
+        if k == 0:
+            display.positions = attach(Positions(display.display_count))
+            display._save_positions(True)
+            continue
+
+        motors.position, motors.phase, motors._half = drums
+        motors._update_hall()
+        boot_us = clock.ticks_us()
+        display = boot(motors, file)
+        restored = [value is not None for value in display.flap_value_current]
+        restore_ms, homing = show(display, hour, minute)
+        assert all(restored) and not any(homing), (restored, homing)
+        assert restore_ms < cold_ms
+        print(f'{hour}:{minute:02} - {minutes} minutes, {cold_ms:.0f} ms, {restore_ms:.0f} ms')
+
+    # Power cut part way through a move: the displays that were moving search for home, the others are restored
+    run(display, *shown, rnd.randrange(1, 60))
+    display.display_datetime(dt_tuple(12, 59))
+    targets = display.datetime_targets(dt_tuple(13, 0))
+    display._mark_moving([display.flap_value_current[i] != targets[i] for i in range(display.display_count)])
+    display._motion_start(targets)
+    for _ in range(5):
+        display._motion_run(display.burst_us)
+    saved = attach(Positions(display.display_count))
+    display = boot(motors, file)
+    restored = [value is not None for value in display.flap_value_current]
+    assert restored == [not moving for moving in saved.moving] and True in restored and False in restored, restored
+    display.display_datetime(dt_tuple(13, 0))
+    assert motors.flaps() == display.flap_value_target
+    exact(display, motors)
+    print(f'Power cut while moving to 1:00 PM: restored {restored}, shown after the restart')
+
+    # Drum turned by hand onto its magnet while the clock was off: the hall sensor disagrees with the saved position
+    k = rnd.randrange(display.display_count)
+    motors.position[k] = motors.magnet_start[k] + motors.magnet_width[k] // 2
+    motors._update_hall()
+    display = boot(motors, file)
+    restored = [value is not None for value in display.flap_value_current]
+    assert restored == [i != k for i in range(display.display_count)], restored
+    display.display_datetime(dt_tuple(13, 1))
+    assert motors.flaps() == display.flap_value_target
+    exact(display, motors)
+    print(f'Display {k} turned onto its magnet: restored {restored}, shown after the restart')
+
+    # A day of minute updates: the positions file is written once an hour, each move adds a record before and after it
+    # to the journal (a short line, the journal is emptied by each write)
+    writes = [0, 0, 0]
+    write = display.positions.write
+    add = display.positions.add
+    def counted_write():
+        writes[0] += 1
+        writes[2] = max(writes[2], os.path.getsize(journal))
+        write()
+    def counted_add(record):
+        writes[1] += 1
+        add(record)
+    display.positions.write = counted_write
+    display.positions.add = counted_add
+    run(display, 13, 1, 1440)
+    assert motors.flaps() == display.flap_value_target
+    exact(display, motors)
+    print(f'Positions in a day of minute updates: {writes[0]} file writes, {writes[1]} journal records (largest journal {writes[2]} bytes)')
+    assert writes[0] <= 24 + 2 and writes[1] <= 2 * 1440 and writes[2] < 4096
+
+if __name__ == '__main__':
+    step_rate_regression()
+    step_loop_benchmark()
+    async_motion()
+    core_motion()
+    wrap_planning()
+    drift()
+    motion_profiles()
+    calibration()
+    hall_edges()
+    slip_detection()
+    current_budget()
+    layout_scaling()
+    parallel_chains()
+    drive_modes()
+    rate_tuning()
+    minute_alignment()
+    position_restore()
@@ -0,0 +1,1032 @@
+# Use this script to run the clock's time code on a computer (CPython 3), no Pico or internet connection required
+#   The fake machine module and clock of simulate_display replace the hardware, stand-in servers on local addresses
+#   (127.0.0.x) replace the internet with injected latency and packet loss
+import asyncio
+import datetime
+import math
+import os
+import random
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from simulate_display import FakeRTC, clock
+
+# Fake network module (the settings page lists the Wi-Fi networks found, WIFI.connect joins the simulated network)
+class FakeWLAN:
+    """
+    Station interface of a simulated Wi-Fi network, timed by the simulated clock: joining an access point takes join_ms,
+    then DHCP takes dhcp_ms (none with static IP settings), connecting by name scans every channel first (scan_ms, as
+    scan() does) and fails with NONET (-2) when no access point matches, a wrong key fails with BADAUTH (-3)
+    """
+    access_points = []  # (ssid, bssid, channel, rssi, key, hidden), hidden networks are not listed by scan()
+    scan_ms = 1500
+    join_ms = 800
+    dhcp_ms = 1200
+    dhcp = ('192.168.1.50', '255.255.255.0', '192.168.1.1', '192.168.1.1')
+    connects = []       # (ssid, bssid) of each connect
+    interfaces = {}     # interface: FakeWLAN, one object per interface as network.WLAN (cleared to simulate a restart)
+
+    def __init__(self, interface):
+        self._events = [(0, 0)]
+        self._static = None
+        self._ifconfig = ('0.0.0.0',) * 4
+    def active(self, active):
+        pass
+    def scan(self):
+        if self.access_points:
+            clock.sleep_ms(self.scan_ms)
+        return [(ssid.encode(), bssid, channel, rssi, 3, 0)
+                for ssid, bssid, channel, rssi, key, hidden in self.access_points if not hidden]
+    def connect(self, ssid, key, bssid=None):
+        FakeWLAN.connects.append((ssid, bssid))
+        start = clock.ticks_us()
+        found = [ap for ap in self.access_points if ap[0] == ssid and (bssid is None or ap[1] == bssid)]
+        joined = start + ((self.scan_ms if bssid is None else 0) + self.join_ms) * 1000
+        if not found:
+            self._events = [(start, 1), (start + self.scan_ms * 1000, -2)]
+        elif found[0][4] != key:
+            self._events = [(start, 1), (joined, -3)]
+        else:
+            self._events = [(start, 1), (joined, 2), (joined + (0 if self._static else self.dhcp_ms * 1000), 3)]
+            self._ifconfig = self._static or self.dhcp
+    def status(self):
+        now = clock.ticks_us()
+        return [status for t, status in self._events if t <= now][-1]
+    def isconnected(self):
+        return self.status() == 3
+    def disconnect(self):
+        self._events = [(0, 0)]
+    def ifconfig(self, settings=None):
+        if settings is None:
+            return self._ifconfig if self.isconnected() else ('0.0.0.0',) * 4
+        self._static = None if settings == 'dhcp' else tuple(settings)
+
+network = types.ModuleType('network')
+network.STA_IF = 0
+network.WLAN = lambda interface: FakeWLAN.interfaces.setdefault(interface, FakeWLAN(interface))
+sys.modules['network'] = network
+
+########## Stand-in Servers
+
+def true_us():
+    """
+    Return the true time (UTC) in microseconds since the NTP epoch (01-Jan-1900), from the computer's clock
+    """
+    return TRUE_BASE_US + int(time.perf_counter() * 1_000_000)
+
+# True time starts at 03-Jun-2025 21:42:31.250 UTC
+TRUE_BASE_US = (45_809 * 86_400 + 21 * 3600 + 42 * 60 + 31) * 1_000_000 + 250_000 - int(time.perf_counter() * 1_000_000)
+
+class NTPStandIn:
+    """
+    Stand-in NTP server on a local address: replies to client requests with its clock (true time plus offset_us) after
+    injected one way latencies, dropping requests and replies at random
+
+    Attributes:
+    address (str) - local address the server listens on (127.0.0.x)
+    offset_us (int) - error of the server's clock
+    latency_ms ((int,int)) - one way latency to the server (request) and back (reply)
+    hold_ms (int) - time between receiving the request and sending the reply (t3 - t2)
+    loss (float) - probability each request and each reply is lost
+    stratum (int) - stratum of the replies (0 = kiss-o'-death, the client must ignore the reply)
+    requests (int) - requests received (including lost)
+    request_times ([float,...]) - time.perf_counter() of each request received
+    """
+
+    def __init__(self, address, port, latency_ms=(20, 20), hold_ms=1, loss=0.0, offset_us=0, stratum=2, seed=1):
+        self.address = address
+        self.latency_ms = latency_ms
+        self.hold_ms = hold_ms
+        self.loss = loss
+        self.offset_us = offset_us
+        self.stratum = stratum
+        self.requests = 0
+        self.request_times = []
+        self._random = random.Random(seed)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((address, port))
+        self.sock.settimeout(0.1)
+        self._running = True
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self):
+        self._running = False
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, client = self.sock.recvfrom(48)
+            except OSError:
+                continue
+            self.requests += 1
+            self.request_times.append(time.perf_counter())
+            if self._random.random() < self.loss:
+                continue
+            threading.Thread(target=self._reply, args=(data, client, self._random.random() < self.loss), daemon=True).start()
+
+    def _reply(self, data, client, lost):
+        time.sleep(self.latency_ms[0] / 1000)
+        t2 = true_us() + self.offset_us
+        time.sleep(self.hold_ms / 1000)
+        reply = bytearray(48)
+        reply[0] = 0x24 # LI 0, version 4, mode 4 (server)
+        reply[1] = self.stratum
+        reply[24:32] = data[40:48]
+        struct.pack_into('!II', reply, 32, *ntp_timestamp(t2))
+        struct.pack_into('!II', reply, 40, *ntp_timestamp(true_us() + self.offset_us))
+        time.sleep(self.latency_ms[1] / 1000)
+        if not lost:
+            self.sock.sendto(reply, client)
+
+class DNSStandIn:
+    """
+    Stand-in DNS server on a local address: answers A queries from its records after an injected latency, a CNAME record
+    first for the hosts of cnames, an error (name does not exist) for other hosts
+
+    Attributes:
+    address (str) - local address the server listens on (127.0.0.x)
+    port (int) - UDP port of the server
+    records (dict) - host: (address, ttl)
+    cnames (dict) - host: (canonical host, ttl), the address is the record of the canonical host
+    latency_ms (int) - time between receiving the query and sending the answer
+    silent (bool) - True to ignore the queries (the DNS server is down)
+    queries (int) - queries received
+    """
+
+    def __init__(self, address, port, records, cnames=None, latency_ms=40):
+        self.address = address
+        self.port = port
+        self.records = records
+        self.cnames = cnames or {}
+        self.latency_ms = latency_ms
+        self.silent = False
+        self.queries = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((address, port))
+        self.sock.settimeout(0.1)
+        self._running = True
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self):
+        self._running = False
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, client = self.sock.recvfrom(512)
+            except OSError:
+                continue
+            self.queries += 1
+            if not self.silent:
+                threading.Thread(target=self._reply, args=(data, client), daemon=True).start()
+
+    def _reply(self, data, client):
+        time.sleep(self.latency_ms / 1000)
+
+        # Question name (labels up to the zero length), type and class
+        end = 12
+        while data[end] != 0:
+            end += data[end] + 1
+        question = data[12:end + 5]
+        labels = []
+        pos = 12
+        while data[pos] != 0:
+            labels.append(data[pos + 1:pos + 1 + data[pos]].decode())
+            pos += data[pos] + 1
+        host = '.'.join(labels)
+
+        answers = b''
+        name = b'\xc0\x0c'  # pointer to the question name
+        if host in self.cnames:
+            host, ttl = self.cnames[host]
+            target = b''.join(bytes((len(label),)) + label.encode() for label in host.split('.')) + b'\x00'
+            answers += name + struct.pack('!HHIH', 5, 1, ttl, len(target)) + target
+            name = struct.pack('!H', 0xC000 | (12 + len(question) + 12))    # pointer to the canonical name
+        count = 0
+        if host in self.records:
+            address, ttl = self.records[host]
+            answers += name + struct.pack('!HHIH', 1, 1, ttl, 4) + socket.inet_aton(address)
+            count = 2 if name != b'\xc0\x0c' else 1
+        flags = 0x8180 if count else 0x8183     # response, recursion desired and available, error 3 (name does not exist)
+        reply = data[:2] + struct.pack('!HHHHH', flags, 1, count, 0, 0) + question + answers
+        self.sock.sendto(reply, client)
+
+def ntp_timestamp(us):
+    """
+    Return the (seconds, fraction) of an NTP timestamp from microseconds since the NTP epoch
+    """
+    return us // 1_000_000, (us % 1_000_000) * (1 << 32) // 1_000_000
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def start_servers(settings, port=None):
+    """
+    Start a stand-in server on 127.0.0.1, 127.0.0.2, ... for each settings dict (see NTPStandIn), all on the same port
+    """
+    port = port or free_port()
+    return [NTPStandIn(f'127.0.0.{k + 1}', port, seed=k + 1, **options) for k, options in enumerate(settings)], port
+
+async def lag_ticker(results, period_ms=1):
+    """
+    Record the longest delay of a task waking every period_ms (shows how long other code holds the asyncio loop)
+    """
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(period_ms / 1000)
+        now = time.perf_counter()
+        results[0] = max(results[0], (now - last) * 1000 - period_ms)
+        last = now
+
+########## Tests
+
+def ntp_client():
+    """
+    Query stand-in servers with different latencies and a clock that is 3.2 s slow (local clock = true time - 3.2 s).
+    The best sample must come from the server with the shortest round trip, its offset must be within half the delay of
+    the true 3.2 s (within a few milliseconds with equal latencies both ways) and a task waking every millisecond must keep
+    running while waiting for the replies. Then checks packet loss (retries), asymmetric latency (offset error of half the
+    difference), kiss-o'-death and unanswered queries
+    """
+    print('---------- NTP Client ----------')
+    from ntp import NTP
+    local_error = -3_200_000
+    local_us = lambda: true_us() + local_error
+
+    async def query(ntp):
+        lag = [0]
+        ticker = asyncio.create_task(lag_ticker(lag))
+        start = time.perf_counter()
+        sample = await ntp.query(local_us)
+        ticker.cancel()
+        return sample, (time.perf_counter() - start) * 1000, lag[0]
+
+    # Three servers queried at once, the closest gives the best sample
+    servers, port = start_servers([{'latency_ms': (40, 40)}, {'latency_ms': (8, 8)}, {'latency_ms': (90, 90)}])
+    ntp = NTP([server.address for server in servers], port)
+    sample, query_ms, lag_ms = asyncio.run(query(ntp))
+    print('Server: offset ms, round trip ms')
+    for offset, delay, server in ntp.samples:
+        print(f'{server}: {offset / 1000:.1f}, {delay / 1000:.1f}')
+    error = sample[0] + local_error
+    print(f'Best {sample[2]}: offset error {error / 1000:.2f} ms, query {query_ms:.0f} ms, longest delay of a 1 ms task {lag_ms:.1f} ms')
+    assert sample[2] == '127.0.0.2' and abs(error) <= 3000 and len(ntp.samples) == 3
+    assert query_ms < 250 and lag_ms < 20
+    for server in servers:
+        server.close()
+
+    # Packet loss: 40% of requests and replies lost, lost requests are sent again
+    servers, port = start_servers([{'latency_ms': (10, 10), 'loss': 0.4}] * 3)
+    ntp = NTP([server.address for server in servers], port, timeout_ms=200, attempts=8)
+    sample, query_ms, _ = asyncio.run(query(ntp))
+    requests = sum(server.requests for server in servers)
+    print(f'40% loss: {len(ntp.samples)} of 3 servers replied to {requests} requests in {query_ms:.0f} ms, offset error {(sample[0] + local_error) / 1000:.2f} ms')
+    assert sample is not None and abs(sample[0] + local_error) <= 3000 and requests > 3
+    for server in servers:
+        server.close()
+
+    # Asymmetric latency: the offset is off by half the difference, always within half the round trip
+    servers, port = start_servers([{'latency_ms': (5, 45)}])
+    ntp = NTP([servers[0].address], port)
+    sample, _, _ = asyncio.run(query(ntp))
+    error = sample[0] + local_error
+    print(f'Latency 5 ms out, 45 ms back: offset error {error / 1000:.1f} ms (expected -20), round trip {sample[1] / 1000:.1f} ms')
+    assert abs(error + 20_000) <= 5000 and abs(error) <= sample[1] // 2
+    servers[0].close()
+
+    # Kiss-o'-death (stratum 0) from the fastest server is ignored, a server that never replies gives no sample
+    servers, port = start_servers([{'latency_ms': (2, 2), 'stratum': 0}, {'latency_ms': (20, 20)}, {'loss': 1.0}])
+    ntp = NTP([server.address for server in servers], port, timeout_ms=300, attempts=2)
+    sample, query_ms, _ = asyncio.run(query(ntp))
+    print(f'Kiss-o\'-death and silent servers: best {sample[2]}, {len(ntp.samples)} sample(s) in {query_ms:.0f} ms')
+    assert sample[2] == '127.0.0.2' and len(ntp.samples) == 1 and query_ms < 700
+    ntp = NTP([servers[2].address], port, timeout_ms=200, attempts=2)
+    assert asyncio.run(ntp.query(local_us)) is None
+    for server in servers:
+        server.close()
+
+def set_rtc_ntp():
+    """
+    Set the simulated RTC with JMBTime.set_rtc_ntp from stand-in servers (RTC starting at 01-Jan-2021 as after a reset).
+    The local time (New York, daylight saving time in June) must match the true time and the RTC second must start within
+    a few milliseconds of the true second (the ticks anchor carries the sub-second, within 5 ms)
+    """
+    print('---------- Set RTC by NTP ----------')
+    import jmbtime as jmbtime_module
+    global TRUE_BASE_US
+    TRUE_BASE_US = (45_809 * 86_400 + 21 * 3600 + 42 * 60 + 31) * 1_000_000 + 250_000 - int(time.perf_counter() * 1_000_000)
+    from ntp import NTP
+    servers, port = start_servers([{'latency_ms': (15, 15)}, {'latency_ms': (30, 30)}])
+    jmbtime_module.NTP = lambda servers: NTP(servers, port)
+
+    jmbtime = jmbtime_module.JMBTime('EST EDT')
+    jmbtime.ntp_servers = [server.address for server in servers]
+    jmbtime.set_rtc(2021, 1, 1, 0, 0)
+    assert asyncio.run(jmbtime.set_rtc_ntp())
+
+    # RTC (local time) against the true time
+    error = jmbtime._rtc_us() - true_us()
+    #   FakeRTC.base is the time (UTC) the RTC was set to at clock.ticks_us() = FakeRTC.base_us
+    rtc_utc = FakeRTC.base - datetime.datetime(1900, 1, 1)
+    rtc_error = rtc_utc // datetime.timedelta(microseconds=1) + clock.ticks_us() - FakeRTC.base_us - true_us()
+    dt = jmbtime.get_localtime()
+    print(f'RTC set to {dt[0]}-{dt[1]:02}-{dt[2]:02} {dt[4]}:{dt[5]:02}:{dt[6]:02} {dt[7]}, RTC second {rtc_error / 1000:.1f} ms from the true second, anchored clock {error / 1000:.1f} ms')
+    assert dt[:6] == (2025, 6, 3, 2, 5, 42) and dt[7] == 'PM'
+    # The RTC is set when the sleep to the next second ends (a few ms either way on a busy computer), the anchor is exact
+    assert abs(error) <= 5000 and abs(rtc_error) <= 10_000
+    for server in servers:
+        server.close()
+
+class DriftingClock:
+    """
+    True time (UTC) of the simulated clock, for a Pico whose crystal runs fast by drift_ppm plus a daily swing of
+    swing_ppm (temperature): the Pico's clock (RTC and ticks, clock.us) gains on the true time
+
+    Attributes:
+    start_us (int) - true time when the simulated clock was at 0, microseconds since the NTP epoch
+    """
+
+    def __init__(self, start_us, drift_ppm=25.0, swing_ppm=3.0):
+        self.start_us = start_us
+        self.drift_ppm = drift_ppm
+        self.swing_ppm = swing_ppm
+
+    def true_us(self):
+        # Pico clock less what it gained: drift * t plus the integral of swing * sin(2 pi t / day)
+        t = clock.us / 1_000_000
+        gained = self.drift_ppm * t + self.swing_ppm * 86_400 / (2 * math.pi) * (1 - math.cos(2 * math.pi * t / 86_400))
+        return self.start_us + clock.us - int(gained)
+
+class FakeNTP:
+    """
+    NTP client (see ntp.py) answering from a DriftingClock after a 30 ms round trip with an asymmetry of up to +-3 ms,
+    replaces jmbtime.NTP while the simulated clock runs on its own (no network)
+    """
+    true_clock = None
+    queries = 0
+    _random = random.Random(5)
+
+    def __init__(self, servers):
+        self.servers = servers
+
+    async def query(self, local_us):
+        FakeNTP.queries += 1
+        t1 = local_us()
+        await asyncio.sleep_ms(15)
+        true = self.true_clock.true_us() + self._random.randint(-3000, 3000)
+        await asyncio.sleep_ms(15)
+        t4 = local_us()
+        return true - (t1 + t4) // 2, t4 - t1, self.servers[0]
+
+def drift_model():
+    """
+    Runs the clock for 30 days of simulated time with an RTC that gains 25 ppm (about 2 seconds a day) plus a daily swing
+    of 3 ppm, syncing when JMBTime.next_sync says so. Every 10 minutes (and just before each sync) the error of the drift
+    corrected clock against the true time is measured. After the first two days (learning the drift and its daily swing)
+    the error must stay within sync_error_ms, with far fewer syncs than the original hourly sync without correction (also
+    run for comparison). A new JMBTime (restart) must read the drift estimate and sync interval back from the history file.
+    After a power cut (RTC back at 01-Jan-2021) with a failed first sync the sync must be retried after sync_interval_min
+    """
+    print('---------- Drift Model ----------')
+    import jmbtime as jmbtime_module
+    jmbtime_module.NTP = FakeNTP
+    days = 30
+
+    def run(adaptive):
+        jmbtime = jmbtime_module.JMBTime('EST EDT')
+        jmbtime.sync_history.file = os.path.join(tempfile.mkdtemp(), 'sync.dat')
+        jmbtime.sync_history.read()
+        jmbtime.ntp_servers = ('192.0.2.1',)    # an IP address, no DNS lookup
+        if not adaptive:
+            # Original behaviour: no drift estimate, a sync every hour
+            jmbtime._update_drift = lambda *args: None
+
+        clock.us = 0
+        FakeNTP.true_clock = DriftingClock((45_809 * 86_400 + 12 * 3600) * 1_000_000)
+        FakeNTP.queries = 0
+        jmbtime.set_rtc(2021, 1, 1, 0, 0)
+        assert asyncio.run(jmbtime.set_rtc_ntp())
+
+        errors = [[0], [0]] # errors of the first two days, after
+        due_us = clock.us + jmbtime.next_sync() * 1_000_000
+        while clock.us < days * 86_400_000_000:
+            clock.us = min(clock.us + 600_000_000, due_us)
+            if jmbtime.needs_sync():
+                asyncio.run(jmbtime.sync_ticks())
+
+            # Error of the corrected clock (UTC) against the true time
+            error = jmbtime._utc_us() - FakeNTP.true_clock.true_us()
+            errors[clock.us > 2 * 86_400_000_000].append(abs(error))
+
+            if clock.us >= due_us:
+                assert asyncio.run(jmbtime.set_rtc_ntp())
+                due_us = clock.us + jmbtime.next_sync() * 1_000_000
+        return jmbtime, FakeNTP.queries, max(errors[0]) / 1000, max(errors[1]) / 1000
+
+    jmbtime, hourly_syncs, _, hourly_error = run(False)
+    print(f'Hourly sync, no drift correction: {hourly_syncs} syncs in {days} days, largest error {hourly_error:.0f} ms')
+    jmbtime, syncs, learning_error, error = run(True)
+    print(f'Drift model: {syncs} syncs in {days} days, largest error {learning_error:.0f} ms in the first two days, {error:.0f} ms after (target {jmbtime.sync_error_ms} ms)')
+    print(f'Drift estimate {jmbtime.drift_ppm:.2f} ppm (crystal 25 +-3 ppm), sync interval {jmbtime.sync_interval // 60} minutes')
+    assert error <= jmbtime.sync_error_ms and syncs < hourly_syncs // 4
+    assert abs(jmbtime.drift_ppm - 25) < 3
+
+    # Restart: the drift and sync interval are read back, the next sync is due as saved
+    restarted = jmbtime_module.JMBTime('EST EDT')
+    restarted.sync_history.file = jmbtime.sync_history.file
+    restarted.sync_history.read()
+    assert restarted.drift_ppm == jmbtime.drift_ppm and restarted.sync_interval == jmbtime.sync_interval
+    assert restarted.next_sync() == jmbtime.next_sync()
+
+    # Power cut: the RTC is back at 01-Jan-2021 (years before the saved next sync) and the first sync fails, the sync
+    # is retried after sync_interval_min
+    class NoReply(FakeNTP):
+        async def query(self, local_us):
+            await asyncio.sleep_ms(30)
+
+    jmbtime_module.NTP = NoReply
+    restarted = jmbtime_module.JMBTime('EST EDT')
+    restarted.sync_history.file = jmbtime.sync_history.file
+    restarted.sync_history.read()
+    restarted.ntp_servers = jmbtime.ntp_servers
+    restarted.set_rtc(2021, 1, 1, 0, 0)
+    assert not asyncio.run(restarted.set_rtc_ntp())
+    print(f'Power cut, first sync failed: next sync in {restarted.next_sync()} seconds (saved next sync {restarted.sync_history.next_sync - restarted._rtc_us() // 1_000_000} seconds ahead of the RTC)')
+    assert restarted.next_sync() == restarted.sync_interval_min
+    jmbtime_module.NTP = FakeNTP
+def compile_timezones(zones=None):
+    """
+    Compile the time zone database (see build_timezones.py) into the current folder, every zone by default
+    """
+    import zoneinfo
+    import build_timezones
+    return build_timezones.build(zones or zoneinfo.available_timezones(), 'timezones.dat')
+
+def daylight_savings():
+    """
+    Checks the local time of JMBTime (RTC in UTC, transitions cached per year) against CPython's zoneinfo, from the time
+    zone database compiled from the same IANA files (every zone) for the years 2021 (see build_timezones.py) to 2099:
+    - Time zones of the earlier settings page (TimeZones.ALIASES): every hour, the exact second of each transition (the
+      second before and the second of the change, as get_localtime tuples) and set_rtc of every minute from midnight to
+      4:00 AM on each transition day (a time repeated when daylight savings ends is daylight time, a skipped time is
+      standard time, as zoneinfo with fold=0). The transitions of a year must be computed once while its hours are
+      converted in order
+    - Every zone: every day at noon UTC, each second the offset changes (the second before and of the change) and set_rtc
+      every 15 minutes for two hours either side of each change (through 2040)
+    Then the display's view: get_localtime(1) at 1:59 AM gives 1:00 AM (EST) on the day daylight savings ends and 3:00 AM
+    on the day it starts, and the conversion speed with the cached table against working out the rule on every call
+    """
+    print('---------- Daylight Savings ----------')
+    from zoneinfo import ZoneInfo
+    import jmbtime as jmbtime_module
+    from timezones import TimeZones
+    compile_timezones()
+    epoch = datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc)
+    seconds = lambda dt: int((dt - epoch).total_seconds())
+    at = lambda utc: epoch + datetime.timedelta(seconds=utc)
+    years = range(2021, 2100)
+    year_start = lambda year: seconds(datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc))
+
+    def expected(utc, zone):
+        # Local time tuple as get_localtime returns it (weekday 0=Sunday, 12-hour clock)
+        dt = at(utc).astimezone(zone)
+        hr = dt.hour % 12 if dt.hour % 12 != 0 else 12
+        return (dt.year, dt.month, dt.day, (dt.weekday() + 1) % 7, hr, dt.minute, dt.second, 'AM' if dt.hour < 12 else 'PM')
+
+    def check_set_rtc(jmbtime, zone, utc, minutes, step):
+        # set_rtc (local time) of the minutes either side of the local time just before a change of offset
+        before = at(utc - 1).astimezone(zone).replace(tzinfo=None, second=0) + datetime.timedelta(minutes=1)
+        for minute in range(-minutes, minutes, step):
+            local = before + datetime.timedelta(minutes=minute)
+            jmbtime.set_rtc(local.year, local.month, local.day, local.hour, local.minute)
+            assert jmbtime._rtc_us() // 1_000_000 == seconds(local.replace(tzinfo=zone)), (zone, local)
+
+    # Time zones of the earlier settings page, every hour
+    start_time = time.perf_counter()
+    checks = 0
+    for timezone, name in TimeZones.ALIASES.items():
+        zone = ZoneInfo(name)
+        jmbtime = jmbtime_module.JMBTime(timezone)
+        tables = [0]
+        dst_table = jmbtime._dst_table
+        def counted(utc):
+            tables[0] += 1
+            dst_table(utc)
+        jmbtime._dst_table = counted
+
+        transitions = 0
+        for year in years:
+            utc, end = year_start(year), year_start(year + 1)
+            offset = at(utc).astimezone(zone).utcoffset()
+            tables[0] = 0
+            while utc < end:
+                # Offset of every hour
+                zone_offset = at(utc).astimezone(zone).utcoffset()
+                assert jmbtime._utc_offset(utc) == zone_offset.total_seconds(), (timezone, at(utc))
+                checks += 1
+
+                if zone_offset != offset:
+                    # Transition in the last hour: find its second in zoneinfo, JMBTime must change on the same second
+                    low, high = utc - 3600, utc
+                    while high - low > 1:
+                        middle = (low + high) // 2
+                        if at(middle).astimezone(zone).utcoffset() == offset:
+                            low = middle
+                        else:
+                            high = middle
+                    for second in (high - 1, high):
+                        assert jmbtime._localtime(second * 1_000_000) == expected(second, zone), (timezone, at(second))
+                    transitions += 1
+                    offset = zone_offset
+
+                    # Manually setting the time on the day of the transition, midnight to 4:00 AM (local time)
+                    day = at(high).astimezone(zone)
+                    for minute in range(0, 240):
+                        jmbtime.set_rtc(day.year, day.month, day.day, minute // 60, minute % 60)
+                        local = datetime.datetime(day.year, day.month, day.day, minute // 60, minute % 60, tzinfo=zone)
+                        assert jmbtime._rtc_us() // 1_000_000 == seconds(local), (timezone, local)
+                utc += 3600
+
+            # Transitions worked out once for the year (set_rtc converts times in the same year)
+            assert tables[0] == 1, (timezone, year, tables[0])
+        print(f'{timezone} ({name}): {transitions} transitions in {len(years)} years')
+        assert transitions == (2 * len(years) if jmbtime.tz_offset != jmbtime.tz_offset_dst else 0)
+    print(f'{checks:,} hours checked against zoneinfo in {time.perf_counter() - start_time:.0f} s')
+
+    # Every zone: each day at noon UTC and each change of offset of JMBTime (a change at the wrong second or a missing
+    #   one differs from zoneinfo on one side of it or on a day)
+    start_time = time.perf_counter()
+    zones = list(TimeZones().zones())
+    checks = transitions = 0
+    for name in zones:
+        zone = ZoneInfo(name)
+        jmbtime = jmbtime_module.JMBTime(name)
+        for year in years:
+            for day in range(year_start(year) + 43_200, year_start(year + 1), 86_400):
+                assert jmbtime._utc_offset(day) == at(day).astimezone(zone).utcoffset().total_seconds(), (name, at(day))
+                checks += 1
+            jmbtime._dst_table(year_start(year))
+            for utc, _ in jmbtime._year_transitions:
+                for second in (utc - 1, utc):
+                    assert jmbtime._localtime(second * 1_000_000) == expected(second, zone), (name, at(second))
+                if year <= 2040:
+                    check_set_rtc(jmbtime, zone, utc, 120, 15)
+                transitions += 1
+    print(f'{len(zones)} zones: {checks:,} days and {transitions:,} transitions checked against zoneinfo in {time.perf_counter() - start_time:.0f} s')
+
+    # On the display: the next minute at 1:59 AM on the days daylight savings ends (05:59 UTC) and starts (06:59 UTC)
+    jmbtime = jmbtime_module.JMBTime('America/New_York')
+    for utc_dt, shown, next_minute in (
+            (datetime.datetime(2025, 11, 2, 5, 59), (2025, 11, 2, 0, 1, 59, 0, 'AM'), (2025, 11, 2, 0, 1, 0, 0, 'AM')),
+            (datetime.datetime(2026, 3, 8, 6, 59), (2026, 3, 8, 0, 1, 59, 0, 'AM'), (2026, 3, 8, 0, 3, 0, 0, 'AM'))):
+        jmbtime._set_rtc(seconds(utc_dt.replace(tzinfo=datetime.timezone.utc)))
+        asyncio.run(jmbtime.sync_ticks())
+        assert jmbtime.get_localtime()[:6] == shown[:6] and jmbtime.get_localtime(1) == next_minute
+        clock.us += jmbtime.ms_to_minute() * 1000
+        assert jmbtime.get_localtime() == next_minute
+        print(f'{shown[4]}:{shown[5]:02} {shown[7]} on {shown[2]:02}-{shown[1]:02}-{shown[0]} is followed by {next_minute[4]}:{next_minute[5]:02} {next_minute[7]}')
+
+    # Conversion speed: cached transitions against working out the rule on every call
+    utc = seconds(datetime.datetime(2025, 6, 3, tzinfo=datetime.timezone.utc))
+    count = 200_000
+    start_time = time.perf_counter()
+    for k in range(count):
+        jmbtime._utc_offset(utc + k)
+    cached = count / (time.perf_counter() - start_time)
+    start_time = time.perf_counter()
+    for k in range(count // 10):
+        jmbtime._dst_table(utc + k)
+        jmbtime._utc_offset(utc + k)
+    uncached = count // 10 / (time.perf_counter() - start_time)
+    print(f'UTC offsets per second: {cached:,.0f} with the cached table, {uncached:,.0f} working out the rule every call ({cached / uncached:.0f}x)')
+    assert cached > 5 * uncached
+
+
+def timezone_database():
+    """
+    Measures the time zone database: the file size with the zones of zone1970.tab (the default) and with every zone,
+    then for every zone the time to load it (TimeZones.load), the bytes read from the file (the index entries of the
+    binary search and the zone's record) and the bytes held in memory by the zone (tracemalloc, CPython objects are
+    larger than MicroPython's), against reading every zone. Last, the settings page must list every zone (the configured
+    zone selected, a time zone of the earlier settings page as its IANA name)
+    """
+    print('---------- Time Zone Database ----------')
+    import statistics
+    import tracemalloc
+    import timezones as timezones_module
+    from timezones import TimeZones
+    import build_timezones
+
+    # File size
+    for label, zones in (('zone1970.tab', build_timezones.zone1970()), ('every zone', None)):
+        start_time = time.perf_counter()
+        sizes = compile_timezones(zones)
+        build_s = time.perf_counter() - start_time
+        transitions = sum((size - 18) // 6 for size in sizes.values())
+        print(f'{label}: {len(sizes)} zones, {transitions} transitions, {os.path.getsize("timezones.dat"):,} bytes (built in {build_s:.1f} s)')
+
+    # Bytes read: the module's open is replaced by one counting the bytes read
+    class CountingFile:
+        read_bytes = 0
+        def __init__(self, f):
+            self.f = f
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            self.f.close()
+        def seek(self, pos):
+            self.f.seek(pos)
+        def read(self, n):
+            data = self.f.read(n)
+            CountingFile.read_bytes += len(data)
+            return data
+    timezones_module.open = lambda file, mode: CountingFile(open(file, mode))
+
+    zones = list(TimeZones().zones())
+    load_us, read, held = {}, {}, {}
+    tracemalloc.start()
+    for name in zones:
+        CountingFile.read_bytes = 0
+        start = tracemalloc.get_traced_memory()[0]
+        zone = TimeZones().load(name)
+        held[name] = tracemalloc.get_traced_memory()[0] - start
+        read[name] = CountingFile.read_bytes
+        assert zone is not None
+        del zone
+    tracemalloc.stop()
+    del timezones_module.open
+    for name in zones:
+        start_time = time.perf_counter()
+        for _ in range(20):
+            TimeZones().load(name)
+        load_us[name] = (time.perf_counter() - start_time) / 20 * 1_000_000
+
+    # Every zone read at once (e.g. a table of the zones in memory)
+    tracemalloc.start()
+    every = {name: TimeZones().load(name) for name in zones}
+    every_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del every
+
+    for label, values, unit in (('Load time', load_us, 'us'), ('File bytes read', read, 'bytes'), ('Memory held', held, 'bytes')):
+        largest = max(values, key=values.get)
+        print(f'{label}: America/New_York {values["America/New_York"]:,.0f} {unit}, median {statistics.median(values.values()):,.0f} {unit}, largest {values[largest]:,.0f} {unit} ({largest})')
+    print(f'Memory held reading every zone: {every_bytes:,} bytes')
+    assert max(read.values()) < os.path.getsize('timezones.dat') / 10
+
+    # Settings page, the earlier settings page's EST EDT is shown as America/New_York
+    from config import Config
+    from response import Response
+    config = Config()
+    config.ssid = None
+    config.password = None
+    config.ntp_enabled = 1
+    config.timezone = 'EST EDT'
+    config.write()
+    start_time = time.perf_counter()
+    html = Response(5)._get_settings()
+    page_ms = (time.perf_counter() - start_time) * 1000
+    assert html.count('<option') == len(zones) + 1 and '<option selected>America/New_York</option>' in html
+    print(f'Settings page: {len(zones)} zones listed, {len(html):,} characters in {page_ms:.1f} ms')
+    os.remove(config.file)
+
+
+def time_core():
+    """
+    Checks the seconds based time core of JMBTime against CPython's datetime over a 400-year Gregorian cycle (01-Jan-2000
+    to 01-Jan-2400, the calendar repeats every 146,097 days): for every day the ordinal of the date both ways, the local
+    time tuple (UTC, get_localtime) of midnight, a random second of the day and the last second, and the seconds of the
+    RTC datetime tuple (_seconds), first day by day (the cached day) then in random order (a new day every call). Random
+    seconds of a cycle from 2021 (the first year of the time zone database) are checked in New York and Sydney (daylight
+    savings across the new year) against zoneinfo.
+    Then the conversions per second with the cached day against working out the date on every call, and get_localtime
+    calls per second (the minute-tick path, whose values must fit MicroPython's 31-bit small integers)
+    """
+    print('---------- Time Core ----------')
+    from zoneinfo import ZoneInfo
+    import jmbtime as jmbtime_module
+    compile_timezones(['America/New_York', 'Australia/Sydney'])
+    epoch = datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc)
+    rng = random.Random(400)
+
+    def expected(dt):
+        # Local time tuple as get_localtime returns it (weekday 0=Sunday, 12-hour clock)
+        hr = dt.hour % 12 if dt.hour % 12 != 0 else 12
+        return (dt.year, dt.month, dt.day, (dt.weekday() + 1) % 7, hr, dt.minute, dt.second, 'AM' if dt.hour < 12 else 'PM')
+
+    # Every day of the cycle: day by day, then in random order
+    jmbtime = jmbtime_module.JMBTime()
+    first = (datetime.date(2000, 1, 1) - datetime.date(1900, 1, 1)).days
+    days = list(range(first, first + 146_097))
+    start_time = time.perf_counter()
+    for order, days in (('day by day', days), ('random order', rng.sample(days, len(days)))):
+        for day in days:
+            date = datetime.date(1900, 1, 1) + datetime.timedelta(days=day)
+            ordinal = jmbtime._EPOCH_ORDINAL + day
+            assert jmbtime._ordinal(date.year, date.month, date.day) == ordinal and \
+                jmbtime._date_from_ordinal(ordinal) == (date.year, date.month, date.day), date
+            for second in (0, rng.randrange(86_400), 86_399):
+                utc = day * 86_400 + second
+                dt = epoch + datetime.timedelta(seconds=utc)
+                assert jmbtime._localtime(utc * 1_000_000) == expected(dt), dt
+                assert jmbtime._seconds((dt.year, dt.month, dt.day, dt.weekday(), dt.hour, dt.minute, dt.second, 0)) == utc, dt
+    print(f'146,097 days of the 400-year cycle (3 seconds each, day by day and in random order) match datetime in {time.perf_counter() - start_time:.0f} s')
+
+    # Time zones, random seconds of a cycle from 2021
+    first = (datetime.date(2021, 1, 1) - datetime.date(1900, 1, 1)).days
+    for name in ('America/New_York', 'Australia/Sydney'):
+        jmbtime = jmbtime_module.JMBTime(name)
+        zone = ZoneInfo(name)
+        for _ in range(100_000):
+            utc = rng.randrange(first * 86_400, (first + 146_097) * 86_400)
+            dt = (epoch + datetime.timedelta(seconds=utc)).astimezone(zone)
+            assert jmbtime._localtime(utc * 1_000_000) == expected(dt), (name, dt)
+    print('100,000 random seconds of 2021 to 2421 match zoneinfo in America/New_York and Australia/Sydney')
+
+    # Conversions per second: a second at a time through a day, the cached day against the date worked out every call
+    jmbtime = jmbtime_module.JMBTime('America/New_York')
+    utc = (datetime.datetime(2025, 6, 3, 4, tzinfo=datetime.timezone.utc) - epoch).days * 86_400 + 4 * 3600
+    count = 86_400
+    start_time = time.perf_counter()
+    for k in range(count):
+        jmbtime._localtime((utc + k) * 1_000_000)
+    cached = count / (time.perf_counter() - start_time)
+    start_time = time.perf_counter()
+    for k in range(count):
+        jmbtime._utc_day = None
+        jmbtime._localtime((utc + k) * 1_000_000)
+    uncached = count / (time.perf_counter() - start_time)
+    print(f'Conversions per second: {cached:,.0f} with the cached day, {uncached:,.0f} working out the date every call ({cached / uncached:.1f}x)')
+    assert cached > 1.5 * uncached
+
+    # get_localtime: RTC read, drift correction, offset and conversion (the simulated RTC is slower than the Pico's)
+    jmbtime._set_rtc(utc)
+    asyncio.run(jmbtime.sync_ticks())
+    start_time = time.perf_counter()
+    for _ in range(count):
+        jmbtime.get_localtime()
+    print(f'get_localtime calls per second: {count / (time.perf_counter() - start_time):,.0f}')
+
+    # The minute tick keeps small integers on the Pico (31 bits): the day and milliseconds of the day, not seconds since 1900
+    small = lambda *values: all(-2 ** 30 <= value < 2 ** 30 for value in values)
+    assert small(jmbtime._utc_ms(), jmbtime._rtc_day, jmbtime._anchor_ms, jmbtime._anchor_day, jmbtime.ms_to_minute())
+    assert small(*(t for t, _ in jmbtime._day_transitions))
+
+
+def dns_cache():
+    """
+    Syncs with JMBTime.set_rtc_ntp through the DNS cache: three stand-in NTP servers named 0.ntp.test, 1.ntp.test and
+    2.ntp.test (1.ntp.test a CNAME with a shorter time to live) answered by a stand-in DNS server 40 ms away. The time from
+    the start of the sync to the first NTP request and the DNS queries of each sync are printed with the cache counters:
+    - First sync (empty cache, RTC not set): every server looked up before the requests, the address expires the time to
+      live after the NTP time the sync set (the shortest of the CNAME and A records)
+    - Sync within the time to live: every address a hit, no DNS queries, the first request sent at once
+    - Sync after the addresses expired: stale addresses used at once and looked up alongside the requests (0.ntp.test
+      moved to another server, the next sync must use the new address)
+    - Restart (RTC back at 01-Jan-2021, the cache read from dns.dat): every address stale, the first request sent at once
+    - Addresses expired more than max_stale ago: looked up first again
+    - DNS server down with expired addresses: the stale addresses are kept and the sync still works
+    Last, a host the DNS server does not know gives no address without waiting for the timeout
+    """
+    print('---------- DNS Cache ----------')
+    import jmbtime as jmbtime_module
+    global TRUE_BASE_US
+    TRUE_BASE_US = (45_809 * 86_400 + 21 * 3600 + 42 * 60 + 31) * 1_000_000 + 250_000 - int(time.perf_counter() * 1_000_000)
+    from dns import DNS
+    from ntp import NTP
+    compile_timezones(['America/New_York'])
+    servers, port = start_servers([{'latency_ms': (5, 5)}] * 4)
+    hosts = ('0.ntp.test', '1.ntp.test', '2.ntp.test')
+    dns = DNSStandIn('127.0.0.9', free_port(),
+        {'0.ntp.test': ('127.0.0.1', 120), 'pool-b.ntp.test': ('127.0.0.2', 120), '2.ntp.test': ('127.0.0.3', 120)},
+        {'1.ntp.test': ('pool-b.ntp.test', 30)})
+    jmbtime_module.NTP = lambda servers: NTP(servers, port)
+    jmbtime_module.DNS = lambda: DNS(dns.address, dns.port)
+    if os.path.exists('dns.dat'):
+        os.remove('dns.dat')
+
+    def sync(jmbtime, label):
+        # set_rtc_ntp, returns the counters of the sync and the milliseconds to the first NTP request
+        before = dict(jmbtime.dns_cache.counters)
+        queries = dns.queries
+        for server in servers:
+            server.request_times = []
+        start = time.perf_counter()
+        assert asyncio.run(jmbtime.set_rtc_ntp())
+        first_ms = (min(t for server in servers for t in server.request_times) - start) * 1000
+        counts = {name: jmbtime.dns_cache.counters[name] - before[name] for name in before}
+        print(f'{label}: first NTP request after {first_ms:.1f} ms, {dns.queries - queries} DNS queries, {counts}')
+        return counts, first_ms, dns.queries - queries
+
+    def expire(jmbtime, seconds):
+        for entry in jmbtime.dns_cache.entries.values():
+            entry[1] -= seconds
+
+    jmbtime = jmbtime_module.JMBTime('America/New_York')
+    jmbtime.ntp_servers = hosts
+    jmbtime.set_rtc(2021, 1, 1, 0, 0)
+
+    # First sync, every address looked up (RTC not set, the addresses expire from the time the sync set)
+    counts, first_ms, queries = sync(jmbtime, 'Empty cache')
+    assert counts == {'hits': 0, 'stale': 0, 'misses': 3} and queries == 3 and first_ms >= dns.latency_ms
+    utc = jmbtime._rtc_us() // 1_000_000
+    ttl = {host: entry[1] - utc for host, entry in jmbtime.dns_cache.entries.items()}
+    assert all(-2 <= ttl[host] - expected <= 0 for host, expected in zip(hosts, (120, 30, 120))), ttl
+    assert jmbtime.dns_cache.entries['1.ntp.test'][0] == '127.0.0.2'
+
+    # Within the time to live
+    counts, first_ms, queries = sync(jmbtime, 'Within the time to live')
+    assert counts == {'hits': 3, 'stale': 0, 'misses': 0} and queries == 0 and first_ms < 10
+
+    # Expired: used at once and looked up again, 0.ntp.test moves to 127.0.0.4
+    dns.records['0.ntp.test'] = ('127.0.0.4', 120)
+    expire(jmbtime, 121)
+    counts, first_ms, queries = sync(jmbtime, 'Expired (stale)')
+    assert counts == {'hits': 0, 'stale': 3, 'misses': 0} and queries == 3 and first_ms < 10
+    assert servers[0].request_times and not servers[3].request_times
+    assert jmbtime.dns_cache.entries['0.ntp.test'][0] == '127.0.0.4'
+    assert min(entry[1] for entry in jmbtime.dns_cache.entries.values()) > jmbtime._rtc_us() // 1_000_000
+
+    # Restart: the RTC is back at 01-Jan-2021 and the cache is read from the file
+    jmbtime = jmbtime_module.JMBTime('America/New_York')
+    jmbtime.ntp_servers = hosts
+    jmbtime.set_rtc(2021, 1, 1, 0, 0)
+    counts, first_ms, queries = sync(jmbtime, 'Restart (RTC not set)')
+    assert counts == {'hits': 0, 'stale': 3, 'misses': 0} and first_ms < 10 and servers[3].request_times
+
+    # Expired more than max_stale ago
+    expire(jmbtime, jmbtime.dns_cache.max_stale + 200)
+    counts, first_ms, queries = sync(jmbtime, 'Expired more than max_stale ago')
+    assert counts == {'hits': 0, 'stale': 0, 'misses': 3} and queries == 3 and first_ms >= dns.latency_ms
+
+    # DNS server down, the stale addresses are kept
+    dns.silent = True
+    expire(jmbtime, 121)
+    entries = {host: list(entry) for host, entry in jmbtime.dns_cache.entries.items()}
+    counts, first_ms, queries = sync(jmbtime, 'DNS server down')
+    assert counts == {'hits': 0, 'stale': 3, 'misses': 0} and first_ms < 10 and jmbtime.dns_cache.entries == entries
+    dns.silent = False
+
+    print(f'Cache counters (dns.dat): {jmbtime.dns_cache.counters}')
+
+    # Unknown host: an error reply, no waiting for the timeout
+    start = time.perf_counter()
+    assert asyncio.run(DNS(dns.address, dns.port).query(['unknown.test'])) == {}
+    assert time.perf_counter() - start < 0.5
+
+    for server in servers + [dns]:
+        server.close()
+
+def wifi_reconnect():
+    """
+    Connects with WIFI.connect to the simulated Wi-Fi network (FakeWLAN: a scan takes 1.5 s, joining an access point
+    0.8 s and DHCP 1.2 s of the simulated clock) through the Wi-Fi cache (wifi.dat). The time to connect of each attempt
+    is printed:
+    - First connect (no wifi.dat): full path, the scan finds the strongest of the network's two access points
+    - Reconnect within the lease: fast path, the cached access point with the cached IP address (no DHCP)
+    - Still connected with the cached IP address after the lease (no restart, the interface keeps its settings): the
+      lease has expired (see WIFI.lease_expired), the reconnect gets the IP settings from DHCP again
+    - Reconnect after the lease: fast path with DHCP, the IP settings are cached again
+    - Restart with the RTC back at 01-Jan-2021: the age of the lease is not known, fast path with DHCP
+    - Cached access point replaced: the fast path fails (NONET) and the full path finds the new one
+    - Another network configured: full path, a hidden network is joined by name
+    - Wrong password: both paths fail (BADAUTH) and the error is logged
+    The status is checked every poll_ms (50 ms), so each time is at most poll_ms after the connection. wifi.dat must only
+    be written when the access point or IP settings change
+    """
+    print('---------- Wi-Fi Reconnect ----------')
+    import wifi as wifi_module
+    from config import Config
+    from log import Log
+    from wifi import WIFI
+    from wificache import WIFICache
+    for file in ('wifi.dat', 'log.dat'):
+        if os.path.exists(file):
+            os.remove(file)
+    home_a = bytes.fromhex('02a0b0c0d001')
+    home_b = bytes.fromhex('02a0b0c0d002')
+    home_c = bytes.fromhex('02a0b0c0d003')
+    FakeWLAN.access_points = [
+        ('Home', home_a, 6, -55, 'secret', False),
+        ('Home', home_b, 11, -72, 'secret', False),
+        ('Neighbour', bytes.fromhex('02f0f0f0f001'), 1, -40, 'other', False),
+        ('Workshop', bytes.fromhex('02e0e0e0e001'), 3, -65, 'tools', True)]
+    now = [1_700_000_000]
+    wifi_module.time = lambda: now[0]
+    config = Config()
+    config.ssid = 'Home'
+    config.password = 'secret'
+    config.ntp_enabled = 1
+    config.timezone = 'America/New_York'
+    config.write()
+    log = Log()
+
+    # Writes of wifi.dat (only when the access point or IP settings change)
+    writes = [0]
+    write = WIFICache.write
+    def counted_write(cache):
+        writes[0] += 1
+        write(cache)
+    WIFICache.write = counted_write
+    history = []
+
+    def connect(label, expected, result='Success', wifi=None, written=False):
+        # Connects with a new WIFI object and interface (as after a restart, the cache is read from wifi.dat) unless a WIFI
+        #   object is given, returns the WIFI object
+        if wifi is None:
+            FakeWLAN.interfaces.clear()
+            wifi = WIFI()
+        FakeWLAN.connects = []
+        before = writes[0]
+        assert asyncio.run(wifi.connect(log)) == result
+        attempts = wifi.cache.attempts[len(wifi.cache.attempts) - len(expected):]
+        history.extend(attempts)
+        print(f'{label}: ' + ', '.join(f'{path} {ms:,} ms (status {status})' for path, ms, status in attempts) + (', wifi.dat written' if writes[0] > before else ''))
+        assert (writes[0] > before) == written, label
+        for (path, ms, status), (expected_path, expected_ms, expected_status) in zip(attempts, expected):
+            assert path == expected_path and status == expected_status, attempts
+            assert expected_ms <= ms < expected_ms + wifi.poll_ms, attempts
+        return wifi
+
+    # First connect, the strongest access point of the network
+    wifi = connect('First connect', [('scan', 3500, 3)], written=True)
+    assert FakeWLAN.connects == [('Home', home_a)]
+    assert (wifi.cache.ssid, wifi.cache.bssid, wifi.cache.channel) == ('Home', home_a.hex(), 6)
+    assert wifi.cache.ifconfig == list(FakeWLAN.dhcp) and wifi.cache.saved == now[0]
+
+    # Within the lease, the cached IP address is set before joining
+    now[0] += 600
+    wifi = connect('Within the lease', [('fast', 800, 3)])
+    assert FakeWLAN.connects == [('Home', home_a)] and wifi.wlan.ifconfig() == FakeWLAN.dhcp
+    assert wifi.static and wifi.wlan._static is not None and wifi.cache.saved == now[0] - 600 and not wifi.lease_expired()
+
+    # Still connected after the lease: connect again (as setdt_mode), the interface goes back to DHCP
+    now[0] += wifi.lease_s
+    assert wifi.lease_expired()
+    wifi.wlan.disconnect()
+    wifi = connect('Connected past the lease', [('fast', 2000, 3)], wifi=wifi)
+    assert not wifi.static and wifi.wlan._static is None and wifi.cache.saved == now[0] and not wifi.lease_expired()
+
+    # After the lease, DHCP
+    now[0] += wifi.lease_s
+    wifi = connect('After the lease', [('fast', 2000, 3)])
+    assert wifi.cache.saved == now[0]
+
+    # Restart, the RTC is behind the time the lease was given
+    now[0] = 1_609_459_200
+    wifi = connect('Restart (RTC not set)', [('fast', 2000, 3)])
+    assert wifi.cache.saved == now[0]
+
+    # Cached access point replaced, the new one is found by a scan
+    FakeWLAN.access_points[0] = ('Home', home_c, 6, -58, 'secret', False)
+    wifi = connect('Access point replaced', [('fast', 1500, -2), ('scan', 3500, 3)], written=True)
+    assert FakeWLAN.connects == [('Home', home_a), ('Home', home_c)] and wifi.cache.bssid == home_c.hex()
+
+    # Another network, hidden (joined by name)
+    config.ssid = 'Workshop'
+    config.password = 'tools'
+    config.write()
+    wifi = connect('Hidden network', [('ssid', 5000, 3)], written=True)
+    assert FakeWLAN.connects == [('Workshop', None)] and wifi.cache.ssid == 'Workshop' and wifi.cache.bssid is None
+    config.ssid = 'Home'
+    config.password = 'secret'
+    config.write()
+    connect('Back to the first network', [('scan', 3500, 3)], written=True)
+    wifi = connect('Reconnect', [('fast', 800, 3)])
+
+    # Wrong password
+    config.password = 'wrong'
+    config.write()
+    wifi = connect('Wrong password', [('fast', 800, -3), ('scan', 2300, -3)], 'Failure')
+    assert wifi.cache.bssid == home_c.hex()
+    assert 'CYW43_LINK_BADAUTH' in log.read()
+
+    fast = [ms for path, ms, status in history if path == 'fast' and status == 3]
+    full = [ms for path, ms, status in history if path != 'fast' and status == 3]
+    print(f'Time to connect: fast path {min(fast):,}-{max(fast):,} ms, full path {min(full):,}-{max(full):,} ms')
+    assert max(fast) < min(full)
+    WIFICache.write = write
+    FakeWLAN.access_points = []
+    os.remove(config.file)
+
+if __name__ == '__main__':
+    # Log and history files are written to a temporary folder
+    os.chdir(tempfile.mkdtemp())
+    timezone_database()
+    daylight_savings()
+    time_core()
+    drift_model()
+    wifi_reconnect()
+    clock.real = True
+    ntp_client()
+    set_rtc_ntp()
+    dns_cache()
@@ -0,0 +1,118 @@
+import json
+
+class Calibration:
+    """
+    Handles interaction with the calibration file (measured values of each split-flap display)
+
+    Properties:
+
+    file (str) - name of the calibration file
+
+    display_count (int) - number of split-flap displays
+
+    steps_rev ([int,...]) - steps per drum revolution of each display, measured between hall sensor edges (None = not calibrated)
+
+    magnet_width ([int,...]) - steps each display's hall sensor reads the magnet (None = not calibrated)
+
+    home_reads ([int,...]) - steps from the first magnet read to flap 0 of each display (None = default, see get_home_reads)
+
+    drive_mode ([str,...]) - stepper drive mode of each display (wave, full or half), the values above are steps of this mode
+
+    rate_max ([int,...]) - fastest step rate of each display found by Display.tune_rate, steps per second (None = Display default)
+
+    Methods:
+
+    read() - Read values in from calibration file
+
+    write() - Write current values to calibration file
+
+    is_calibrated() - True if every display has a measured steps per revolution
+
+    set_drive_mode(display_index, mode) - Change the drive mode of a display, its values are converted to steps of the new mode
+
+    get_home_reads(display_index) - Home offset of a display, the default in steps of its drive mode if not set
+    """
+
+    # Drive Modes - (stride through the seq table, steps per full step) of each stepper drive mode (see Display.drive_modes)
+    drive_modes = {'wave': (2, 1), 'full': (2, 1), 'half': (1, 2)}
+
+    # Home Reads Default - steps from the first magnet read to flap 0 in full steps (home offset not set)
+    home_reads_default = 90
+
+    def __init__(self, display_count):
+        """
+        Setup the calibration object
+
+        display_count (int) - number of split-flap displays (Display.display_count, from its layout)
+        """
+        self.file = "calibration.dat"
+        self.display_count = display_count
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the calibration file. If file doesn't exist, values are set to None
+        """
+        self.steps_rev = [None] * self.display_count
+        self.magnet_width = [None] * self.display_count
+        self.home_reads = [None] * self.display_count
+        self.drive_mode = ['full'] * self.display_count
+        self.rate_max = [None] * self.display_count
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            for i, display in enumerate(settings['displays'][:self.display_count]):
+                self.steps_rev[i] = display.get('steps_rev', None)
+                self.magnet_width[i] = display.get('magnet_width', None)
+                self.home_reads[i] = display.get('home_reads', None)
+                self.drive_mode[i] = display.get('drive_mode', 'full')
+                self.rate_max[i] = display.get('rate_max', None)
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def write(self):
+        """
+        Write values to the calibration file
+        """
+        settings = {
+            'displays' : [{
+                'steps_rev' : self.steps_rev[i],
+                'magnet_width' : self.magnet_width[i],
+                'home_reads' : self.home_reads[i],
+                'drive_mode' : self.drive_mode[i],
+                'rate_max' : self.rate_max[i]
+            } for i in range(self.display_count)]
+        }
+        with open(self.file, 'w') as f:
+            json.dump(settings, f)
+
+    def is_calibrated(self):
+        """
+        Return True if every display has a measured steps per revolution
+        """
+        return None not in self.steps_rev
+
+    def set_drive_mode(self, display_index, mode):
+        """
+        Change the drive mode of a display, its measured values, home offset and rate are converted to steps of the new mode
+
+        display_index (int) - index of the display
+        mode (str) - drive mode: wave, full or half
+        """
+        steps_full_old = self.drive_modes[self.drive_mode[display_index]][1]
+        steps_full = self.drive_modes[mode][1]
+        for values in (self.steps_rev, self.magnet_width, self.home_reads, self.rate_max):
+            if values[display_index] is not None:
+                values[display_index] = values[display_index] * steps_full // steps_full_old
+        self.drive_mode[display_index] = mode
+
+    def get_home_reads(self, display_index):
+        """
+        Return the home offset of a display, home_reads_default converted to steps of its drive mode if not set
+
+        display_index (int) - index of the display
+        """
+        if self.home_reads[display_index] is not None:
+            return self.home_reads[display_index]
+        return self.home_reads_default * self.drive_modes[self.drive_mode[display_index]][1]
@@ -1,22 +1,52 @@
 # Used to display the desired date time
 # Do not use asyncio to sleep for stepper motor
 #   Requires microseconds, it doesn't appear this is recommended or possible with asyncio sleep/sleep_ms
-# Flap Count Modify - this tag in code indicates a line of code that can be modified when testing fewer then 5 displays
+#   move_to steps in short bursts (burst_us) using sleep_us and yields to the asyncio loop between bursts
+#   or, after start_core(), hands the targets to a step generator running on core 1 (_thread)
+# Layout - the displays, their shift register outputs and flaps are described by a layout table (see Display.__init__),
+#   pass a shorter layout when testing fewer than 5 displays or a longer one for more displays (e.g. seconds, date)
+from array import array
+import asyncio
+from calibration import Calibration
 from machine import Pin
-from time import sleep_us
+import _thread
+from shiftregister import ShiftRegisterBitBang
+from time import sleep_ms, sleep_us, ticks_add, ticks_diff, ticks_ms, ticks_us
 
 class Display:
     """
     Class for displaying desired digits
 
     Methods:
-    display_datetime() - sets the split-flap displays to display the date and time
+    display_datetime(dt) - sets the split-flap displays to display the date and time (blocking)
+    datetime_targets(dt) - returns the target flap index of each display for a date and time
+    move_to(targets) - async, rotates the displays to the target flaps while letting other asyncio tasks run
+    cancel() - cancels the current move_to
+    start_core() - runs the step generator on core 1, move_to then waits on a mailbox (stop_core() to end)
+    progress() - returns the progress of the current move (0.0 - 1.0)
+    expected_steps(targets) - returns the expected steps for each display to reach the targets
+    flap_step(flap, display_index) - returns the step position of a flap past Home
+    calibrate() - async, measures the steps per revolution and magnet width of each display from its hall sensor
+    load_calibration(calibration) - uses the measured values of a Calibration (calibration.py)
+    restore_positions() - restores the flap positions saved before the last shutdown (positions.py), checked by the hall sensors
+    hall_edges() - returns the hall sensor edges captured by the pin IRQs since the last call
+    health_counters() - returns the health counters of each display since the last call (see health.py)
+    set_profile(rate_start, rate_max, accel) - sets the acceleration profile of the stepper motors
+    set_drive_mode(mode) - sets the stepper drive mode (wave, full or half step)
+    drive_mode_stats(display_index) - returns the steps per revolution and measured transition times of each drive mode
+    tune_rate() - finds the fastest step rate of each display without lost steps and uses it as its max rate (async)
+    expected_duration_us(display_index, steps) - returns the time a display takes to move a number of steps
 
     Components:
         Stepper Motor (28BYJ-48)
         Driver Board (ULN2003)
         Hall effect sensor (A3144)
         8-bit Serial-In Parellel-Out (SIPO) Shift Register (74HC595)
+
+    Output Backends (shiftregister.py):
+        ShiftRegisterBitBang - original software clocked output (default, works on any pins)
+        ShiftRegisterSPI - hardware SPI (clock and serial must be on SPI pins)
+        ShiftRegisterPIO - PIO state machine (any pins)
     
     Pin Configuration:
         Stepper Motor connects to Driver Board
@@ -33,6 +63,8 @@ class Display:
             12 RCLK "latch" (storage register clock) - GPIO (all shift registers use the same pin)
             13 OE (output enable) - Ground
             14 SER (serial input) - GPIO (first shift register goes to Pico pin, remaining are daisy chained)
+                Parallel chains: the first shift register of each chain goes to its own Pico pin (shift registers are
+                numbered chain by chain in the layout)
             16 VCC - SysBus 5 volts
             Note: SysBus 5 Volts - used for simplicity since Driver Boards are connected to this
                 Assumes Pico W is powered by USB
@@ -42,9 +74,10 @@ class Display:
             GND (-) > Ground pin
             VC (+) > SysBus (5v)
             IN > Any GPIO - use Pin.PULL_UP
+            Edges are captured by pin IRQs (falling = first magnet read, rising = first read off the magnet)
     """
 
-    def __init__(self, pins_sr, pins_hall):
+    def __init__(self, pins_sr, pins_hall, output=ShiftRegisterBitBang, calibration=None, layout=None, positions=None):
         """
         Initialize the display object
 
@@ -52,124 +85,1516 @@ class Display:
             0 - Clock: Shift Register Clock (pin 11 on shift register)
             1 - Latch: Storage Register Clock (pin 12 on shift register)
             2 - Serial Input (pin 14 on shift register)
+            3... - Serial Input of each additional parallel chain (optional, chains share the clock and latch, see shiftregister.py)
         
         pins_hall ([int,int,...]) - List of Pico GPIO pins the Hall sensors are connected to, 0 = left-most digit
-        """
-        ########## Set Pins
 
-        # Hall Sensors (10)
-        self.pins_hall = [Pin(pin_hall, Pin.IN, Pin.PULL_UP) for pin_hall in pins_hall]
+        output (class) - Shift register output backend class (see shiftregister.py), created as output(pins_sr, shift_register_count)
 
-        # Shift Register
-        self.pin_clock = Pin(pins_sr[0], Pin.OUT)
-        self.pin_latch = Pin(pins_sr[1], Pin.OUT)
-        self.pin_serial = Pin(pins_sr[2], Pin.OUT)
+        calibration (Calibration) - measured values of each display loaded at startup (see calibration.py, default: None = nominal values)
+
+        layout ([(int,int,[str,...],str),...]) - one entry per display, left to right (default: None = the 5 display clock)
+            0 - Shift Register: index of the shift register driving the motor (0 = first in the chain, connected to the Pico,
+                numbered chain by chain with parallel chains)
+            1 - Nibble: 1 = high nibble (outputs QE-QH), 0 = low nibble (outputs QA-QD)
+            2 - Flap Values: flaps of the drum, first value (index: 0) is the Home character
+            3 - Field: part of the date time the display shows (see datetime_targets)
 
+        positions (Positions) - flap positions saved by the last moves, restored at startup, displays are marked as moving
+            before a move and their new flaps recorded after it in the positions journal, the positions file is written
+            at most every positions_interval_ms (see positions.py and _save_positions, default: None = every display
+            searches for home on its first move)
+        """
         ########## Constants
             
         # Array of flaps - first value (index: 0) should be the Home character
         self.flap_values_digit = ['0','1','2','3','4','5','6','7','8','9',',',':','!',' ']
         self.flap_values_dow = ['0-AM','0-PM','1-AM','1-PM','2-AM','2-PM','3-AM','3-PM','4-AM','4-PM','5-AM','5-PM','6-AM','6-PM']
 
-        # Number of split-flap displays
-        self.display_count = 5 # Flap Count Modify
-        self.shift_register_count = 3 # Flap Count Modify
+        # Layout - hours and minutes on the first two shift registers (left display = high nibble), day of week and
+        #   meridiem on the high nibble of the third
+        if layout is None:
+            layout = [
+                (0, 1, self.flap_values_digit, 'hour_tens'),
+                (0, 0, self.flap_values_digit, 'hour_ones'),
+                (1, 1, self.flap_values_digit, 'minute_tens'),
+                (1, 0, self.flap_values_digit, 'minute_ones'),
+                (2, 1, self.flap_values_dow, 'weekday_meridiem')
+            ]
+        self.layout = layout
+
+        # Number of split-flap displays and shift registers (the chain ends with the highest shift register used)
+        self.display_count = len(layout)
+        self.shift_register_count = max(module[0] for module in layout) + 1
+
+        # Flap Values - flaps of each display
+        self.flap_values = [module[2] for module in layout]
 
         # Flap Value Current - the current index of the character displayed (If unknown or not set: None)
         self.flap_value_current = [None] * self.display_count
 
-        # Flap Count - (Added to reduce redundant code: len function calls)
-        self.flap_count = 14
+        # Flap Position - step position of each display past Home (0 to steps_rev[i] - 1), valid when the flap value is known
+        self.flap_position = [0] * self.display_count
+
+        # Flap Count - number of flaps of each display (Added to reduce redundant code: len function calls)
+        self.flap_count = [len(flaps) for flaps in self.flap_values]
+
+        # Seq Table - 4-bit motor pattern of each half-step: wave drive patterns at even indexes, full step at odd
+        #   Each motor steps through its own sequence (phase) by the stride of its drive mode, frames combine the patterns
+        #   of all displays
+        self._seq_table = bytes([1,3,2,6,4,12,8,9])
 
-        # Seq - Motor step sequence (order to set motor pins to rotate motor)
-        #   Index 0 - sequence step
-        #   Index 1 - 0 = no display turns, 1 = right-only, 2 = left-only, 3 = both turn
-        self.seq = [[0,3,48,51],[0,6,96,102],[0,12,192,204],[0,9,144,153]]
+        # Drive Modes - (stride through the seq table, steps per full step) of each stepper drive mode, see set_drive_mode
+        #   wave - one coil energized at a time (1, 2, 4, 8): half the current of full step, less torque
+        #   full - two coils energized (3, 6, 12, 9): most torque, the original sequence
+        #   half - one and two coils in turn (all 8 patterns): twice the steps per revolution (4096), smoother steps
+        #   The table is shared with the calibration values (see calibration.py)
+        self.drive_modes = Calibration.drive_modes
+        self.drive_mode = ['full'] * self.display_count
         
-        # Home Reads - Number of positive magnet reads to set as home position
-        self.home_reads = 90
+        # Home Reads - Number of steps from the first positive magnet read to the home position (flap 0) of each display
+        #   Depends on where the magnet sits on each drum, set per display through the calibration page
+        self.home_reads = [Calibration.home_reads_default] * self.display_count
+
+        # Steps Revolution - number of motor steps for one revolution of the flap drum of each display
+        #   Nominal 2048 for the 28BYJ-48, the gearbox ratio is not exact so calibrate() measures each display
+        self.steps_rev = [2048] * self.display_count
+
+        # Magnet Width - steps each hall sensor reads its magnet (None until measured by calibrate)
+        self.magnet_width = [None] * self.display_count
+
+        # Home Interval - when a target is past Home the display continues forward around the drum, every home_interval
+        #   passes over Home it goes through the home position search instead (1 = always search, as originally written)
+        #   Displays with an unknown position always search for home
+        #   Flap positions are exact steps (see flap_step), so moves do not drift between searches
+        self.home_interval = 24
+        self.home_passes = [0] * self.display_count
+
+        # Max Attempts - attempts to reach the target flaps of a move, expected possibilities for each flap:
+        #   1) already at target (0 attempts)
+        #   2) go to character (1 attempt)
+        #   3) go home > go to character (2 attempts)
+        #   4) Error finding character or home (3+ attempts)
+        self.max_attempts = 3
+
+        # Max Energized - current budget: maximum number of motors with energized coils at the same time (None = no limit)
+        #   Each 28BYJ-48 draws about 240 mA from the 5 V bus while energized. With a budget, the moves of an attempt are
+        #   scheduled longest first (LPT) and a waiting display starts as soon as another display releases its coils
+        self.max_energized = None
+
+        # Slip Tolerance - steps a magnet edge may be away from its expected step before it counts as a slip
+        #   Every time a display passes its magnet outside a home search, the step of the edge is compared with the step
+        #   expected from its position: a slip corrects the position and remaining steps of the move right away
+        self.slip_tolerance = 2
+
+        # Motion Profile - (start rate, max rate, acceleration) of each display in steps per second, see set_profile
+        #   Motors start at the start rate, speed up to the max rate and slow down again before the target
+        #   A slower output backend (bit-bang) simply steps at the rate it can shift a frame
+        self.profiles = [None] * self.display_count
+        self._ramps = [None] * self.display_count
+        self._ramp_sums = [None] * self.display_count
+        self._ramp_last = array('i', [0] * self.display_count)
+        self.set_profile(500, 1000, 2000)
+
+        # Burst - microseconds move_to steps before yielding to the asyncio loop (bounds the lag of other tasks)
+        self.burst_us = 20000
+
+        # Landing - a move given a landing time (move_to land_us) starts each display late enough to take its last step at
+        #   that time (e.g. the minute boundary), from the expected duration of its steps
+        #   land_error_us - last step of the last move minus its landing time (None = no landing time or nothing moved)
+        #   land_bias_us - starts are moved earlier by this when landing errors are larger than land_tolerance_us
+        #   (e.g. time taken to post the move to core 1)
+        self.land_tolerance_us = 20000
+        self.land_bias_us = 0
+        self.land_error_us = None
+        self.last_step_us = 0
+        self._land_us = None
+
+        # Motion status (see move_to)
+        #   motion_status (str) - result of the last move: Success, Canceled, Failure (displays not at target are unknown)
+        self.moving = False
+        self.motion_status = None
+        self.steps_expected = [0] * self.display_count
+        self.steps_taken = 0
+        self.lag_max_us = 0
+        self._cancel = False
+
+        # Core 1 step generator (see start_core)
+        self.core_running = False
+
+        # Positions Interval - milliseconds between writes of the positions file after moves (limits flash writes, like the
+        #   health counters and landing log, the moves in between are recorded in the positions journal), a move started
+        #   from an unknown position is written when it ends
+        self.positions_interval_ms = 3_600_000
+        self._positions_saved_ms = ticks_ms()
+        self._positions_unknown = False
+
+        ########## Set Pins
+
+        # Hall Sensors (10)
+        self.pins_hall = [Pin(pin_hall, Pin.IN, Pin.PULL_UP) for pin_hall in pins_hall]
+
+        # Shift Register
+        self.output = output(pins_sr, self.shift_register_count)
+
+        ########## Step Loop Buffers (allocated once, reused for every step)
+
+        # Steps Remaining - steps left for each display in the current move (see _calculate_steps for values)
+        # Steps Done - steps each display has taken in the current attempt (start of its ramp)
+        self._steps_remaining = array('i', [0] * self.display_count)
+        self._steps_done = array('i', [0] * self.display_count)
+
+        # Step Next - ticks_us when each display takes its next step (or releases its coils once stopped: release = 1)
+        self._step_next = array('i', [0] * self.display_count)
+        self._step_due = bytearray(self.display_count)
+        self._release = bytearray(self.display_count)
+        self._step_event = 0
+
+        # Frame - bytes sent to the shift registers, each display's nibble is updated when it steps
+        #   Register, Shift and Keep - shift register byte of each display, bit shift of its nibble and mask of the other nibble
+        self._frame = bytearray(self.shift_register_count)
+        self._register = bytearray([module[0] for module in layout])
+        self._shift = bytearray([4 if module[1] else 0 for module in layout])
+        self._keep = bytearray([0x0F if module[1] else 0xF0 for module in layout])
+
+        # Phase - last seq table index energized by each motor (7: first step energizes pattern 3), Stride - of its drive mode
+        self._phase = bytearray([7] * self.display_count)
+        self._stride = bytearray([2] * self.display_count)
+        self._active = 0
+
+        # Shared Cadence - displays of a run of ticks where every moving display steps together (see _motion_run) and the
+        #   frames of the run (the sequence repeats every 8 ticks), built when the run starts
+        self._shared = bytearray(self.display_count)
+        self._shared_frames = [bytearray(self.shift_register_count) for _ in range(8)]
+
+        # Queue - displays waiting for the current budget (max_energized) in the order they start, with their planned steps
+        self._queue = bytearray(self.display_count)
+        self._queue_len = 0
+        self._queue_next = 0
+        self._steps_queued = array('i', [0] * self.display_count)
+
+        ########## Hall Sensor Edges (written by the pin IRQs, see _hall_irq)
+
+        # Step Count - steps each display has taken since startup, counted before the frame of the step is written
+        self._step_count = array('i', [0] * self.display_count)
+
+        # Hall Fall/Rise - step count of each display's last falling edge (first magnet read) and rising edge (first read
+        #   off the magnet), -1 = no edge since the home search began
+        # Hall Value - value of each display's last edge (0 = magnet), a glitch that ends before the next step is ignored
+        self._hall_fall = array('i', [-1] * self.display_count)
+        self._hall_rise = array('i', [-1] * self.display_count)
+        self._hall_value = bytearray([pin.value() for pin in self.pins_hall])
+
+        # Edge Ring Buffer - display, value (0 = magnet), step count and ticks_us of the last edge_buffer_size edges
+        #   _edge_index: edges written (IRQ), edges read (hall_edges); edges_dropped counts edges overwritten before being read
+        self.edge_buffer_size = 32 # Power of 2
+        self._edge_display = bytearray(self.edge_buffer_size)
+        self._edge_value = bytearray(self.edge_buffer_size)
+        self._edge_step = array('i', [0] * self.edge_buffer_size)
+        self._edge_ticks = array('i', [0] * self.edge_buffer_size)
+        self._edge_index = array('i', [0, 0])
+        self.edges_dropped = 0
+
+        for i in range(self.display_count):
+            self.pins_hall[i].irq(handler=self._hall_irq(i), trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, hard=True)
+
+        ########## Health Counters (RAM, see health_counters)
+
+        # Moves, Homing (home searches), Slips, Retries (attempts after a failed attempt), Failures (max_attempts exhausted)
+        #   Steps are counted by _step_count
+        self._health_moves = array('i', [0] * self.display_count)
+        self._health_homing = array('i', [0] * self.display_count)
+        self._health_slips = array('i', [0] * self.display_count)
+        self._health_retries = array('i', [0] * self.display_count)
+        self._health_failures = array('i', [0] * self.display_count)
+        self._health_steps = array('i', [0] * self.display_count)
+
+        # Home Step - step count at which each display was last at Home (position 0), Fall Checked - last edge compared
+        self._home_step = array('i', [0] * self.display_count)
+        self._fall_checked = array('i', [-1] * self.display_count)
+
+        # Move Timing - ticks_us each display started its current attempt, microseconds and steps moving since the last
+        #   move ended (added to the statistics of its drive mode, see drive_mode_stats)
+        self._move_start = array('i', [0] * self.display_count)
+        self._move_us = array('i', [0] * self.display_count)
+        self._move_steps = array('i', [0] * self.display_count)
+        self._mode_stats = [{} for _ in range(self.display_count)]
+
+        # Calibration
+        if calibration is not None:
+            self.load_calibration(calibration)
+
+        # Positions (after the calibration, positions saved with other calibrated values are not trusted)
+        self.positions = positions
+        if positions is not None:
+            self.restore_positions()
 
     def display_datetime(self, dt):
         """
-        Rotates the displays to display the desired text
+        Rotates the displays to display the desired text (blocks until the displays stop, see move_to for async)
 
         dt (tuple) - (year, month (1-12), day (1-31), weekday (0-6:Sun-Sat), hour (1-12), min (0-59), sec (0-59), meridiem (AM/PM))
         """
-        # Convert datetime elements to target index
+        self._cancel = False
+        targets = self.datetime_targets(dt)
+        self._mark_moving([self.flap_value_current[i] != targets[i] for i in range(self.display_count)])
+        self._motion_start(targets)
+        while self._motion_run():
+            pass
+        self._motion_stop()
+        self._save_positions()
+
+    def datetime_targets(self, dt):
+        """
+        Return the target flap index of each display for a datetime
+
+        dt (tuple) - (year, month (1-12), day (1-31), weekday (0-6:Sun-Sat), hour (1-12), min (0-59), sec (0-59), meridiem (AM/PM))
+        """
+        # Convert datetime elements to the text of each field (hour without a leading zero, as on a 12-hour clock)
         h = f'{dt[4]:2}'
         m = f'{dt[5]:02}'
-        flap_0 = self.flap_values_digit.index(h[:1])
-        flap_1 = self.flap_values_digit.index(h[1:])
-        flap_2 = self.flap_values_digit.index(m[:1])
-        flap_3 = self.flap_values_digit.index(m[1:])
-        flap_4 = self.flap_values_dow.index(f'{dt[3]}-{dt[7]}') # Flap Count Modify
-        self.flap_value_target = [flap_0,flap_1,flap_2,flap_3,flap_4] # Flap Count Modify
+        s = f'{dt[6]:02}'
+        mo = f'{dt[1]:2}'
+        d = f'{dt[2]:2}'
+        fields = {
+            'hour_tens' : h[:1], 'hour_ones' : h[1:],
+            'minute_tens' : m[:1], 'minute_ones' : m[1:],
+            'second_tens' : s[:1], 'second_ones' : s[1:],
+            'month_tens' : mo[:1], 'month_ones' : mo[1:],
+            'day_tens' : d[:1], 'day_ones' : d[1:],
+            'weekday_meridiem' : f'{dt[3]}-{dt[7]}'
+        }
 
-        # Initialize sequence index (0-3)
-        seq_index = 0
+        # Target index of each display's field in its flaps
+        return [self.flap_values[i].index(fields[self.layout[i][3]]) for i in range(self.display_count)]
 
-        # Set maximum attempts to reach target characters (min of 2), expected possibilities for each flap:
-        #   1) already at target (0 attempts)
-        #   2) go to character (1 attempt)
-        #   3) go home > go to character (2 attempts)
-        #   4) Error finding character or home (3+ attempts)
-        max_attempts = 3
+    async def move_to(self, targets, land_us=None):
+        """
+        Rotates the displays to the target flaps
+            Core 0 (default): steps in bursts of burst_us and yields to the asyncio loop in between
+                The longest time the loop was held by a burst is recorded in lag_max_us
+            Core 1 (see start_core): posts the targets to the core 1 mailbox and waits for the status
+
+        targets ([int,...]) - flap index for each display
+        land_us (int) - ticks_us at which the displays should take their last step (default: None = start right away),
+            the error is recorded in land_error_us
+
+        return (bool) - True if all displays reached their targets, see motion_status for details
+        """
+        if self.core_running:
+            # Wait for core 1 to be idle (a canceled move may still be stopping, its late status must not be read as this
+            #   move's), a canceled move core 1 has not started yet is dropped
+            while True:
+                self._lock.acquire()
+                idle = not self._core_busy
+                if idle:
+                    self._mailbox_targets = None
+                    self._mailbox_status = None
+                self._lock.release()
+                if idle:
+                    break
+                await asyncio.sleep_ms(10)
+
+            # Mark the displays about to move in the positions journal (see _save_positions for the end of the move)
+            self._mark_moving([self.flap_value_current[i] != targets[i] for i in range(self.display_count)])
+
+            # Post the targets to core 1
+            self._lock.acquire()
+            self._cancel = False
+            self._mailbox_targets = (targets, land_us)
+            self._lock.release()
+
+            status = None
+            try:
+                # Wait for core 1 to post the status
+                while status is None:
+                    await asyncio.sleep_ms(10)
+                    self._lock.acquire()
+                    status = self._mailbox_status
+                    self._lock.release()
+            finally:
+                # Awaiting task was canceled, stop core 1
+                if status is None:
+                    self.cancel()
+                else:
+                    self._save_positions()
+
+            return status == 'Success'
+
+        self._cancel = False
+        self._mark_moving([self.flap_value_current[i] != targets[i] for i in range(self.display_count)])
+        self._motion_start(targets, land_us)
+        try:
+            while self._motion_run(self.burst_us):
+                # Sleep while waiting for a display's start (landing time), otherwise just let other tasks run
+                wait = ticks_diff(self._step_event, ticks_us()) // 1000
+                await asyncio.sleep_ms(wait - 1 if wait > 1 else 0)
+        finally:
+            # Always runs, including when the awaiting task is canceled
+            self._motion_stop()
+            self._save_positions()
+
+        return self.motion_status == 'Success'
+
+    def cancel(self):
+        """
+        Cancel the current move_to, displays stop at the next burst and any display not at its target is set to unknown
+        """
+        self._cancel = True
+
+    def start_core(self):
+        """
+        Run the step generator on the second core (core 1), move_to then only exchanges targets and status through a
+        lock-protected mailbox so step timing never competes with the asyncio loop on core 0
+        """
+        if self.core_running:
+            return
+
+        self._lock = _thread.allocate_lock()
+        self._mailbox_targets = None
+        self._mailbox_status = None
+        self._core_busy = False
+        self.core_running = True
+        _thread.start_new_thread(self._core_loop, ())
+
+    def stop_core(self):
+        """
+        Stop the core 1 step generator (after the current move), move_to returns to stepping on core 0
+        """
+        self.core_running = False
+
+    def _core_loop(self):
+        """
+        Core 1: waits for targets in the mailbox, moves the displays and posts the motion status (busy from taking the
+        targets to posting the status, see move_to)
+        """
+        while self.core_running:
+            # Check the mailbox
+            self._lock.acquire()
+            move = self._mailbox_targets
+            self._mailbox_targets = None
+            self._core_busy = move is not None
+            self._lock.release()
+
+            if move is None:
+                sleep_ms(1)
+                continue
+
+            # Move the displays (no bursts needed, nothing else runs on this core)
+            try:
+                self._motion_start(*move)
+                while self._motion_run():
+                    pass
+                status = self._motion_stop()
+            except Exception:
+                # Unexpected error (e.g. invalid targets), reset pins and report a fault
+                self._motion_stop()
+                status = 'Failure'
+
+            # Post the status
+            self._lock.acquire()
+            self._mailbox_status = status
+            self._core_busy = False
+            self._lock.release()
+
+    async def calibrate(self, revolutions=2, rate=None):
+        """
+        Measure each display from its hall sensor edges captured by the pin IRQs (async, steps in bursts of burst_us like move_to)
+            Steps per revolution - steps between the first magnet reads of consecutive revolutions (averaged)
+            Magnet width - steps from the first to the last magnet read
+        Every display turns until it has passed its magnet revolutions + 1 times, then stops at Home (flap 0)
+        Measured values are used right away, save them with a Calibration (calibration.py) to load them at startup
+        Not for use while start_core() is moving the displays
+
+        revolutions (int) - revolutions to average the steps per revolution over (default: 2)
+        rate (int) - steps per second (default: None = slowest start rate of the motion profiles, no acceleration needed)
+
+        return ([[int,int],...]) - [steps_rev, magnet_width] of each display, None if the display did not find its magnet
+        """
+        if rate is None:
+            rate = min(profile[0] for profile in self.profiles)
+        interval = 1_000_000 // rate
+        display_count = self.display_count
+
+        # Hall sensor edges of each display (step counts of the first and last magnet reads)
+        reads_first = [[] for _ in range(display_count)]
+        reads_last = [[] for _ in range(display_count)]
+        steps_done = [0] * display_count
+        steps_home = [0] * display_count
+        step_count = self._step_count
+        self.hall_edges()
+        steps_limit = [(revolutions + 2) * (steps_rev + (steps_rev >> 2)) for steps_rev in self.steps_rev]
+        turning = [True] * display_count
+        frame = self._frame
+        phase = self._phase
+        stride = self._stride
+        seq_table = self._seq_table
+
+        self._mark_moving(turning)
+        self._cancel = False
+        self.moving = True
+        step_next = ticks_us()
+        try:
+            while True in turning and not self._cancel:
+                tick_start = ticks_us()
+                while True in turning and not self._cancel and ticks_diff(ticks_us(), tick_start) < self.burst_us:
+                    # Wait for the next step
+                    wait = ticks_diff(step_next, ticks_us())
+                    if wait > 0:
+                        sleep_us(wait)
+                    step_next = ticks_add(step_next, interval)
+                    if ticks_diff(step_next, ticks_us()) < 0:
+                        step_next = ticks_us()
+
+                    # Next sequence step for every display still turning
+                    for i in range(display_count):
+                        if turning[i]:
+                            step_count[i] += 1
+                            phase[i] = (phase[i] + stride[i]) & 7
+                            nibble = seq_table[phase[i]]
+                        else:
+                            nibble = 0
+                        r = self._register[i]
+                        frame[r] = (frame[r] & self._keep[i]) | (nibble << self._shift[i])
+                    self._bytes_out(frame)
+
+                    for i in range(display_count):
+                        if not turning[i]:
+                            continue
+                        steps_done[i] += 1
+                        if steps_home[i] > 0:
+                            # Advancing from the last magnet read to Home
+                            steps_home[i] -= 1
+                            if steps_home[i] == 0:
+                                turning[i] = False
+                        elif steps_done[i] >= steps_limit[i]:
+                            # Magnet not found within the expected revolutions
+                            turning[i] = False
+
+                    # Record the hall sensor edges (step counts captured by the pin IRQs)
+                    for (i, value, step, _) in self.hall_edges():
+                        if not turning[i] or steps_home[i] > 0:
+                            continue
+                        if value == 0:
+                            # First magnet read
+                            reads_first[i].append(step)
+                            if len(reads_first[i]) > revolutions:
+                                # Advance to Home: home_reads steps past the step of the edge
+                                steps_home[i] = self.home_reads[i] - (step_count[i] - step)
+                                if steps_home[i] <= 0:
+                                    turning[i] = False
+                        elif reads_first[i]:
+                            # Last magnet read was the previous step
+                            reads_last[i].append(step - 1)
+
+                await asyncio.sleep_ms(0)
+        finally:
+            # Hold the last step, then reset pins for next action
+            sleep_us(interval)
+            for r in range(self.shift_register_count):
+                frame[r] = 0
+            self._bytes_out(frame)
+            self.moving = False
+
+        # Measured values, displays are at Home
+        results = []
+        for i in range(display_count):
+            if len(reads_first[i]) <= revolutions or turning[i]:
+                self.flap_value_current[i] = None
+                results.append(None)
+                continue
+
+            widths = [last - first + 1 for (first, last) in zip(reads_first[i], reads_last[i])]
+            self.steps_rev[i] = (reads_first[i][-1] - reads_first[i][0] + revolutions // 2) // revolutions
+            self.magnet_width[i] = sum(widths) // len(widths)
+            self.flap_value_current[i] = 0
+            self.flap_position[i] = 0
+            self.home_passes[i] = 0
+            self._home_step[i] = reads_first[i][-1] + self.home_reads[i]
+            self._fall_checked[i] = self._hall_fall[i]
+            results.append([self.steps_rev[i], self.magnet_width[i]])
+        self._save_positions(True)
+
+        return results
+
+    async def tune_rate(self, rate_limit=3000, factor=1.25, refine=3, margin=0.85):
+        """
+        Find the fastest step rate of each display that loses no steps and use it (with a safety margin) as the max rate of
+        its motion profile. Not for use while start_core() is moving the displays
+            Each round turns every display still tuning one revolution at its candidate rate (the ramp reaches the rate
+            within a quarter revolution), then one revolution at the fastest rate passed. Slip detection compares the magnet edges
+            with the drum position: a slip, or no magnet edge at all, fails the candidate
+            Candidates rise by factor until a rate fails (or rate_limit passes), then refine rounds bisect between the
+            fastest rate that passed and the slowest that failed
+        Displays are at Home afterwards (positions unknown if a display stalled), the next move searches for home
+
+        rate_limit (int) - fastest rate to try in full steps per second (doubled for half step, default: 3000)
+        factor (float) - increase of the candidate rate each round until a rate fails (default: 1.25)
+        refine (int) - bisection rounds after the first failure (default: 3)
+        margin (float) - fraction of the fastest rate that passed used as the max rate (default: 0.85)
+
+        return ([int,...]) - max rate of each display in steps per second, None if the display could not be tuned
+        """
+        display_count = self.display_count
+        profiles = list(self.profiles)
+
+        # Fastest rate passed (the start rate needs no ramp) and slowest failed of each display, candidate of this round
+        passed = [profile[0] for profile in profiles]
+        failed = [None] * display_count
+        limit = [rate_limit * self.drive_modes[self.drive_mode[i]][1] for i in range(display_count)]
+        candidate = [min(profile[1], limit[i]) for i, profile in enumerate(profiles)]
+        rounds = [refine] * display_count
+        tuning = [True] * display_count
+
+        try:
+            # Start at Home (position known, slip detection compares magnet edges with the drum position)
+            if not await self.move_to([0] * display_count):
+                for i in range(display_count):
+                    if self.flap_value_current[i] is None:
+                        tuning[i] = False
+                        passed[i] = None
+
+            while True in tuning and not self._cancel:
+                # Candidate rate, then the fastest rate passed to catch steps lost after the magnet edge
+                slips = list(self._health_slips)
+                falls = list(self._hall_fall)
+                for i in range(display_count):
+                    if tuning[i]:
+                        self._tune_profile(i, profiles[i], candidate[i])
+                await self._turn([self.steps_rev[i] if tuning[i] else 0 for i in range(display_count)])
+                edges = [self._hall_fall[i] != falls[i] for i in range(display_count)]
+                for i in range(display_count):
+                    if tuning[i]:
+                        self._tune_profile(i, profiles[i], passed[i])
+                await self._turn([self.steps_rev[i] if tuning[i] else 0 for i in range(display_count)])
+                if self._cancel:
+                    break
+
+                for i in range(display_count):
+                    if not tuning[i]:
+                        continue
+                    if edges[i] and self._health_slips[i] == slips[i] and self.flap_value_current[i] is not None:
+                        passed[i] = candidate[i]
+                    else:
+                        failed[i] = candidate[i]
+                        self.flap_value_current[i] = None
+
+                    # Next candidate: faster until a rate fails, then bisect
+                    if failed[i] is None:
+                        if passed[i] >= limit[i]:
+                            tuning[i] = False
+                        candidate[i] = min(int(passed[i] * factor), limit[i])
+                    else:
+                        rounds[i] -= 1
+                        if rounds[i] < 0 or failed[i] - passed[i] <= 1:
+                            tuning[i] = False
+                        candidate[i] = (passed[i] + failed[i]) // 2
+
+                # Displays that lost steps search for home before the next round
+                if None in self.flap_value_current and True in tuning:
+                    await self.move_to([0] * display_count)
+        finally:
+            for i in range(display_count):
+                self.set_profile(*profiles[i], i)
+
+        if self._cancel:
+            return [None] * display_count
+
+        # Use the tuned rates
+        results = []
+        for i in range(display_count):
+            if passed[i] is None:
+                results.append(None)
+                continue
+            rate = max(int(passed[i] * margin), profiles[i][0])
+            self.set_profile(profiles[i][0], rate, profiles[i][2], i)
+            results.append(rate)
+
+        return results
+
+    def _tune_profile(self, display_index, profile, rate):
+        """
+        Set a display's motion profile to reach a rate within a quarter revolution (or faster with its own acceleration)
+
+        display_index (int) - index of the display
+        profile ((int,int,int)) - (start rate, max rate, acceleration) of the display
+        rate (int) - steps per second to reach
+        """
+        rate_start, _, accel = profile
+        accel = max(accel, (rate * rate - rate_start * rate_start) * 2 // self.steps_rev[display_index])
+        self.set_profile(rate_start, rate, accel, display_index)
+
+    async def _turn(self, steps):
+        """
+        Turn each display a number of steps without changing its flap position (whole revolutions), slip detection
+        corrects the steps of a display that loses steps. Steps in bursts of burst_us like move_to
+
+        steps ([int,...]) - steps for each display (0 = display does not move)
+        """
+        self._mark_moving([steps[i] != 0 for i in range(self.display_count)])
+        now = ticks_us()
+        self.moving = True
+        self.steps_taken = 0
+        self._attempts = 1
+        self._queue_len = 0
+        self._queue_next = 0
+        self._active = 0
+        for i in range(self.display_count):
+            self._steps_remaining[i] = steps[i]
+            self._steps_done[i] = 0
+            if steps[i] != 0:
+                self._step_next[i] = now
+                self._move_start[i] = now
+                self._release[i] = 0
+                self._active += 1
+        self._step_event = now
+
+        try:
+            while self._motion_run(self.burst_us):
+                await asyncio.sleep_ms(0)
+        finally:
+            self._motion_stop()
+            self._save_positions()
+
+    def load_calibration(self, calibration):
+        """
+        Use the drive mode and measured values of a Calibration (values not yet measured keep their current setting, a
+        home offset not set is the default, see Calibration.get_home_reads)
+        Positions of displays with a new drive mode, steps per revolution or home offset are set to unknown (next move
+        searches for home)
+
+        calibration (Calibration) - calibration values of each display (see calibration.py)
+        """
+        for i in range(min(self.display_count, calibration.display_count)):
+            self.set_drive_mode(calibration.drive_mode[i], i)
+            if calibration.steps_rev[i] is not None and calibration.steps_rev[i] != self.steps_rev[i]:
+                self.steps_rev[i] = calibration.steps_rev[i]
+                self.flap_value_current[i] = None
+            if calibration.magnet_width[i] is not None:
+                self.magnet_width[i] = calibration.magnet_width[i]
+            home_reads = calibration.get_home_reads(i)
+            if home_reads != self.home_reads[i]:
+                self.home_reads[i] = home_reads
+                self.flap_value_current[i] = None
+            if calibration.rate_max[i] is not None:
+                rate_start, _, accel = self.profiles[i]
+                self.set_profile(rate_start, calibration.rate_max[i], accel, i)
+
+    def restore_positions(self):
+        """
+        Restore the flap positions saved by the last moves before a restart (see positions.py), a display's position is
+        restored only if:
+            1) its last move ended (a move, calibration or tuning cut short by the power going off is still marked as moving)
+            2) its steps per revolution, home offset and drive mode are the ones it was saved with
+            3) its hall sensor agrees with the position: reads the magnet where the position expects it and only there
+               (catches most drums turned by hand while the clock was off, slip detection corrects the rest on the next
+               magnet pass)
+        Other displays stay unknown and search for home on their next move
+
+        return ([bool,...]) - True for each display whose position was restored
+        """
+        positions = self.positions
+        restored = []
+        for i in range(self.display_count):
+            flap = positions.flap[i] if i < positions.display_count else None
+            if (flap is None or positions.moving[i] or flap >= self.flap_count[i] or positions.steps_rev[i] != self.steps_rev[i]
+                or positions.home_reads[i] != self.home_reads[i] or positions.drive_mode[i] != self.drive_mode[i]
+                or not self._hall_agrees(i, self.flap_step(flap, i))):
+                restored.append(False)
+                continue
+
+            # Position, coil phase (the first step continues the sequence) and step count of Home (slip detection)
+            self.flap_value_current[i] = flap
+            self.flap_position[i] = self.flap_step(flap, i)
+            self.home_passes[i] = positions.home_passes[i]
+            self._phase[i] = positions.phase[i]
+            self._home_step[i] = self._step_count[i] - self.flap_position[i]
+            self._fall_checked[i] = self._hall_fall[i]
+            restored.append(True)
+
+        return restored
+
+    def _hall_agrees(self, display_index, position):
+        """
+        Return True if a display's hall sensor reading agrees with a step position: the magnet is read from home_reads
+        steps before Home for magnet_width steps, readings within slip_tolerance of a magnet edge agree either way
+
+        display_index (int) - index of the display
+        position (int) - step position past Home
+        """
+        tolerance = self.slip_tolerance
+        magnet = self.pins_hall[display_index].value() == 0
+
+        # Steps past the first magnet read, less the tolerance
+        offset = (position + self.home_reads[display_index] + tolerance) % self.steps_rev[display_index]
 
-        # Determine steps to turn each display to reach the desired value
-        steps_remaining = [self._calculate_steps(i) for i in range(self.display_count)]
-        steps_remaining.append(0) # Flap Count Modify: adds a dummy step for no 6th display
+        # Magnet width not measured (not calibrated): the magnet may be read anywhere from its first read to Home
+        width = self.magnet_width[display_index]
+        if width is None:
+            return not magnet or offset <= self.home_reads[display_index] + 2 * tolerance
 
-        # Start attempts
-        while sum(map(abs, steps_remaining)) > 0 and max_attempts > 0:
+        if offset < 2 * tolerance or width <= offset <= width + 2 * tolerance:
+            return True
+        return magnet == (offset < width)
 
-            # Set maximum number of steps to prevent potentially endless running (1.25 revolutions 2048 + 512)
-            steps_max = 2560
+    def _mark_moving(self, moving):
+        """
+        Mark the displays about to move in the positions journal given at startup (see positions.py), their saved
+        positions are not trusted until the end of the move is recorded (see _save_positions)
+
+        moving ([bool,...]) - True for each display about to move
+        """
+        positions = self.positions
+        if positions is None:
+            return
+
+        record = []
+        for i in range(min(self.display_count, positions.display_count)):
+            if moving[i]:
+                if self.flap_value_current[i] is None:
+                    self._positions_unknown = True
+                record.append([i])
+        if record:
+            positions.add(record)
+
+    def _save_positions(self, force=False):
+        """
+        Record the flap positions of the displays marked as moving after a move. The positions file is written when a
+        display started the move from an unknown position (its position found by a home search), or positions_interval_ms
+        after the last write, otherwise the new flaps are appended to the journal (limits flash writes to a short line
+        per move and an hourly write of the file, a display restarted while still marked searches for home)
+
+        force (bool) - write the positions file now (e.g. after a calibration, default: False)
+        """
+        positions = self.positions
+        if positions is None:
+            return
+
+        if not force:
+            if True not in positions.moving:
+                return
+            if not self._positions_unknown and ticks_diff(ticks_ms(), self._positions_saved_ms) < self.positions_interval_ms:
+                positions.add([[i, self.flap_value_current[i], self._phase[i], self.home_passes[i]]
+                    for i in range(min(self.display_count, positions.display_count)) if positions.moving[i]])
+                return
+
+        self._write_positions()
+        self._positions_unknown = False
+        self._positions_saved_ms = ticks_ms()
+
+    def _write_positions(self):
+        """
+        Write the flap positions to the positions file (no display is moving)
+        """
+        positions = self.positions
+        for i in range(min(self.display_count, positions.display_count)):
+            positions.flap[i] = self.flap_value_current[i]
+            positions.phase[i] = self._phase[i]
+            positions.home_passes[i] = self.home_passes[i]
+            positions.steps_rev[i] = self.steps_rev[i]
+            positions.home_reads[i] = self.home_reads[i]
+            positions.drive_mode[i] = self.drive_mode[i]
+            positions.moving[i] = False
+        positions.write()
+
+    def hall_edges(self):
+        """
+        Return the hall sensor edges captured since the last call, oldest first
+        Edges older than the last edge_buffer_size edges are lost (counted in edges_dropped)
+
+        return ([(int,int,int,int),...]) - (display_index, value (0 = magnet, 1 = off the magnet), step count, ticks_us) of each edge
+        """
+        written = self._edge_index[0]
+        read = self._edge_index[1]
+        if written - read > self.edge_buffer_size:
+            self.edges_dropped += written - read - self.edge_buffer_size
+            read = written - self.edge_buffer_size
+
+        mask = self.edge_buffer_size - 1
+        edges = []
+        while read != written:
+            k = read & mask
+            edges.append((self._edge_display[k], self._edge_value[k], self._edge_step[k], self._edge_ticks[k]))
+            read += 1
+        self._edge_index[1] = read
+
+        return edges
+
+    def _hall_irq(self, display_index):
+        """
+        Return the IRQ handler of a display's hall sensor (hard IRQ: runs at the edge, no heap allocations)
+        The edge is recorded with the display's step count, so homing uses the exact step of the edge
+
+        display_index (int) - index of the display
+        """
+        step_count = self._step_count
+        hall_fall = self._hall_fall
+        hall_rise = self._hall_rise
+        hall_value = self._hall_value
+        edge_display = self._edge_display
+        edge_value = self._edge_value
+        edge_step = self._edge_step
+        edge_ticks = self._edge_ticks
+        edge_index = self._edge_index
+        mask = self.edge_buffer_size - 1
+
+        def handler(pin):
+            value = pin.value()
+            step = step_count[display_index]
+            hall_value[display_index] = value
+            if value:
+                hall_rise[display_index] = step
+            else:
+                hall_fall[display_index] = step
+
+            # Ring buffer
+            k = edge_index[0] & mask
+            edge_display[k] = display_index
+            edge_value[k] = value
+            edge_step[k] = step
+            edge_ticks[k] = ticks_us()
+            edge_index[0] += 1
+
+        return handler
+
+    def health_counters(self):
+        """
+        Return the health counters of each display since the last call and reset them (flush them with a Health, see health.py)
+
+        return (dict) - counter name: [int,...] one value per display
+            moves - moves the display turned in
+            steps - steps taken
+            homing - home searches
+            slips - magnet edges away from their expected step (position corrected)
+            retries - attempts after an attempt that failed (position unknown)
+            failures - moves that ended with the position unknown after max_attempts
+        """
+        counters = {}
+        for (name, values) in (('moves', self._health_moves), ('homing', self._health_homing), ('slips', self._health_slips),
+            ('retries', self._health_retries), ('failures', self._health_failures)):
+            counters[name] = list(values)
+            for i in range(self.display_count):
+                values[i] -= counters[name][i]
+
+        counters['steps'] = [self._step_count[i] - self._health_steps[i] for i in range(self.display_count)]
+        for i in range(self.display_count):
+            self._health_steps[i] += counters['steps'][i]
+
+        return counters
+
+    def expected_steps(self, targets):
+        """
+        Return the expected number of steps for each display to reach the targets (does not move the displays)
+        A display with an unknown position is estimated at one revolution (home search) plus the steps to its target
+
+        targets ([int,...]) - flap index for each display
+        """
+        steps = []
+        for i in range(self.display_count):
+            if self.flap_value_current[i] is None:
+                steps.append(self.steps_rev[i] + self.flap_step(targets[i], i))
+            else:
+                steps.append(self._target_steps(i, targets[i]))
+
+        return steps
+
+    def expected_move_us(self, targets):
+        """
+        Return the microseconds a move to the targets is expected to take, from the first step to the last
+        Steps are estimated like expected_steps, with a current budget (max_energized) the displays are scheduled longest
+        first, each starting when another display releases its coils
+
+        targets ([int,...]) - flap index for each display
+        """
+        return self._makespan_us([self.expected_duration_us(i, steps) for i, steps in enumerate(self.expected_steps(targets)) if steps > 0])
+
+    def _makespan_us(self, durations):
+        """
+        Return the microseconds from the first step to the last of moves with the given durations (current budget applied)
+
+        durations ([int,...]) - expected duration of each moving display
+        """
+        if not durations:
+            return 0
+        if self.max_energized is None or len(durations) <= self.max_energized:
+            return max(durations)
+
+        # Longest processing time first: the next display starts on the motor slot that frees up first (after holding
+        #   its last step for one start rate interval)
+        hold = 1_000_000 // min(profile[0] for profile in self.profiles)
+        ends = [0] * self.max_energized
+        for duration in sorted(durations, reverse=True):
+            slot = ends.index(min(ends))
+            ends[slot] += duration + hold
+        return max(ends) - hold
+
+    def progress(self):
+        """
+        Return the progress of the current move (0.0 - 1.0) of the display furthest from its target
+        Displays searching for home are estimated at one revolution
+        """
+        if not self.moving:
+            return 1.0
+
+        progress = 1.0
+        for i in range(self.display_count):
+            steps = self._steps_remaining[i]
+            if steps != 0:
+                remaining = self.steps_rev[i] if steps < 0 else steps
+                progress = min(progress, self._steps_done[i] / (self._steps_done[i] + remaining))
+
+        return progress
+
+    def set_profile(self, rate_start, rate_max, accel, display_index=None):
+        """
+        Set the motion profile of a display (or all displays): steps start at rate_start, speed up by accel to rate_max and
+        slow down again before the target (trapezoid). rate_start = rate_max gives a constant rate
+
+        rate_start (int) - steps per second a motor can start and stop at without skipping
+        rate_max (int) - cruise steps per second
+        accel (int) - acceleration in steps per second per second
+        display_index (int) - display to set (default: None = all displays)
+        """
+        # Ramp - microseconds between steps for each step of the ramp (index = steps from the start or to the end of the move)
+        #   v(n) = sqrt(rate_start^2 + 2 * accel * n), computed once so the step loop only indexes the table
+        rate_max = max(rate_start, rate_max)
+        length = 1 if rate_max == rate_start or accel <= 0 else int((rate_max * rate_max - rate_start * rate_start) / (2 * accel)) + 1
+        ramp = array('H', [int(1_000_000 / min(rate_max, (rate_start * rate_start + 2 * accel * n) ** 0.5)) for n in range(length + 1)])
+
+        # Ramp Sum - total microseconds of ramp steps 1 to n (used to predict the duration of a move)
+        ramp_sum = array('I', [0] * (length + 1))
+        for n in range(1, length + 1):
+            ramp_sum[n] = ramp_sum[n - 1] + ramp[n]
+
+        for i in (range(self.display_count) if display_index is None else [display_index]):
+            self.profiles[i] = (rate_start, rate_max, accel)
+            self._ramps[i] = ramp
+            self._ramp_sums[i] = ramp_sum
+            self._ramp_last[i] = length
+
+    def expected_duration_us(self, display_index, steps):
+        """
+        Return the microseconds a display takes to move a number of steps with its motion profile
+
+        display_index (int) - index of the display
+        steps (int) - number of steps
+        """
+        # Intervals between steps 1 to steps-1 use the ramp at min(steps done, steps remaining): half speeding up, half slowing down
+        half = steps // 2
+        return self._ramp_total(display_index, half) + self._ramp_total(display_index, steps - half - 1)
+
+    def _ramp_total(self, display_index, n):
+        """
+        Return the total microseconds of ramp intervals 1 to n (intervals past the end of the ramp are at rate_max)
+        """
+        ramp = self._ramps[display_index]
+        last = len(ramp) - 1
+        if n <= last:
+            return self._ramp_sums[display_index][max(n, 0)]
+        return self._ramp_sums[display_index][last] + (n - last) * ramp[last]
+
+    def set_drive_mode(self, mode, display_index=None):
+        """
+        Set the drive mode of a display (or all displays): wave, full or half (see drive_modes)
+        The display's step values (steps_rev, home_reads, magnet_width) and motion profile are converted to steps of the new
+        mode (same drum speed) and its position is set to unknown, the next move searches for home
+        Not for use while the displays are moving
+
+        mode (str) - drive mode: wave, full or half
+        display_index (int) - display to set (default: None = all displays)
+        """
+        stride, steps_full = self.drive_modes[mode]
+        for i in (range(self.display_count) if display_index is None else [display_index]):
+            steps_full_old = self.drive_modes[self.drive_mode[i]][1]
+            if mode == self.drive_mode[i]:
+                continue
+
+            self.steps_rev[i] = self.steps_rev[i] * steps_full // steps_full_old
+            self.home_reads[i] = self.home_reads[i] * steps_full // steps_full_old
+            if self.magnet_width[i] is not None:
+                self.magnet_width[i] = self.magnet_width[i] * steps_full // steps_full_old
+            rate_start, rate_max, accel = self.profiles[i]
+            self.set_profile(rate_start * steps_full // steps_full_old, rate_max * steps_full // steps_full_old, accel * steps_full // steps_full_old, i)
+
+            # Wave drive energizes the even seq table indexes, full step the odd indexes
+            self.drive_mode[i] = mode
+            self._stride[i] = stride
+            if stride == 2:
+                self._phase[i] = (self._phase[i] & 6) | (0 if mode == 'wave' else 1)
+            self.flap_value_current[i] = None
+
+    def drive_mode_stats(self, display_index):
+        """
+        Return the steps per revolution of a display in each drive mode and the transition times measured in the modes it
+        has moved in (since startup), used to pick the fastest mode that moves the display reliably
+
+        display_index (int) - index of the display
+
+        return ({str: {str: int},...}) - for each drive mode: steps_rev, moves, steps, transition_ms (average time of a move),
+            revolution_ms (time to turn the drum once while moving, None = not measured)
+        """
+        steps_full = self.drive_modes[self.drive_mode[display_index]][1]
+        results = {}
+        for mode in self.drive_modes:
+            steps_rev = self.steps_rev[display_index] * self.drive_modes[mode][1] // steps_full
+            moves, steps, us = self._mode_stats[display_index].get(mode, (0, 0, 0))
+            results[mode] = {
+                'steps_rev': steps_rev,
+                'moves': moves,
+                'steps': steps,
+                'transition_ms': us // moves // 1000 if moves else None,
+                'revolution_ms': us * steps_rev // steps // 1000 if steps else None
+            }
+        return results
+
+    def _motion_start(self, targets, land_us=None):
+        """
+        Set the targets and plan the first attempt of a move
+
+        targets ([int,...]) - flap index for each display
+        land_us (int) - ticks_us for the last step of the move (default: None = start right away)
+        """
+        self._land_us = land_us
+        self.land_error_us = None
+        self.flap_value_target = targets
+        self.steps_expected = self.expected_steps(targets)
+        self.moving = True
+        self.steps_taken = 0
+        self.lag_max_us = 0
+
+        # Set maximum attempts to reach target characters (min of 2), see max_attempts
+        self._attempts = self.max_attempts
+
+        # Determine steps to turn each display to reach the desired value (active = number of displays moving)
+        self._active = self._plan_steps()
+        for i in range(self.display_count):
+            if self._steps_remaining[i] != 0:
+                self._health_moves[i] += 1
+
+    def _motion_run(self, burst_us=None):
+        """
+        Advance the displays until the move finishes or burst_us microseconds have passed (no heap allocations)
+        Each display steps on its own schedule (motion profile), a frame is written whenever any display steps
+        Shared cadence: while every moving display steps on the same tick at the interval of the end of its ramp (one
+            motion profile, e.g. a constant rate), runs of ticks write precomputed frames and the steps are counted when
+            the run ends. A hall sensor edge (magnet read, slip, home search) ends the run at once, that step is checked
+            as usual
+
+        burst_us (int) - maximum time to run before returning (None = run until the move finishes)
+
+        return (bool) - True if the displays are still moving
+        """
+        # Local references used in the step loop (avoids attribute lookups on every step)
+        steps_remaining = self._steps_remaining
+        steps_done = self._steps_done
+        step_next = self._step_next
+        step_due = self._step_due
+        release = self._release
+        phase = self._phase
+        stride = self._stride
+        frame = self._frame
+        register = self._register
+        shift = self._shift
+        keep = self._keep
+        seq_table = self._seq_table
+        ramps = self._ramps
+        ramp_last = self._ramp_last
+        step_count = self._step_count
+        hall_fall = self._hall_fall
+        hall_rise = self._hall_rise
+        hall_value = self._hall_value
+        home_step = self._home_step
+        fall_checked = self._fall_checked
+        health_slips = self._health_slips
+        slip_tolerance = self.slip_tolerance
+        home_reads = self.home_reads
+        steps_rev = self.steps_rev
+        display_count = self.display_count
+        queue = self._queue
+        queue_len = self._queue_len
+        queue_next = self._queue_next
+        steps_queued = self._steps_queued
+        move_start = self._move_start
+        move_us = self._move_us
+        move_steps = self._move_steps
+        edge_index = self._edge_index
+        shared_displays = self._shared
+        shared_frames = self._shared_frames
+        shift_register_count = self.shift_register_count
+        active = self._active
+        step_event = self._step_event
+        steps_taken = self.steps_taken
+        tick_start = ticks_us()
+
+        # Shared cadence run: ticks left, ticks taken, displays, interval and edges captured when it started
+        shared = 0
+        shared_ticks = 0
+        shared_count = 0
+        cadence = 0
+        edges = 0
+
+        # Advance Steps
+        while active > 0 and not self._cancel:
+            # End of the burst
+            now = ticks_us()
+            if burst_us is not None and ticks_diff(now, tick_start) >= burst_us:
+                break
+
+            # Wait for the next display step (step_event = earliest step_next of the moving displays)
+            #   Return to the asyncio loop instead of waiting past the end of the burst (e.g. displays waiting to land on time)
+            wait = ticks_diff(step_event, now)
+            if wait > 0:
+                if burst_us is not None and ticks_diff(now, tick_start) + wait > burst_us:
+                    break
+                sleep_us(wait)
+                now = step_event
+
+            if shared > 0:
+                # Shared cadence: take the step of every display of the run
+                for k in range(shared_count):
+                    step_count[shared_displays[k]] += 1
+                self._bytes_out(shared_frames[shared_ticks & 7])
+                shared -= 1
+                shared_ticks += 1
+                if shared > 0 and edge_index[0] == edges:
+                    # Next tick (restart from now if behind, e.g. slow output backend)
+                    step = ticks_add(step_event, cadence)
+                    step_event = step if ticks_diff(step, now) >= 0 else now
+                    continue
+
+                # End of the run (last tick or a hall sensor edge): count the steps before this one, this step is
+                #   checked below like any other (step_due is still set for the displays of the run)
+                self._shared_end(shared_count, shared_ticks, shared_ticks - 1, step_event)
+                steps_taken += (shared_ticks - 1) * shared_count
+                shared = 0
+                shared_ticks = 0
+            else:
+                # Update the frame: next sequence step for displays that are due, release stopped displays
+                for i in range(display_count):
+                    if steps_remaining[i] == 0 and not release[i]:
+                        step_due[i] = 0
+                        continue
+                    due = 0
+                    if ticks_diff(step_next[i], now) <= 0:
+                        if steps_remaining[i] != 0:
+                            due = 1
+                            step_count[i] += 1
+                            p = (phase[i] + stride[i]) & 7
+                            phase[i] = p
+                            nibble = seq_table[p]
+                        else:
+                            release[i] = 0
+                            nibble = 0
+
+                            # Coils released: start the next display waiting for the current budget
+                            if queue_next < queue_len:
+                                q = queue[queue_next]
+                                queue_next += 1
+                                steps_remaining[q] = steps_queued[q]
+                                step_next[q] = now
+                                move_start[q] = now
+
+                        # Two displays per shift register (see layout): replace this display's nibble
+                        r = register[i]
+                        frame[r] = (frame[r] & keep[i]) | (nibble << shift[i])
+                    step_due[i] = due
 
-            # Advance Steps
-            while sum(map(abs, steps_remaining)) > 0 and steps_max > 0:
                 # Take a step
-                bytes_seq = [self.seq[seq_index][(0 if steps_remaining[i] == 0 else 1) * 2 + (0 if steps_remaining[i+1] == 0 else 1)] for i in range(0, self.display_count, 2)]
-                self._bytes_out(bytes_seq)
-
-                # Determine Steps Remianing
-                for i in range(self.display_count):
-                    if steps_remaining[i] > 0:
-                        # Decrement steps
-                        steps_remaining[i] -= 1
-
-                    elif steps_remaining[i] == -1:
-                        # Determine if off magnet
-                        if self.pins_hall[i].value() == 1:
-                            # Find first magnet read
-                            steps_remaining[i] = -2
-                    
-                    elif steps_remaining[i] == -2:
-                        # Determine if magnet read
-                        if self.pins_hall[i].value() == 0:
-                            # Advance to home position
-                            steps_remaining[i] = self.home_reads
-
-                # Reduce maximum number of steps
-                steps_max -= 1
-
-                # Move to next sequence index
-                seq_index = (seq_index + 1) if seq_index < 3 else 0
-
-            # If reached max steps, assume an error occurred
-            if steps_max < 0:
-                # Set current positions to unknown
-                self.flap_value_current = [None] * self.display_count
-            
-            # Determine remaining steps needed to reach final values
-            steps_remaining = [self._calculate_steps(i) for i in range(self.display_count)]
-            steps_remaining.append(0) # Flap Count Modify: adds a dummy step for no 6th display
+                self._bytes_out(frame)
+
+            # Determine Steps Remaining and the time of each display's next step
+            #   run - ticks every moving display can step together without a decision (0 = no shared cadence run)
+            step_event = ticks_add(now, 1_000_000)
+            run = 0x3FFF_FFFF
+            cadence = 0
+            tick = 0
+            for i in range(display_count):
+                if not step_due[i]:
+                    # Moving displays, and displays holding their last step while other displays wait for the budget
+                    if steps_remaining[i] != 0 or release[i]:
+                        run = 0
+                        if (steps_remaining[i] != 0 or queue_next < queue_len) and ticks_diff(step_next[i], step_event) < 0:
+                            step_event = step_next[i]
+                    continue
+                steps_taken += 1
+                done = steps_done[i] + 1
+                steps_done[i] = done
+                steps = steps_remaining[i]
+
+                if steps > 0:
+                    # Slip detection: compare a new magnet edge with the step expected from the position (home_reads before Home)
+                    #   A falling edge within a quarter revolution of the last rising edge is the drum slipping back onto
+                    #   the trailing end of the magnet, not the magnet's first read
+                    fall = hall_fall[i]
+                    if fall != fall_checked[i] and fall - hall_rise[i] > steps_rev[i] >> 2:
+                        fall_checked[i] = fall
+                        error = (fall + home_reads[i] - home_step[i]) % steps_rev[i]
+                        if error > steps_rev[i] >> 1:
+                            error -= steps_rev[i]
+                        if error > slip_tolerance or error < -slip_tolerance:
+                            # Edge came error steps late (motor lost steps) or early: correct Home and the steps remaining
+                            health_slips[i] += 1
+                            home_step[i] += error
+                            steps = max(steps + error, 1)
+
+                    # Decrement steps
+                    steps -= 1
+                    ramp_index = done if done < steps else steps
+
+                elif steps == -1:
+                    # Determine if off magnet (last edge captured by the hall sensor IRQ was rising)
+                    if hall_value[i] == 1:
+                        # Find first magnet read
+                        steps = -2
+                    # Limit speed so the display can slow down within home_reads steps once the magnet is found
+                    ramp_index = done if done < home_reads[i] else home_reads[i]
+
+                else:
+                    # Determine if magnet read (last edge was falling)
+                    if hall_value[i] == 0:
+                        # Advance to home position: home_reads steps past the step of the edge
+                        steps = max(home_reads[i] - (step_count[i] - hall_fall[i]), 0)
+                        home_step[i] = hall_fall[i] + home_reads[i]
+                        fall_checked[i] = hall_fall[i]
+                    ramp_index = done if done < home_reads[i] else home_reads[i]
+
+                # Reached max steps (1.25 revolutions), assume an error occurred: stop the display and set its position to unknown
+                steps_max = steps_rev[i] + (steps_rev[i] >> 2)
+                if steps != 0 and done >= steps_max:
+                    steps = 0
+                    self.flap_value_current[i] = None
+
+                steps_remaining[i] = steps
+                last = ramp_last[i]
+                interval = ramps[i][ramp_index if ramp_index < last else last]
+                if steps == 0:
+                    # Display stopped: hold the last step for one interval, then release the coils
+                    run = 0
+                    active -= 1
+                    move_us[i] += ticks_diff(now, move_start[i])
+                    move_steps[i] += done
+                    self.last_step_us = now
+                    release[i] = 1
+                    step_next[i] = ticks_add(now, interval)
+                    if queue_next < queue_len and ticks_diff(step_next[i], step_event) < 0:
+                        step_event = step_next[i]
+                else:
+                    # Schedule the next step (restart from now if behind, e.g. slow output backend)
+                    step = ticks_add(step_next[i], interval)
+                    if ticks_diff(step, now) < 0:
+                        step = now
+                    step_next[i] = step
+                    if ticks_diff(step, step_event) < 0:
+                        step_event = step
+
+                    # Shared cadence: the display keeps its interval while past its ramp (moving to a target) or at its
+                    #   home search speed, the same interval and next step as the other displays
+                    if run > 0:
+                        if (ramp_index < last and (steps > 0 or ramp_index != home_reads[i])) or \
+                                (cadence != 0 and (interval != cadence or step != tick)):
+                            run = 0
+                        else:
+                            cadence = interval
+                            tick = step
+                            limit = steps_max - done - 1
+                            if steps > 0 and steps - last < limit:
+                                limit = steps - last
+                            if limit < run:
+                                run = limit
+
+            # End of an attempt: all displays stopped
+            if active == 0:
+                # Decrement max attempts, determine remaining steps needed to reach final values
+                self._attempts -= 1
+                if self._attempts == 0:
+                    break
+                active = self._plan_steps()
+                step_event = self._step_event
+                queue_len = self._queue_len
+                queue_next = self._queue_next
 
-            # Decrement max attempts
-            max_attempts -= 1
+            # Start a shared cadence run with the displays that stepped (runs longer than its frame table): frames of the
+            #   next 8 ticks, each display's sequence step with the nibbles of the other displays
+            elif run > 8 and cadence != 0:
+                shared = run
+                shared_count = 0
+                for i in range(display_count):
+                    if step_due[i]:
+                        shared_displays[shared_count] = i
+                        shared_count += 1
+                for t in range(8):
+                    f = shared_frames[t]
+                    for r in range(shift_register_count):
+                        f[r] = frame[r]
+                    for k in range(shared_count):
+                        i = shared_displays[k]
+                        r = register[i]
+                        f[r] = (f[r] & keep[i]) | (seq_table[(phase[i] + stride[i] * (t + 1)) & 7] << shift[i])
+                edges = edge_index[0]
 
-        # Reset pins for next action
-        self._bytes_out([0] * self.shift_register_count)
+        # Steps of a shared cadence run ended by the burst or a cancel
+        if shared_ticks > 0:
+            self._shared_end(shared_count, shared_ticks, shared_ticks, step_event)
+            steps_taken += shared_ticks * shared_count
+
+        # Save state for the next burst
+        self._queue_next = queue_next
+        self._active = active
+        self._step_event = step_event
+        self.steps_taken = steps_taken
+        self.lag_max_us = max(self.lag_max_us, ticks_diff(ticks_us(), tick_start))
+
+        return active > 0 and self._attempts > 0 and not self._cancel
+
+    def _shared_end(self, count, ticks, steps, step_next):
+        """
+        End a shared cadence run (see _motion_run): the phase and frame of the last tick written and the steps counted
+        for each display of the run
+
+        count (int) - number of displays of the run (self._shared)
+        ticks (int) - ticks written
+        steps (int) - steps to count (the step of the last tick is counted by the step loop when a run ends on a tick)
+        step_next (int) - ticks_us of the next step of the displays
+        """
+        frame = self._shared_frames[(ticks - 1) & 7]
+        for r in range(self.shift_register_count):
+            self._frame[r] = frame[r]
+        for k in range(count):
+            i = self._shared[k]
+            self._phase[i] = (self._phase[i] + self._stride[i] * ticks) & 7
+            self._steps_done[i] += steps
+            if self._steps_remaining[i] > 0:
+                self._steps_remaining[i] -= steps
+            self._step_next[i] = step_next
+
+    def _motion_stop(self):
+        """
+        End a move: displays that did not reach their target are set to unknown and the motor pins are reset
+
+        return (str) - motion status: Success, Canceled or Failure (also saved in motion_status)
+        """
+        stopped_early = False
+        now = ticks_us()
+        for i in range(self.display_count):
+            if self._steps_remaining[i] != 0:
+                self.flap_value_current[i] = None
+                self._steps_remaining[i] = 0
+                self._move_us[i] += ticks_diff(now, self._move_start[i])
+                self._move_steps[i] += self._steps_done[i]
+                stopped_early = True
+
+            # Time moving in this move, added to the statistics of the drive mode
+            if self._move_steps[i] > 0:
+                stats = self._mode_stats[i].setdefault(self.drive_mode[i], [0, 0, 0])
+                stats[0] += 1
+                stats[1] += self._move_steps[i]
+                stats[2] += self._move_us[i]
+                self._move_steps[i] = 0
+                self._move_us[i] = 0
+
+        # Displays still waiting for the current budget did not move
+        for k in range(self._queue_next, self._queue_len):
+            self.flap_value_current[self._queue[k]] = None
+            stopped_early = True
+        self._queue_len = 0
+        self._queue_next = 0
+        self._active = 0
+        self.moving = False
+
+        # Hold the last step of each display for its interval, then reset pins for next action
+        wait = 0
+        for i in range(self.display_count):
+            if self._release[i]:
+                wait = max(wait, ticks_diff(self._step_next[i], now))
+                self._release[i] = 0
+        if wait > 0:
+            sleep_us(wait)
+        for r in range(self.shift_register_count):
+            self._frame[r] = 0
+        self._bytes_out(self._frame)
+
+        # Landing error: last step of the move (set when a display stops) minus the landing time, nothing moved = no error
+        if self._land_us is not None and self.steps_taken > 0:
+            self.land_error_us = ticks_diff(self.last_step_us, self._land_us)
+            if self.land_error_us > self.land_tolerance_us or self.land_error_us < -self.land_tolerance_us:
+                self.land_bias_us += self.land_error_us // 2
+        self._land_us = None
+
+        # Displays that did not reach their target after max_attempts
+        if not self._cancel:
+            for i in range(self.display_count):
+                if self.flap_value_current[i] is None:
+                    self._health_failures[i] += 1
+
+        if self._cancel and stopped_early:
+            self.motion_status = 'Canceled'
+        elif None in self.flap_value_current:
+            self.motion_status = 'Failure'
+        else:
+            self.motion_status = 'Success'
         
+        return self.motion_status
+
+    def _plan_steps(self):
+        """
+        Calculate the steps remaining for every display, moving displays take their first step now
+        With a current budget (max_energized), displays beyond the budget wait in the queue, longest move first
+
+        return (int) - number of displays that need to move (including displays waiting in the queue)
+        """
+        now = ticks_us()
+        landing = self._land_us is not None and self._attempts == self.max_attempts
+        if landing:
+            durations = [self.expected_duration_us(i, steps) for i, steps in enumerate(self.expected_steps(self.flap_value_target))]
+        moving = []
+        for i in range(self.display_count):
+            # Previous attempt failed (position unknown)
+            if self._attempts < self.max_attempts and self.flap_value_current[i] is None:
+                self._health_retries[i] += 1
+            self._steps_remaining[i] = self._calculate_steps(i)
+            self._steps_done[i] = 0
+            if self._steps_remaining[i] != 0:
+                moving.append(i)
+
+        # Current budget: longest processing time first (home searches estimated at one revolution), displays still
+        #   holding their last step from the previous attempt use part of the budget until they release
+        self._queue_len = 0
+        self._queue_next = 0
+        start = len(moving)
+        if self.max_energized is not None and len(moving) > self.max_energized:
+            moving.sort(key=lambda i: -self.expected_duration_us(i, self._steps_remaining[i] if self._steps_remaining[i] > 0 else self.steps_rev[i]))
+            holding = sum(1 for i in range(self.display_count) if self._release[i] and i not in moving)
+            start = max(self.max_energized - holding, 0)
+            for i in moving[start:]:
+                self._queue[self._queue_len] = i
+                self._queue_len += 1
+                self._steps_queued[i] = self._steps_remaining[i]
+                self._steps_remaining[i] = 0
+                self._release[i] = 0
+
+        # Landing time (first attempt): each display starts its expected duration before it, or all displays by the expected
+        #   makespan when some wait for the current budget. Later attempts (after a failed home search) start right away
+        delay = [0] * self.display_count
+        if landing:
+            land = ticks_diff(self._land_us, now) - self.land_bias_us
+            if self._queue_len > 0:
+                makespan = self._makespan_us([durations[i] for i in moving])
+                for i in moving:
+                    delay[i] = max(land - makespan, 0)
+            else:
+                for i in moving:
+                    delay[i] = max(land - durations[i], 0)
+
+        step_event = ticks_add(now, 1_000_000)
+        for i in moving[:start]:
+            self._step_next[i] = ticks_add(now, delay[i])
+            self._move_start[i] = self._step_next[i]
+            self._release[i] = 0
+            if ticks_diff(self._step_next[i], step_event) < 0:
+                step_event = self._step_next[i]
+        self._step_event = step_event if start > 0 else now
+        return len(moving)
+
     def _calculate_steps(self, display_index):
         """
         Return the number of steps to rotate a display to reach the target and update current index
@@ -182,48 +1607,64 @@ class Display:
             -2 = go to home position - magnet is negative, find first positive read
             >0 = number of steps to rotate display
         """
-        # Go to home position if 1) current flap is not known or 2) target is past/on Home character
-        if self.flap_value_current[display_index] is None or self.flap_value_target[display_index] < self.flap_value_current[display_index]:
+        current = self.flap_value_current[display_index]
+        target = self.flap_value_target[display_index]
+
+        # Go to home position if 1) current flap is not known or 2) target is past/on Home character and homing is due
+        if current is None or (target < current and self.home_passes[display_index] + 1 >= self.home_interval):
             # Set current value to 0 - display will be at Home position
             self.flap_value_current[display_index] = 0
+            self.flap_position[display_index] = 0
+            self.home_passes[display_index] = 0
+            self._health_homing[display_index] += 1
+            self._hall_fall[display_index] = -1
+            self._hall_rise[display_index] = -1
 
             # -1 if magnet is currently being sensed, -2 if not, find first positive read
             return -1 if self.pins_hall[display_index].value() == 0 else -2
         
         # Is desired target character already being displayed?
-        if self.flap_value_current[display_index] == self.flap_value_target[display_index]:
+        if current == target:
             return 0
+
+        # Target is past/on Home character, continue forward around the drum
+        if target < current:
+            self.home_passes[display_index] += 1
         
-        # Calculate number of steps to reach Target
-        steps = int(round(2048 * ((self.flap_value_target[display_index] - self.flap_value_current[display_index]) / self.flap_count ), 0))
+        # Calculate number of steps to reach Target (forward distance around the drum)
+        steps = self._target_steps(display_index, target)
     
-        # Set current value to target - display will be at desired target after attempt
-        self.flap_value_current[display_index] = self.flap_value_target[display_index]
+        # Set current value and position to target - display will be at desired target after attempt
+        self.flap_value_current[display_index] = target
+        self.flap_position[display_index] = self.flap_step(target, display_index)
 
         # Return steps
         return steps
 
-    def _bytes_out(self, data):
+    def flap_step(self, flap, display_index=0):
         """
-        Sends the desired bytes through the HC595 cycle
+        Return the step position of a flap (steps past Home): the step nearest to flap * steps_rev / flap_count
+        Integer arithmetic, every flap always has exactly the same step position so moves never accumulate rounding error
 
-        data ([byte,...]) - data to send through shift registers, list of n bytes (n= number of shift registers)
+        flap (int) - index of the flap
+        display_index (int) - index of the display (steps_rev and flap_count of that display, default: 0)
+        """
+        flap_count = self.flap_count[display_index]
+        return (2 * flap * self.steps_rev[display_index] + flap_count) // (2 * flap_count)
+
+    def _target_steps(self, display_index, target):
         """
-        # Loop bytes in reverse to send the right-digits=farthest shift register
-        self.pin_latch.low()
-        sleep_us(200)
+        Return the number of steps to rotate a display forward from its step position to the target flap (wraps past Home)
 
-        for i in range(self.shift_register_count, 0, -1):
-            byte = data[i-1]
-            for bit in range(8):
-                self.pin_clock.low()
-                sleep_us(200)
-                value = 1 & (byte >> bit)
-                self.pin_serial.value(value)
-                sleep_us(200)
+        display_index (int) - index of the display
+        target (int) - index of the flap to display
+        """
+        return (self.flap_step(target, display_index) - self.flap_position[display_index]) % self.steps_rev[display_index]
 
-                self.pin_clock.high()
-                sleep_us(200)
+    def _bytes_out(self, data):
+        """
+        Sends the desired bytes through the HC595 cycle (latched as soon as the output backend has shifted them)
 
-        self.pin_latch.high()
-        sleep_us(200)
+        data ([byte,...]) - data to send through shift registers, list of n bytes (n= number of shift registers)
+        """
+        self.output.write(data)
@@ -0,0 +1,142 @@
+# Asynchronous Domain Name System (DNS) client
+#   Queries for every host are sent at once on a non-blocking UDP socket, replies are polled between short asyncio sleeps
+#   so the clock keeps running while waiting (socket.getaddrinfo blocks and does not give the time to live of the address)
+import asyncio
+import socket
+import struct
+from time import ticks_diff, ticks_ms
+
+class DNS:
+    """
+    DNS client (RFC 1035 stub resolver): asks a DNS server for the IPv4 address (A record) of several host names at once,
+    with the time to live of each answer (seconds the address may be cached, see dnscache.py)
+
+    Methods:
+    query(hosts) - async, queries the server and returns {host: (address, ttl),...} of the hosts it answered
+    """
+
+    def __init__(self, server=None, port=53, timeout_ms=1000, attempts=2, poll_ms=1):
+        """
+        Setup the DNS client
+
+        server (str) - IP address of the DNS server (default: None = the DNS server of the Wi-Fi network)
+        port (int) - UDP port of the server (default: 53)
+        timeout_ms (int) - milliseconds to wait for the replies of an attempt (default: 1000)
+        attempts (int) - queries sent for a host that has no reply (lost packets, default: 2)
+        poll_ms (int) - milliseconds between checks for replies (default: 1)
+        """
+        self.server = server
+        self.port = port
+        self.timeout_ms = timeout_ms
+        self.attempts = attempts
+        self.poll_ms = poll_ms
+
+    async def query(self, hosts):
+        """
+        Send a query for every host, wait for the replies (sending again for hosts without a reply) and return the
+        addresses found
+
+        hosts ([str,...]) - host names
+
+        return (dict) - host: (address, ttl) of each host the server answered with an address, ttl in seconds
+        """
+        results = {}
+        if not hosts:
+            return results
+
+        if self.server is None:
+            import network
+            self.server = network.WLAN(network.STA_IF).ifconfig()[3]
+
+        # Query ID of each host waiting for its answer
+        first_id = ticks_ms() & 0xFF00
+        pending = {(first_id + k) & 0xFFFF: host for k, host in enumerate(hosts)}
+
+        address = socket.getaddrinfo(self.server, self.port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            for _ in range(self.attempts):
+                for query_id, host in pending.items():
+                    try:
+                        sock.sendto(self._question(query_id, host), address)
+                    except OSError:
+                        pass
+
+                # Poll for replies until every host is answered or the attempt times out
+                start = ticks_ms()
+                while pending and ticks_diff(ticks_ms(), start) < self.timeout_ms:
+                    await asyncio.sleep_ms(self.poll_ms)
+                    while pending:
+                        try:
+                            data = sock.recv(512)
+                        except OSError:
+                            break
+                        if len(data) < 12:
+                            continue
+                        host = pending.pop(struct.unpack_from('!H', data)[0], None)
+                        if host is None:
+                            continue
+                        answer = self._answer(data)
+                        if answer is not None:
+                            results[host] = answer
+
+                if not pending:
+                    break
+        finally:
+            sock.close()
+
+        return results
+
+    def _question(self, query_id, host):
+        """
+        Return the query packet asking for the A record of a host (recursion desired)
+
+        query_id (int) - 16-bit ID of the query (the reply has the same ID)
+        host (str) - host name
+        """
+        packet = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+        for label in host.encode('utf-8').split(b'.'):
+            packet += bytes((len(label),)) + label
+        return packet + b'\x00' + struct.pack('!HH', 1, 1)
+
+    def _answer(self, data):
+        """
+        Return (address, ttl) from a reply, the first A record of the answers (after any CNAME records) and the shortest
+        time to live of the records that led to it, None if the reply is an error or has no address
+
+        data (bytes) - reply packet
+        """
+        flags, questions, answers = struct.unpack_from('!HHH', data, 2)
+        if not flags & 0x8000 or flags & 0x000F:
+            return None
+
+        try:
+            pos = 12
+            for _ in range(questions):
+                pos = self._skip_name(data, pos) + 4
+
+            ttl = None
+            for _ in range(answers):
+                pos = self._skip_name(data, pos)
+                record_type, record_class, record_ttl, length = struct.unpack_from('!HHIH', data, pos)
+                pos += 10
+                ttl = record_ttl if ttl is None else min(ttl, record_ttl)
+                if record_type == 1 and record_class == 1 and length == 4:
+                    return '.'.join(str(byte) for byte in data[pos:pos + 4]), ttl
+                pos += length
+        except (IndexError, ValueError):
+            pass
+        return None
+
+    def _skip_name(self, data, pos):
+        """
+        Return the position after a domain name (labels, ending with a zero length or a compression pointer)
+        """
+        while True:
+            length = data[pos]
+            if length & 0xC0 == 0xC0:
+                return pos + 2
+            if length == 0:
+                return pos + 1
+            pos += length + 1
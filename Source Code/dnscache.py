@@ -0,0 +1,117 @@
+import json
+
+class DNSCache:
+    """
+    Handles the DNS cache file: the address of each NTP server and the time it expires (the time to live of the DNS
+    answer), so a sync sends its requests as soon as it starts instead of waiting for the DNS server. An expired (stale)
+    address is still used while it is looked up again alongside the NTP requests, up to max_stale seconds after it
+    expired (see JMBTime.set_rtc_ntp)
+
+    Properties:
+
+    file (str) - name of the DNS cache file
+
+    max_stale (int) - seconds after it expired that an address is still used while it is looked up again
+
+    entries (dict) - host: [address, expires]
+        address - IPv4 address of the host
+        expires - UTC seconds since the NTP epoch the address expires (None = looked up before the RTC was set)
+
+    counters (dict) - lookups of NTP server addresses since the file was created
+        hits - address in the cache and not expired
+        stale - expired address used while looked up again
+        misses - no address in the cache (or expired more than max_stale ago), looked up before the NTP requests
+
+    Methods:
+
+    read() - Read values in from DNS cache file
+
+    write() - Write current values to DNS cache file
+
+    lookup(hosts, now) - Return the cached addresses, the hosts to look up again and the hosts to look up first (a host
+        that is an IPv4 address is its own address, not counted)
+
+    add(host, address, ttl, now) - Add the address of a host to the cache
+    """
+
+    names = ('hits', 'stale', 'misses')
+
+    def __init__(self, max_stale=604_800):
+        """
+        Setup the DNS cache object
+
+        max_stale (int) - seconds after it expired that an address is still used (default: 604,800 = 7 days)
+        """
+        self.file = "dns.dat"
+        self.max_stale = max_stale
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the DNS cache file. If file doesn't exist, the cache is empty
+        """
+        self.entries = {}
+        self.counters = {name: 0 for name in self.names}
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            for host, entry in settings.get('entries', {}).items():
+                self.entries[host] = [str(entry[0]), entry[1]]
+            for name in self.names:
+                self.counters[name] = int(settings.get(name, 0))
+        except (OSError, ValueError, IndexError):
+            pass
+
+    def write(self):
+        """
+        Write values to the DNS cache file
+        """
+        settings = {'entries' : self.entries}
+        settings.update(self.counters)
+        with open(self.file, 'w') as f:
+            json.dump(settings, f)
+
+    def lookup(self, hosts, now):
+        """
+        Return the addresses of the hosts in the cache, counting hits, stale and misses
+
+        hosts ([str,...]) - host names
+        now (int) - UTC seconds since the NTP epoch (None = the RTC is not set, every address is stale)
+
+        return (({str:str}, [str,...], [str,...])) - (host: address of the cached hosts and IPv4 addresses, stale hosts
+            to look up again while their address is used, hosts to look up before use)
+        """
+        addresses = {}
+        stale = []
+        missing = []
+        for host in hosts:
+            parts = host.split('.')
+            if len(parts) == 4 and all(part.isdigit() for part in parts):
+                addresses[host] = host
+                continue
+
+            entry = self.entries.get(host)
+            if entry is None or (now is not None and entry[1] is not None and now >= entry[1] + self.max_stale):
+                missing.append(host)
+                self.counters['misses'] += 1
+                continue
+
+            addresses[host] = entry[0]
+            if now is None or entry[1] is None or now >= entry[1]:
+                stale.append(host)
+                self.counters['stale'] += 1
+            else:
+                self.counters['hits'] += 1
+        return addresses, stale, missing
+
+    def add(self, host, address, ttl, now):
+        """
+        Add the address of a host to the cache (replaces the cached address)
+
+        host (str) - host name
+        address (str) - IPv4 address
+        ttl (int) - seconds the address may be cached (time to live of the DNS answer)
+        now (int) - UTC seconds since the NTP epoch (None = the RTC is not set, the address is stale at the next lookup)
+        """
+        self.entries[host] = [address, None if now is None else now + ttl]
@@ -0,0 +1,84 @@
+import json
+
+class Health:
+    """
+    Handles the health telemetry file: counters of each split-flap display, totals since the file was created
+    Display keeps the counters in RAM (Display.health_counters), add() and write() flush them periodically to limit flash writes
+
+    Properties:
+
+    file (str) - name of the health file
+
+    display_count (int) - number of split-flap displays
+
+    counters (dict) - counter name: [int,...] total of each display
+        moves - moves the display turned in
+        steps - steps taken
+        homing - home searches
+        slips - magnet edges away from their expected step (position corrected)
+        retries - attempts after an attempt that failed (position unknown)
+        failures - moves that ended with the position unknown after max_attempts
+
+    Methods:
+
+    read() - Read values in from health file
+
+    write() - Write current values to health file
+
+    add(counters) - Add counters (e.g. from Display.health_counters) to the totals
+
+    slip_rate(display_index) - Slips per 1,000 moves of a display
+    """
+
+    names = ('moves', 'steps', 'homing', 'slips', 'retries', 'failures')
+
+    def __init__(self, display_count):
+        """
+        Setup the health object
+
+        display_count (int) - number of split-flap displays (Display.display_count, from its layout)
+        """
+        self.file = "health.dat"
+        self.display_count = display_count
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the health file. If file doesn't exist, counters are set to 0
+        """
+        self.counters = {name: [0] * self.display_count for name in self.names}
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            for name in self.names:
+                for i, value in enumerate(settings.get(name, [])[:self.display_count]):
+                    self.counters[name][i] = int(value)
+        except (OSError, ValueError):
+            pass
+
+    def write(self):
+        """
+        Write values to the health file
+        """
+        with open(self.file, 'w') as f:
+            json.dump(self.counters, f)
+
+    def add(self, counters):
+        """
+        Add counters to the totals
+
+        counters (dict) - counter name: [int,...] one value per display (see Display.health_counters)
+        """
+        for name in self.names:
+            for i, value in enumerate(counters.get(name, [])[:self.display_count]):
+                self.counters[name][i] += value
+
+    def slip_rate(self, display_index):
+        """
+        Return the slips per 1,000 moves of a display (0 if the display has not moved)
+
+        display_index (int) - index of the display
+        """
+        moves = self.counters['moves'][display_index]
+        return 1000 * self.counters['slips'][display_index] / moves if moves > 0 else 0
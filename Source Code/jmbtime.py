@@ -1,164 +1,325 @@
 # Class for working with time
 import asyncio
+from dns import DNS
+from dnscache import DNSCache
 from log import Log
 from machine import RTC
-import ntptime
+from ntp import NTP
+from synchistory import SyncHistory
+from timezones import TimeZones
+from time import ticks_add, ticks_diff, ticks_ms, ticks_us
 
 class JMBTime:
     """
     Class for working with time. This class requires an internet connection has already been established (see WIFI class).
+    The RTC holds UTC, the local time is worked out when it is read from the time zone's offsets and the transitions of
+    the year (cached, see _utc_offset). The time zones come from the time zone database file (see timezones.py)
+    Times are integer seconds (or microseconds) since the NTP epoch (01-Jan-1900) outside the minute tick, which reads the
+    time as the UTC day and milliseconds of the day (small integers on the Pico, seconds since 1900 need more than 31 bits).
+    The offsets and dates of the UTC day are cached (as is the RTC date), so reading the time is a few divisions until the
+    day changes
 
     init() - Instantiate the class object
 
-    load_timezone_offset(timezone) - load the timezone offsets (tz_offset, tz_offset_dst)
+    load_timezone_offset(timezone) - load the time zone from the time zone database (tz_offset, tz_offset_dst, the
+        transitions and daylight savings rule), clears the cached transitions
 
     set_rtc_ntp() - Attempts to set Real Time Clock (RTC) using Network Time Protocol (NTP) (must be connected to the internet)
+        Queries the ntp_servers at once (see ntp.py), sets the RTC on the next whole second of the best sample, updates the
+        drift estimate and the sync interval from the offset measured. The server addresses come from the DNS cache (see
+        dnscache.py), an expired address is looked up again while the servers are queried
 
-    set_rtc(year, month, day, hours, min) - Set the Real Time Clock (RTC) using passed parameters
+    set_rtc(year, month, day, hours, min) - Set the Real Time Clock (RTC) using passed parameters (local time, stored as UTC)
 
-    get_localtime - Obtains the current local time (from RTC)
+    get_localtime(minutes) - Obtains the current local time (from RTC, drift corrected), optionally minutes later at the start of that minute
+        Daylight savings starts and ends at the exact second of the time zone's rule (e.g. 2:00 AM in the United States)
         return (tuple) - (year, month, day, weekday, hour, min, sec, meridiem)
 
-    _ordinal(y,m,d) - Returns the number of days with 01-Jan-0001 as day 1
+    sync_ticks() - Anchors ticks_ms to the RTC second (the RTC has no sub-second value)
+
+    ms_to_minute() - Milliseconds until the next minute boundary (from ticks_ms and the anchor, drift corrected)
+
+    needs_sync() - True if the ticks anchor is not set or is more than an hour old
+
+    next_sync() - Seconds until the next NTP sync is due (the sync interval adapts to the RTC drift)
 
-    _weekday(y,m,d) - Returns the day of week for the given date (0=Sunday)
+    rtc_set() - True if the RTC has been set since the Pico started (it starts at 01-Jan-2021 after a reset)
+
+    _ordinal(y,m,d) - Returns the number of days with 01-Jan-0001 as day 1
 
     _date_from_ordinal(ordinial) - Returns the year, month, day from the ordinal days with 01-Jan-0001 as day 1
+
+    _rtc_ms() - The RTC as UTC milliseconds since the start of the RTC day (_rtc_day), ms resolution from the ticks anchor
+
+    _utc_ms() - UTC in milliseconds since the start of the RTC day, the RTC corrected for its drift since the last NTP sync
+
+    _rtc_us() - The RTC as UTC microseconds since the NTP epoch (01-Jan-1900)
+
+    _utc_us() - UTC in microseconds since the NTP epoch, drift corrected (see _utc_ms)
+
+    _set_rtc(utc) - Sets the RTC to UTC seconds since the NTP epoch
+
+    _localtime(us) - The local time tuple (see get_localtime) of UTC microseconds since the NTP epoch
+
+    _local(day, s) - The local time tuple of a UTC day since the NTP epoch and second of the day
+
+    _set_day(day) - Caches the offsets and local dates of a UTC day since the NTP epoch for _local
+
+    _day_seconds(dt) - Seconds since the start of the day of an RTC datetime tuple (the day of the RTC date is cached)
+
+    _seconds(dt) - Seconds since the NTP epoch of an RTC datetime tuple
+
+    _utc_offset(utc) - Seconds the local time is ahead of UTC at UTC seconds since the NTP epoch (a few comparisons)
+
+    _dst_table(utc) - Computes the transitions (UTC) of the year of a UTC time for _utc_offset
+
+    _rule_time(y, date, offset) - UTC seconds since the NTP epoch of a daylight savings rule date in a year
+
+    _update_dns(resolved, now) - Adds the addresses looked up to the DNS cache and saves it
+
+    _update_drift(offset_us, delay_us, utc, elapsed) - Adds a sync to the history, estimates the drift and the sync interval
     
     Properties
 
-    tz_offset (int) - Hours offset for the Timezone
-    tz_offset_dst (int) - Hours offset for the Timezone during daylight savings time
+    tz_offset (float) - Hours offset for the Timezone (the current rule, e.g. -5.0 for New York, 5.5 for India)
+    tz_offset_dst (float) - Hours offset for the Timezone during daylight savings time (same as tz_offset without it)
+    ntp_servers ([str,...]) - NTP servers queried at the same time by set_rtc_ntp
+    ntp_sample ((int,int,str)) - (offset_us, delay_us, server) of the last NTP sync, offset = NTP time minus the RTC
+    drift_ppm (float) - Estimated RTC drift, microseconds the RTC gains per second (negative = loses)
+    sync_interval (int) - Seconds between NTP syncs, adapted to keep the error of the corrected clock below sync_error_ms
+    sync_error_ms (int) - Largest error of the corrected clock wanted between syncs
+    sync_history (SyncHistory) - Offsets of the last syncs, drift and sync interval (saved to sync.dat)
+    dns_cache (DNSCache) - Addresses of the ntp_servers and when they expire, hits, stale and misses (saved to dns.dat)
 
     """
 
-    def __init__(self, timezone):
+    # Days from 01-Jan-0001 (day 1) to the NTP epoch (01-Jan-1900), _ordinal(1900, 1, 1)
+    _EPOCH_ORDINAL = 693_596
+
+    def __init__(self, timezone=None):
         """
         Initializes the JMBTIME object
+
+        timezone (str) - Timezone as set in the Config file (default: None = UTC, see load_timezone_offset)
         """
         # Set timezone offsets
         self.load_timezone_offset(timezone)
+
+        # Real Time Clock (one object, read on every call)
+        self._rtc = RTC()
+
+        # RTC Day - the (year, month, day) last read from the RTC and its days since the NTP epoch (see _day_seconds),
+        #   recomputed when the RTC date changes
+        self._rtc_date = None
+        self._rtc_day = 0
+
+        # Ticks Anchor - ticks_ms when the RTC last changed second (sync_ticks) and the RTC day and milliseconds of the
+        #   day then
+        self._anchor_ticks = None
+        self._anchor_day = 0
+        self._anchor_ms = 0
+
+        # NTP - servers queried concurrently (the best reply is used), result of the last sync
+        self.ntp_servers = ('0.pool.ntp.org', '1.pool.ntp.org', '2.pool.ntp.org')
+        self.ntp_sample = None
+
+        # DNS Cache - addresses of the NTP servers, a sync sends its requests without waiting for the DNS server
+        self.dns_cache = DNSCache()
+
+        # Drift Model - the offset measured by each NTP sync gives the RTC drift, the drift is corrected between syncs and
+        #   the sync interval lengthened or shortened to keep the error of the corrected clock below sync_error_ms
+        #   Sync - UTC day and second of the day when NTP last set the RTC (None = not since the Pico started)
+        self.sync_history = SyncHistory()
+        self.sync_error_ms = 100
+        self.sync_interval_min = 900        # 15 minutes, also the retry after a failed sync
+        self.sync_interval_max = 86_400     # 1 day
+        self._sync_day = None
+        self._sync_s = 0
+
+    @property
+    def drift_ppm(self):
+        return self.sync_history.drift_ppm
+
+    @property
+    def sync_interval(self):
+        return self.sync_history.interval
     
     def load_timezone_offset(self, timezone):
         """
-        Loads the timezone offset properties. If no time zone is set, offsets are 0 (UTC time)
-
-        timezone (str) = Timezone as set in the Config file, valid values are:
-            EST EDT
-            CST CDT
-            MST MDT
-            MST
-            PST PDT
-            AKST SKDT
-            HST HDT
-            HST
-        """
-        if timezone is None:
-            self.tz_offset = 0
-            self.tz_offset_dst = 0
-        else:
-            # Reference list of time zones ('Time Zone', [Std Offset, Dst Offset])
-            zones = {
-                'EST EDT': (-5, -4), 
-                'CST CDT': (-6, -5), 
-                'MST MDT': (-7, -6), 
-                'MST': (-7, -7), 
-                'PST PDT': (-8, -7), 
-                'AKST AKDT': (-9, -8), 
-                'HST HDT': (-10, -9), 
-                'HST': (-10, -10)
-            }
-            tz = zones.get(timezone,None)
-            if tz is None:
-                self.tz_offset = 0
-                self.tz_offset_dst = 0
-            else:
-                self.tz_offset = tz[0]
-                self.tz_offset_dst = tz[1]
+        Loads the timezone offset properties from the time zone database (see timezones.py). If no time zone is set, or
+        it is not in the database, offsets are 0 (UTC time)
+
+        timezone (str) = Timezone as set in the Config file, an IANA time zone name (e.g. America/New_York) or a time
+            zone of the earlier settings page (e.g. EST EDT, see TimeZones.ALIASES)
+        """
+        zone = None if timezone is None else TimeZones().load(timezone)
+        if zone is None:
+            zone = (0, (), (0, 0, None, None))
+
+        # Offset before the first transition, transitions ((UTC, offset),...), rule after the last transition
+        #   (standard offset, daylight offset, daylight savings start, end)
+        self._offset_initial, self._transitions, self._rule = zone
+        self.tz_offset = self._rule[0] / 3600
+        self.tz_offset_dst = self._rule[1] / 3600
+
+        # Transitions Table - UTC seconds since the NTP epoch of the year cached (start, end), the offset at the start of
+        #   the year and the transitions in the year ((UTC, offset),...), computed for a year the first time a time in it
+        #   is converted (see _utc_offset)
+        self._year_start = 0
+        self._year_end = 0
+        self._year_offset = 0
+        self._year_transitions = ()
+
+        # Current Day - UTC days since the NTP epoch of the day last converted by _local, the offset at its start, the
+        #   transitions in it ((second of the day, offset),...) and the (year, month, day, weekday) of the local day
+        #   before, of and after it, recomputed when the day changes (see _set_day)
+        self._utc_day = None
+        self._day_offset = 0
+        self._day_transitions = ()
+        self._dates = ()
     
     async def set_rtc_ntp(self):
         """
         Attempts to set Real Time Clock (RTC) using Network Time Protocol (NTP)
         Assumes pico is connected to the internet (i.e. wifi.connect())
+            The servers are queried at the same time without blocking (see ntp.py), the reply with the shortest round
+            trip gives the offset of the RTC. The RTC is set on the next whole second of NTP time (the RTC counts whole
+            seconds from when it is set) and the ticks anchor is set at that moment (sub-second resolution, see sync_ticks)
+            The offset since the previous sync updates the drift estimate and the sync interval (see _update_drift)
+            The RTC is set to UTC, the local time is worked out when it is read (see get_localtime)
+            Servers with an address in the DNS cache are queried at once, an expired (stale) address is used while it is
+            looked up again at the same time, a server not in the cache is looked up first (see dns.py). A server the
+            DNS server does not answer for is left to socket.getaddrinfo in the NTP client (blocking)
 
         return (bool) - indicates success (True)
         """
         # Setup the log
         log = Log()
 
-        # Set number of attempts
-        i = 10 # Number of attempts
-        time_set_success = False
-        while i > 0:
-            i -= 1
-            try:
-                ntptime.settime()
-                time_set_success = True
-                i = 0
-            except OSError:
-                await asyncio.sleep(1)
-                continue
-        
-        if time_set_success:
-            # Time is now in UTC, convert to time offset
-            rtc = RTC()
-            dt_utc = rtc.datetime()
-
-            # Determine if we are in daylight savings
-            #   Daylight savings between: 2nd Sunday of March - 1st Sunday of November
-
-            # 2nd Sunday of March
-            dst_start_wd = self._weekday(dt_utc[0], 3, 8)   # 8th is the earliest the second Sunday could be on
-            dst_start = self._ordinal(dt_utc[0], 3, 8 if dst_start_wd == 0 else 8 + (7 - dst_start_wd))
-            
-            # 1st Sunday of November
-            dst_end_wd = self._weekday(dt_utc[0], 11, 1)  # 1st is the earliest the first Sunday could be on
-            dst_end = self._ordinal(dt_utc[0], 11, 1 if dst_end_wd == 0 else 1 + (7 - dst_end_wd))
-
-            # Current date
-            dt = self._ordinal(dt_utc[0], dt_utc[1], dt_utc[2])
-
-            # Hours to offset
-            hours_offset = self.tz_offset_dst if dt >= dst_start and dt <= dst_end else self.tz_offset
-
-            # Set new hour
-            h = dt_utc[4] + hours_offset
-            if h < 0:
-                # Subtract one day
-                dt -= 1
-                h += 24
-            
-            # Obtain new year, month, day
-            y, m, d = self._date_from_ordinal(dt)
-
-            # Obtain weekday (weekday should be 0=Monday, 7=Sunday)
-            wd = self._weekday(y, m, d)
-            if wd > 0:
-                wd -= 1
-            else:
-                wd = 6
-
-            # Obtain Min, Sec, Subsec (waited until this point to keep time as precise as possible)
-            dt_now = rtc.datetime()
-
-            # Log settings
-            log.write('RTC time set by NTP, updated to timezone, following is DateTime:')
-            log.write(f'Year={y}, Month={m}, Day={d}, Weekday={wd}, Hour={h}, Min={dt_now[5]}, Sec={dt_now[6]}, Subsec={dt_now[7]}')
-
-            # Set datetime
-            try:
-                rtc.datetime((y, m, d, wd, h, dt_now[5], dt_now[6], dt_now[7]))
-            except OSError:
-                # Raise the error (will be logged in main)
-                raise
-
+        # Local clock - the RTC read once, then ticks_us (ms resolution with the ticks anchor, whole seconds without)
+        start_ticks = ticks_us()
+        start_us = self._rtc_us()
+        local_us = lambda: start_us + ticks_diff(ticks_us(), start_ticks)
+
+        # Seconds the RTC ran since NTP last set it (None = not set by NTP since the Pico started)
+        elapsed = None if self._sync_day is None else start_us // 1_000_000 - self._sync_day * 86_400 - self._sync_s
+
+        # Server addresses, the DNS cache expiry uses the RTC (stale if it is not set, e.g. after a restart)
+        now = start_us // 1_000_000 if self.rtc_set() else None
+        addresses, stale, missing = self.dns_cache.lookup(self.ntp_servers, now)
+        resolved = await DNS().query(missing)
+        servers = []
+        for server in self.ntp_servers:
+            address = addresses.get(server) or resolved.get(server, (server,))[0]
+            servers.append(address)
+
+        # Query the servers (looking up the stale addresses at the same time), the offset is NTP time minus the RTC
+        ntp = NTP(servers)
+        if stale:
+            sample, refreshed = await asyncio.gather(ntp.query(local_us), DNS().query(stale))
+            resolved.update(refreshed)
+        else:
+            sample = await ntp.query(local_us)
+        log.write(f'NTP server addresses: {len(addresses) - len(stale)} cached or IP addresses, {len(stale)} stale, {len(missing)} looked up first')
+        if sample is None:
+            self._update_dns(resolved, now)
+            log.write(f'No reply from the NTP servers: {", ".join(self.ntp_servers)}')
+            return False
+        sample = (sample[0], sample[1], self.ntp_servers[servers.index(sample[2])])
+        self.ntp_sample = sample
+
+        # Wait for the next whole second of NTP time
+        offset_us = sample[0]
+        utc_us = local_us() + offset_us
+        await asyncio.sleep_ms((1_000_000 - utc_us % 1_000_000 + 999) // 1000)
+        utc_us = local_us() + offset_us
+        utc = (utc_us + 500_000) // 1_000_000   # nearest second (the sleep can end a little early or late)
+
+        # Set the RTC to UTC
+        try:
+            self._set_rtc(utc)
+        except OSError:
+            # Raise the error (will be logged in main)
+            raise
+
+        # The RTC started this second now (less the time since the second began), anchor ticks_ms to it
+        self._anchor_ticks = ticks_add(ticks_ms(), (utc * 1_000_000 - utc_us) // 1000)
+        self._sync_day, self._sync_s = divmod(utc, 86_400)
+        self._anchor_day = self._sync_day
+        self._anchor_ms = self._sync_s * 1000
+
+        # Drift estimate and sync interval from the offset the RTC ran up since the previous sync
+        if elapsed is not None:
+            self._update_drift(offset_us, sample[1], utc, elapsed)
+
+        # Next sync
+        self.sync_history.next_sync = utc + self.sync_interval
+        self.sync_history.write()
+
+        # Addresses looked up expire from the time just set
+        self._update_dns(resolved, utc)
+
+        # Log settings
+        dt = self._localtime(utc * 1_000_000)
+        log.write(f'RTC time set by NTP ({sample[2]}: offset {offset_us // 1000} ms, round trip {sample[1] // 1000} ms) to UTC, following is the local DateTime:')
+        log.write(f'Year={dt[0]}, Month={dt[1]}, Day={dt[2]}, Weekday={dt[3]}, Hour={dt[4]} {dt[7]}, Min={dt[5]}, Sec={dt[6]}')
+        log.write(f'RTC drift {self.drift_ppm:.2f} ppm, next sync in {self.sync_interval} seconds')
+
+        return True
+
+    def _update_dns(self, resolved, now):
+        """
+        Adds the addresses looked up to the DNS cache and saves it (with the hits, stale and misses counted)
 
+        resolved (dict) - host: (address, ttl) from the DNS server (see dns.py)
+        now (int) - UTC seconds since the NTP epoch (None = the RTC is not set)
+        """
+        for host, (address, ttl) in resolved.items():
+            self.dns_cache.add(host, address, ttl, now)
+        self.dns_cache.write()
 
-        return time_set_success
+    def _update_drift(self, offset_us, delay_us, utc, elapsed):
+        """
+        Adds the sync to the history and updates the drift estimate and the sync interval
+            The RTC was set to NTP time at the previous sync, so the offset is what it gained or lost since then
+            drift - offsets over the time they built up across the history (long intervals weigh more, their offsets are
+                large next to the NTP measurement error)
+            interval - the time the corrected clock takes to reach sync_error_ms (less half the round trip, the most the
+                offset can be wrong) at the rate the corrected clock was off since the previous sync or the furthest the
+                drift of a sync in the history was from the estimate (the crystal changes with temperature, at least
+                0.5 ppm), at most double the interval (one lucky sync does not stretch it) and at most the time the
+                history spans (the drift is not known to hold longer, e.g. over a day's temperature swing)
+
+        offset_us (int) - NTP time minus the RTC
+        delay_us (int) - round trip to the NTP server
+        utc (int) - NTP time of the sync, seconds since the NTP epoch
+        elapsed (int) - seconds since the previous sync
+        """
+        # Too short to measure the drift (e.g. the Set Date Time button clicked again), or an offset far beyond any
+        #   crystal's drift (the RTC was changed some other way)
+        if elapsed < self.sync_interval_min or abs(offset_us) > 500 * elapsed:
+            return
+
+        # Error of the drift corrected clock (the correction applied was the drift times the seconds elapsed)
+        history = self.sync_history
+        error_us = offset_us + history.drift_ppm * elapsed
+
+        # Drift estimate (the RTC gains the drift, the offset to NTP time is the opposite)
+        history.add(utc, offset_us, delay_us, elapsed)
+        span = sum(sync[3] for sync in history.syncs)
+        history.drift_ppm = -sum(sync[1] for sync in history.syncs) / span
+
+        # Sync interval
+        spread = max(abs(-sync[1] / sync[3] - history.drift_ppm) for sync in history.syncs)
+        budget_us = max(self.sync_error_ms * 1000 - delay_us // 2, self.sync_error_ms * 100)
+        interval = int(budget_us / max(abs(error_us) / elapsed, spread, 0.5))
+        history.interval = max(self.sync_interval_min, min(interval, 2 * history.interval, span, self.sync_interval_max))
 
     def set_rtc(self, year, month, day, hours, min):
         """
-        Sets the Real Time Clock (RTC) using the passed Date Time info
+        Sets the Real Time Clock (RTC) using the passed Date Time info (local time, the RTC is set to UTC)
+        A time repeated when the offset changes (daylight savings ends) is taken with the offset before the change, as is
+        a time skipped (daylight savings starts), i.e. daylight time and standard time in the United States
 
         year (int) - 4-digit year
         month (int) - 1-12
@@ -166,35 +327,308 @@ class JMBTime:
         hours (int) - 0-23
         min (int) - 0-59
         """
+        # UTC of the local time: the offset a day before if it gives back that offset (a repeated time), else the offset
+        #   a day after if it does, else the time was skipped (offsets are less than a day, transitions days apart)
+        local = (self._ordinal(year, month, day) - self._EPOCH_ORDINAL) * 86_400 + hours * 3600 + min * 60
+        before = self._utc_offset(local - 86_400)
+        after = self._utc_offset(local + 86_400)
+        utc = local - before
+        if self._utc_offset(utc) != before and self._utc_offset(local - after) == after:
+            utc = local - after
+        self._set_rtc(utc)
+
+        # RTC changed, the ticks anchor must be set again (see sync_ticks), no drift correction until the next NTP sync
+        self._anchor_ticks = None
+        self._sync_day = None
+
+    def _set_rtc(self, utc):
+        """
+        Sets the Real Time Clock (RTC) to a UTC time
+
+        utc (int) - seconds since the NTP epoch (01-Jan-1900)
+        """
+        days, seconds = divmod(utc, 86_400)
+        ordinal = self._EPOCH_ORDINAL + days
+        y, m, d = self._date_from_ordinal(ordinal)
+        h, seconds = divmod(seconds, 3600)
+        mi, sec = divmod(seconds, 60)
+
         # Note in RTC.datetime, the weekday component is 0=Monday, 6=Sunday
-        rtc = RTC()
-        wd = self._weekday(year, month, day)  # 0 = Sunday
-        rtc.datetime((year,month,day, wd - 1 if wd > 0 else 6,hours,min,0,0))
+        self._rtc.datetime((y, m, d, (ordinal + 6) % 7, h, mi, sec, 0))
 
-    def get_localtime(self):
+    def get_localtime(self, minutes=0):
         """
-        Obtains the current local time from the Real Time Clock (RTC)
+        Obtains the current local time from the Real Time Clock (RTC), corrected for its drift since the last NTP sync
+
+        minutes (int) - minutes to add, the time returned is the start of that minute (default: 0 = current time)
 
         return (tuple) - (year, month (1-12), day (1-31), weekday (0-6:Sun-Sat), hour (1-12), min (0-59), sec (0-59), meridiem (AM/PM))
         """
-        # Get the utc datetime from the Real Time Clock
-        rtc = RTC()
-        dt_utc = rtc.datetime()
+        ms = self._utc_ms()
+        if minutes != 0:
+            # Start of the minute, minutes later (UTC and local minutes start together, offsets are whole minutes)
+            ms = (ms // 60_000 + minutes) * 60_000
+
+        return self._local(self._rtc_day, ms // 1000)
+
+    def _localtime(self, us):
+        """
+        Return the local time tuple (see get_localtime) of a UTC time
+
+        us (int) - UTC, microseconds since the NTP epoch (01-Jan-1900)
+        """
+        day, s = divmod(us // 1_000_000, 86_400)
+        return self._local(day, s)
 
-        # Convert Weekday (0=Monday to 0=Sunday)
-        wd = dt_utc[3] + 1
-        if wd == 7:
-            wd == 0
+    def _local(self, day, s):
+        """
+        Return the local time tuple (see get_localtime) of a UTC time as a day and a second of the day, small integers on
+        the Pico (the offsets and dates of the UTC day are cached, see _set_day)
+
+        day (int) - UTC days since the NTP epoch (01-Jan-1900)
+        s (int) - seconds since the start of the day, outside the day moves to the day before or after (e.g. a minute
+            after 23:59)
+        """
+        if s < 0 or s >= 86_400:
+            days, s = divmod(s, 86_400)
+            day += days
+        if day != self._utc_day:
+            self._set_day(day)
+        offset = self._day_offset
+        for t, transition_offset in self._day_transitions:
+            if s < t:
+                break
+            offset = transition_offset
+
+        # Local time, on the day before or after the UTC day when the offset crosses midnight
+        s += offset
+        date = 1
+        if s < 0:
+            s += 86_400
+            date = 0
+        elif s >= 86_400:
+            s -= 86_400
+            date = 2
+        hr, seconds = divmod(s, 3600)
+        mi, sec = divmod(seconds, 60)
         
         # Convert hour to 12-hour clock and set meridiem
-        hr = dt_utc[4]
         meridiem = 'AM' if hr < 12 else 'PM'
         if hr > 12:
             hr -= 12
         elif hr == 0:
             hr = 12
         
-        return (dt_utc[0], dt_utc[1], dt_utc[2], wd, hr, dt_utc[5], dt_utc[6], meridiem)
+        y, m, d, weekday = self._dates[date]
+        return (y, m, d, weekday, hr, mi, sec, meridiem)
+
+    def _set_day(self, day):
+        """
+        Caches the offsets and local dates of a UTC day, kept until a time on another day is converted. The seconds since
+        the NTP epoch of the day (too large for a small integer on the Pico) are only worked out here, once a day
+
+        day (int) - UTC days since the NTP epoch (01-Jan-1900)
+        """
+        start = day * 86_400
+        self._day_offset = self._utc_offset(start)
+        self._day_transitions = tuple((t - start, offset) for t, offset in self._year_transitions if start < t < start + 86_400)
+
+        # Dates of the local day before, of and after the UTC day (offsets are less than a day), weekday 0=Sunday (day 1,
+        #   01-Jan-0001, was a Monday)
+        ordinal = self._EPOCH_ORDINAL + day
+        self._dates = tuple(self._date_from_ordinal(o) + (o % 7,) for o in range(ordinal - 1, ordinal + 2))
+        self._utc_day = day
+
+    async def sync_ticks(self):
+        """
+        Anchors ticks_ms to the Real Time Clock (RTC): waits for the RTC second to change (up to 1.1 seconds) and records
+        ticks_ms at that moment, ms_to_minute then has millisecond resolution (the RTC only counts whole seconds)
+        """
+        rtc = self._rtc
+        second = rtc.datetime()[6]
+        start = ticks_ms()
+        while rtc.datetime()[6] == second and ticks_diff(ticks_ms(), start) < 1100:
+            await asyncio.sleep_ms(1)
+
+        self._anchor_ticks = ticks_ms()
+        self._anchor_ms = self._day_seconds(rtc.datetime()) * 1000
+        self._anchor_day = self._rtc_day
+
+    def needs_sync(self):
+        """
+        Return True if the ticks anchor is not set (RTC changed) or more than an hour old (ticks_ms wraps after 6 days)
+        """
+        return self._anchor_ticks is None or ticks_diff(ticks_ms(), self._anchor_ticks) > 3_600_000
+
+    def ms_to_minute(self):
+        """
+        Return the milliseconds until the next minute boundary of the drift corrected RTC, from ticks_ms since the anchor
+        (see sync_ticks). Without an anchor the RTC seconds are used (whole second resolution)
+        """
+        return 60_000 - self._utc_ms() % 60_000
+
+    def next_sync(self):
+        """
+        Return the seconds until the next NTP sync is due (see set_rtc_ntp), sync_interval_min once it is past due (the
+        last sync failed or the Pico restarted) or while the RTC is not set (a restart, the RTC back at 01-Jan-2021 is
+        years before the saved time), sync_interval before the first sync, never more than sync_interval_max
+        """
+        if not self.rtc_set():
+            return self.sync_interval_min
+
+        next_sync = self.sync_history.next_sync
+        if next_sync is None:
+            return self.sync_interval
+
+        remaining = next_sync - self._rtc_us() // 1_000_000
+        return min(remaining, self.sync_interval_max) if remaining > 0 else self.sync_interval_min
+
+    def _rtc_ms(self):
+        """
+        Return the time of the Real Time Clock (RTC) as UTC milliseconds since the start of the RTC day (_rtc_day, read
+        with it), a small integer on the Pico. Milliseconds come from the ticks anchor (see sync_ticks), whole seconds
+        without it
+        """
+        seconds = self._day_seconds(self._rtc.datetime())
+        if self._anchor_ticks is None:
+            return seconds * 1000
+
+        ms = self._anchor_ms + ticks_diff(ticks_ms(), self._anchor_ticks)
+        if self._anchor_day != self._rtc_day:
+            ms += (self._anchor_day - self._rtc_day) * 86_400_000
+        if abs(ms // 1000 - seconds) > 1:
+            # The RTC was set elsewhere (e.g. the settings page in Configuration mode), the anchor no longer applies
+            self._anchor_ticks = None
+            self._sync_day = None
+            return seconds * 1000
+        return ms
+
+    def _utc_ms(self):
+        """
+        Return UTC in milliseconds since the start of the RTC day (_rtc_day): the RTC corrected for the drift since NTP
+        last set it (the RTC gains drift_ppm microseconds every second)
+        """
+        ms = self._rtc_ms()
+        if self._sync_day is not None:
+            elapsed = (self._rtc_day - self._sync_day) * 86_400 + ms // 1000 - self._sync_s
+            ms -= round(self.drift_ppm * elapsed / 1000)
+        return ms
+
+    def _rtc_us(self):
+        """
+        Return the time of the Real Time Clock (RTC) as UTC microseconds since the NTP epoch (01-Jan-1900), see _rtc_ms
+        """
+        ms = self._rtc_ms()
+        return (self._rtc_day * 86_400_000 + ms) * 1000
+
+    def _utc_us(self):
+        """
+        Return UTC in microseconds since the NTP epoch (01-Jan-1900), drift corrected (see _utc_ms)
+        """
+        ms = self._utc_ms()
+        return (self._rtc_day * 86_400_000 + ms) * 1000
+
+    def _day_seconds(self, dt):
+        """
+        Return the seconds since the start of the day of an RTC datetime tuple, the days since the NTP epoch (01-Jan-1900)
+        of its date are kept in _rtc_day (recomputed when the date changes)
+
+        dt (tuple) - (year, month, day, weekday, hour, min, sec, subsec)
+        """
+        date = self._rtc_date
+        if date is None or dt[2] != date[2] or dt[1] != date[1] or dt[0] != date[0]:
+            self._rtc_date = (dt[0], dt[1], dt[2])
+            self._rtc_day = self._ordinal(dt[0], dt[1], dt[2]) - self._EPOCH_ORDINAL
+        return dt[4] * 3600 + dt[5] * 60 + dt[6]
+
+    def _seconds(self, dt):
+        """
+        Return the seconds since the NTP epoch (01-Jan-1900) of an RTC datetime tuple
+
+        dt (tuple) - (year, month, day, weekday, hour, min, sec, subsec)
+        """
+        seconds = self._day_seconds(dt)
+        return self._rtc_day * 86_400 + seconds
+
+    def _utc_offset(self, utc):
+        """
+        Return the seconds the local time is ahead of UTC at a UTC time (negative west of Greenwich)
+        The transitions of the year are cached (see _dst_table), so this is a few comparisons (at most two transitions
+        a year for most time zones)
+
+        utc (int) - seconds since the NTP epoch (01-Jan-1900)
+        """
+        if utc < self._year_start or utc >= self._year_end:
+            self._dst_table(utc)
+        offset = self._year_offset
+        for t, transition_offset in self._year_transitions:
+            if utc < t:
+                break
+            offset = transition_offset
+        return offset
+
+    def _dst_table(self, utc):
+        """
+        Computes the transitions of the year (UTC) of a UTC time, kept until a time in another year is converted
+            The time zone's transitions in the year (see load_timezone_offset), then after the last of them the daylight
+            savings rule (e.g. 2:00 AM standard time on the 2nd Sunday of March to 2:00 AM daylight time on the 1st
+            Sunday of November in the United States, daylight savings spans the new year south of the equator)
+
+        utc (int) - seconds since the NTP epoch (01-Jan-1900)
+        """
+        y = self._date_from_ordinal(self._EPOCH_ORDINAL + utc // 86_400)[0]
+        self._year_start = (self._ordinal(y, 1, 1) - self._EPOCH_ORDINAL) * 86_400
+        self._year_end = (self._ordinal(y + 1, 1, 1) - self._EPOCH_ORDINAL) * 86_400
+
+        # Transitions of the time zone, the offset at the start of the year is the one of the last transition before it
+        offset = self._offset_initial
+        table = []
+        for t, transition_offset in self._transitions:
+            if t <= self._year_start:
+                offset = transition_offset
+            elif t < self._year_end:
+                table.append((t, transition_offset))
+
+        # Daylight savings rule after the last transition
+        last = self._transitions[-1][0] if self._transitions else None
+        std, dst, start, end = self._rule
+        if last is None or last < self._year_end:
+            ruled = []
+            if start is not None:
+                # Start in local standard time, end in local daylight time
+                ruled = sorted(((self._rule_time(y, start, std), dst), (self._rule_time(y, end, dst), std)))
+                ruled = [transition for transition in ruled if self._year_start <= transition[0] < self._year_end]
+            if last is None or last <= self._year_start:
+                # The year starts with the offset the rule ends the year on
+                offset = ruled[-1][1] if ruled else std
+            table += [transition for transition in ruled if last is None or transition[0] > last]
+
+        self._year_offset = offset
+        self._year_transitions = tuple(table)
+
+    def _rule_time(self, y, date, offset):
+        """
+        Return the UTC seconds since the NTP epoch of a daylight savings rule date in a year
+
+        y (int) - 4-digit year
+        date ((int,int,int,int)) - month (1-12), week (1-5, 5 = last), weekday (0=Sunday), seconds after midnight
+        offset (int) - seconds the local time of the date is ahead of UTC
+        """
+        month, week, weekday, seconds = date
+        first = self._ordinal(y, month, 1)
+        day = first + (weekday - first % 7) % 7 + (week - 1) * 7
+
+        # Week 5 is the last, a week earlier when the month has only four of the weekday
+        if day >= self._ordinal(y + month // 12, month % 12 + 1, 1):
+            day -= 7
+        return (day - self._EPOCH_ORDINAL) * 86_400 + seconds - offset
+
+    def rtc_set(self):
+        """
+        Return True if the Real Time Clock (RTC) has been set since the Pico started, MicroPython starts the RTC at
+        01-Jan-2021 after every reset (no battery), a soft reboot keeps the time
+        """
+        return self._rtc.datetime()[0] > 2021
 
     def _ordinal(self, y, m, d):
         """
@@ -215,17 +649,6 @@ class JMBTime:
 
         return ordinal_year + ordinal_month + d
 
-    def _weekday(self, y, m, d):
-        """
-        Returns the day-of-week (0=Sunday, 1=Monday, 6=Saturday) for a given date
-
-        y (int) = 4-digit year
-        m (int) = month (1-12)
-        d (int) = day (1-31)
-        """
-        # Return the weekday
-        return (self._ordinal(y,m,d) + 6) % 7
-    
     def _date_from_ordinal(self, ordinal):
         """
         Ordinal (number of days, considering 01-Jan-0001 as day 1) converted to year, month, day
@@ -1,10 +1,15 @@
 import asyncio
+import time
 from button import Button
+from calibration import Calibration
 from config import Config
 from display import Display
+from health import Health
 from jmbtime import JMBTime
 from led import LED
 from log import Log
+from positions import Positions
+from shiftregister import ShiftRegisterPIO
 from timer import Timer
 from wifi import WIFI
 from wifiap import WIFIAP
@@ -19,37 +24,83 @@ def current_state():
         1: Idle - No global task is currently running
         2: Config - Configuration mode is running
         3: Set DateTime - Set Date Time mode, using NTP if configured and running Display Update mode
+        4: Calibrate - Display calibration is running (started from Idle or Config mode)
     """
+    global task_calibrate
     global task_config
     global task_setdt
 
-    if task_setdt != None and not task_setdt.done():
+    if task_calibrate != None and not task_calibrate.done():
+        return 4
+    elif task_setdt != None and not task_setdt.done():
         return 3
     elif task_config != None and not task_config.done():
         return 2
     else:
         return 1
+
+def startup_mark(event):
+    """
+    Records the time of a startup event in the startup log (ticks_ms counts from when the Pico started), the log is written
+    to startup.dat once the startup has finished (see startup_write)
+
+    event (str) - description of the event
+    """
+    global startup_log
+
+    if startup_log is not None:
+        startup_log.append(f'{time.ticks_ms()} ms - {event}')
+
+def startup_write():
+    """
+    Writes the startup log to startup.dat (once per start, replacing the log of the previous start)
+    """
+    global startup_log
+
+    if startup_log is not None:
+        log = Log('startup.dat')
+        log.write('\n'.join(startup_log), 'w')
+        startup_log = None
     
 ########## Waiters and Timers
 
 async def timer_display_update():
     """
-    Ensures the display is updated every minute
+    Ensures the display is updated every minute, each update lands the flaps on the minute boundary (see display_update_mode)
+    When the RTC is set (startup, Set Date Time mode, Configuration mode) the current time is shown right away instead
+    Nothing is shown until the RTC has been set since the Pico started (displays keep showing their restored positions)
     """
+    global event_rtc_set
     global jmbtime
     global task_display_update
+    global task_setdt
     
     while True:
-        # Run Display Update mode (if not currently running)
-        sleep_sec = 60
-        if task_display_update == None or task_display_update.done():
-            task_display_update = asyncio.create_task(display_update_mode())
-            await task_display_update
-            dt = jmbtime.get_localtime()
-            sleep_sec = 60 - dt[6]
-
-        # Wait for the next minute occurrance
-        await asyncio.sleep(sleep_sec)
+        # Startup has finished once the first Set Date Time mode is done and the time it set has been shown
+        if task_setdt != None and task_setdt.done() and not (event_rtc_set.is_set() and jmbtime.rtc_set()):
+            startup_write()
+
+        # Run Display Update mode (if not currently running and Calibrate mode is not turning the displays)
+        if (task_display_update == None or task_display_update.done()) and current_state() != 4 and jmbtime.rtc_set():
+            if event_rtc_set.is_set():
+                # RTC set: show the current time now, then anchor the minute boundary to the new RTC second
+                event_rtc_set.clear()
+                task_display_update = asyncio.create_task(display_update_mode())
+                await task_display_update
+                await jmbtime.sync_ticks()
+            else:
+                # Next minute, landing on the minute boundary (returns early if the RTC is set while waiting)
+                task_display_update = asyncio.create_task(display_update_mode(True))
+                await task_display_update
+        elif not jmbtime.rtc_set() and not event_rtc_set.is_set():
+            # Wait for Set Date Time mode to set the RTC (check again shortly)
+            try:
+                await asyncio.wait_for_ms(event_rtc_set.wait(), 1000)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # Try again shortly
+            await asyncio.sleep(1)
 
 async def waiter_timer_setdt():
     """
@@ -70,6 +121,25 @@ async def waiter_timer_setdt():
         # Reset the event
         event_timer_setdt.clear()
 
+async def waiter_timer_health():
+    """
+    Respond to the health timer event: flush the display health counters from RAM to the health file
+    """
+    global display
+    global event_timer_health
+    global health
+
+    while True:
+        # Wait for the timer event
+        await event_timer_health.wait()
+
+        # Add the counters since the last flush and save
+        health.add(display.health_counters())
+        health.write()
+
+        # Reset the event
+        event_timer_health.clear()
+
 async def waiter_btn_config_click():
     """
     Respond to single button click: Enter Config mode
@@ -129,9 +199,11 @@ async def waiter_btn_setdt_click():
 
 async def waiter_btn_setdt_cancel_click():
     """
-    Respond to long button click: Cancel Set Date Time mode
+    Respond to long button click: Cancel Set Date Time mode, start Calibrate mode (if Idle) or cancel it
     """
     global event_btn_setdt_cancel_click
+    global event_calibrate
+    global task_calibrate
     global task_setdt
 
     while True:
@@ -139,20 +211,50 @@ async def waiter_btn_setdt_cancel_click():
         await event_btn_setdt_cancel_click.wait()
 
         # Check if the Set Date Time task is running (Program State = 3)
-        if current_state() == 3:
+        state = current_state()
+        if state == 3:
             # Cancel the event (assume cancellation, LED will shut off when complete)
             task_setdt.cancel()
+        elif state == 1:
+            # Start the calibration
+            event_calibrate.set()
+        elif state == 4:
+            # Cancel the calibration (displays not at Home are set to unknown)
+            task_calibrate.cancel()
 
         # Clear the event to wait for the next long click
         event_btn_setdt_cancel_click.clear()
 
+async def waiter_calibrate():
+    """
+    Respond to the calibrate event (long click of the Set Date Time button or the config web page): Calibrate mode
+    """
+    global event_calibrate
+    global task_calibrate
+
+    while True:
+        # Wait for the calibrate event
+        await event_calibrate.wait()
+
+        # Check program state (only execute if Idle or in Config mode, the display is not moving)
+        state = current_state()
+        if state == 1 or state == 2:
+            # Create the calibrate task
+            task_calibrate = asyncio.create_task(calibrate_mode())
+
+        # Reset the event
+        event_calibrate.clear()
+
 ########## Modes
 
 async def config_mode():
     """
     Main method for configuration mode
     """
+    global calibration
     global config
+    global display
+    global health
     global jmbtime
     global led
     global wifiap
@@ -163,6 +265,10 @@ async def config_mode():
         # Set light blinking to indicate config mode is starting
         led.blink_constant()
 
+        # Flush the display health counters so the health page is up to date
+        health.add(display.health_counters())
+        health.write()
+
         # Disconnect wifi (only disconnects if currently connected)
         wifi.disconnect()
 
@@ -190,14 +296,87 @@ async def config_mode():
         # Ensure JMBTime has the correct Timezone offsets
         jmbtime.load_timezone_offset(config.timezone)
 
+        # Ensure the display uses the latest calibration (home offsets may have been changed)
+        calibration.read()
+        display.load_calibration(calibration)
+
+        # Show the time (the date and time may have been set manually)
+        event_rtc_set.set()
+
+async def calibrate_mode():
+    """
+    Measures the steps per revolution and magnet width of each display, tunes its fastest step rate and saves them to the
+    calibration file
+    """
+    global calibration
+    global display
+    global led
+    global task_display_update
+
+    # Turn on the led
+    led.on()
+
+    # Start the log
+    log = Log()
+    log.write('Start the Calibrate process', 'w')
+
+    try:
+        # Wait for any display update to finish
+        if task_display_update != None and not task_display_update.done():
+            await task_display_update
+
+        # Turn the displays and measure them
+        results = await display.calibrate()
+
+        # Save the measured values (displays that failed keep their previous values)
+        for i in range(display.display_count):
+            if results[i] == None:
+                log.write(f'Display {i}: magnet not found')
+            else:
+                log.write(f'Display {i}: {results[i][0]} steps per revolution, magnet width {results[i][1]} steps')
+                calibration.steps_rev[i] = results[i][0]
+                calibration.magnet_width[i] = results[i][1]
+                calibration.drive_mode[i] = display.drive_mode[i]
+        calibration.write()
+
+        # Find the fastest step rate of each display (displays that could not be tuned keep their previous rate)
+        rates = await display.tune_rate()
+        for i in range(display.display_count):
+            if rates[i] == None:
+                log.write(f'Display {i}: step rate not tuned')
+            else:
+                log.write(f'Display {i}: max rate {rates[i]} steps per second')
+                calibration.rate_max[i] = rates[i]
+        calibration.write()
+
+    except asyncio.CancelledError:
+        # Task was canceled
+        log.write("User canceled Calibrate process")
+        led.blink_error()
+        raise # Raise the error up
+
+    # Show the time again (displays are at Home)
+    task_display_update = asyncio.create_task(display_update_mode())
+    await task_display_update
+
+    # Turn off the led to indicate the mode is finished, error blink code if a display did not find its magnet
+    if None in results:
+        led.blink_error()
+    else:
+        led.off()
+
 
 async def setdt_mode():
     """
-    Updates the Real Time Clock (RTC) using the Network Time Protocol (NTP), if enabled, and then updates the display time
+    Updates the Real Time Clock (RTC) using the Network Time Protocol (NTP), if enabled, and then has the display show the
+    time (see timer_display_update). Runs in the background at startup, the display and buttons do not wait for it
+    The next run is due when JMBTime's drift model says so (the sync interval adapts to the RTC drift, see next_sync),
+    until the RTC is set a failed run (Wi-Fi or NTP) is retried after sync_interval_min
     """
+    global event_rtc_set
     global jmbtime
     global led
-    global task_display_update
+    global timer_setdt
     global wifi
 
     # Turn on the led
@@ -210,16 +389,23 @@ async def setdt_mode():
         log.write('Start the Set Date Time process', 'w')
 
         try:
-            # Wifi Connection
+            # Wifi Connection (connected with the cached IP address past its lease: connect again to get it from DHCP)
+            if wifi.lease_expired():
+                wifi.wlan.disconnect()
             if not wifi.wlan.isconnected():
                 # Attempt to connect
                 if await wifi.connect(log) == "Failure":
                     # Error has been written to log, give the error blink code to the user, and exit
+                    startup_mark('Wi-Fi connection failed')
                     led.blink_error()
                     return
+                startup_mark('Wi-Fi connected')
 
             # Set the Date Time
-            await jmbtime.set_rtc_ntp()
+            if await jmbtime.set_rtc_ntp():
+                startup_mark('RTC set by NTP')
+            else:
+                startup_mark('NTP failed')
 
         except asyncio.CancelledError:
             # Task was canceled
@@ -232,27 +418,83 @@ async def setdt_mode():
             log.write(f'{err=}')
             raise
 
-    # Update the display (if not already running)
-    if task_display_update == None or task_display_update.done():
-        task_display_update = asyncio.create_task(display_update_mode())
-        await task_display_update
+        finally:
+            # Time the next Set Date Time (a failed sync is retried sooner, the display stays blank until the RTC is set
+            # so a failed Wi-Fi connection or sync is retried after sync_interval_min whatever the sync history says)
+            if jmbtime.rtc_set():
+                timer_setdt.timer_seconds = jmbtime.next_sync()
+            else:
+                timer_setdt.timer_seconds = jmbtime.sync_interval_min
+            timer_setdt.reset()
+
+    # Show the time now (Display Update mode, see timer_display_update)
+    event_rtc_set.set()
     
     # Turn off the led to indicate the mode is finished
     led.off()
 
-async def display_update_mode():
+async def display_update_mode(next_minute=False):
     """
     Updates the display with the date and time as set in the Real Time Clock (RTC)
+
+    next_minute (bool) - False (default) = show the current time now, True = show the next minute, landing the flaps on the
+        minute boundary: the move starts early by its expected duration (from the planned steps and step rates) and the
+        landing error and longest step burst are logged each minute
     """
     global display
+    global event_rtc_set
     global jmbtime
-
-    # Get the datetime tuple (year, month (1-12), day (1-31), weekday (0-6:Sun-Sat), hour (1-12), min (0-59), sec (0-59), meridiem (AM/PM))
-    dt = jmbtime.get_localtime()
-
-    # Update the display
-    display.display_datetime(dt)
-    # print(dt) # Debug line
+    global landing_log
+
+    if not next_minute:
+        # Get the datetime tuple (year, month (1-12), day (1-31), weekday (0-6:Sun-Sat), hour (1-12), min (0-59), sec (0-59), meridiem (AM/PM))
+        dt = jmbtime.get_localtime()
+        targets = display.datetime_targets(dt)
+        if max(display.expected_steps(targets)) > 0:
+            startup_mark(f'Flaps moving to {dt[4]}:{dt[5]:02} {dt[7]}')
+
+        # Update the display (steps in short bursts so buttons, timers, LED and web server keep running)
+        await display.move_to(targets)
+        startup_mark(f'Time shown: {dt[4]}:{dt[5]:02} {dt[7]}')
+        return
+
+    # Millisecond resolution of the minute boundary (anchor ticks_ms to the RTC second)
+    if jmbtime.needs_sync():
+        await jmbtime.sync_ticks()
+
+    # Ticks of the next minute boundary and the time shown from then
+    boundary_ms = time.ticks_add(time.ticks_ms(), jmbtime.ms_to_minute())
+    dt = jmbtime.get_localtime(1)
+    targets = display.datetime_targets(dt)
+
+    # Wait until shortly before the move must start (expected duration plus time to plan and post the move)
+    lead_ms = display.expected_move_us(targets) // 1000 + 200
+    wait_ms = time.ticks_diff(boundary_ms, time.ticks_ms()) - lead_ms
+    if wait_ms > 0:
+        try:
+            # The RTC was set while waiting, timer_display_update shows the current time instead
+            await asyncio.wait_for_ms(event_rtc_set.wait(), wait_ms)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+    # Land on the minute boundary (a move that is late starts right away)
+    land_us = time.ticks_add(time.ticks_us(), time.ticks_diff(boundary_ms, time.ticks_ms()) * 1000)
+    await display.move_to(targets, land_us)
+
+    # Wait for the boundary if nothing had to move
+    wait_ms = time.ticks_diff(boundary_ms, time.ticks_ms())
+    if wait_ms >= 0:
+        await asyncio.sleep_ms(wait_ms + 1)
+
+    # Log the landing error and longest step burst (see Display.lag_max_us) of each minute (written once an hour to limit
+    #   flash writes)
+    if display.land_error_us is not None:
+        landing_log.append(f'{dt[4]}:{dt[5]:02} {dt[7]} - landed {display.land_error_us // 1000} ms from the minute boundary, longest step burst {display.lag_max_us // 1000} ms')
+    if len(landing_log) >= 60:
+        log = Log('landing.dat')
+        log.write('\n'.join(landing_log), 'w')
+        landing_log = []
 
 
 ########## Main Method
@@ -260,24 +502,44 @@ async def main():
     """
     Main program loop
     """
+    global display
+    global event_rtc_set
+    global jmbtime
     global task_setdt
     global timer_setdt
 
-    # Set the Date Time
-    task_setdt = asyncio.create_task(setdt_mode())
-    await task_setdt
+    startup_mark('Main started')
+
+    # Run the stepper motors on the second core (core 1), the asyncio loop on core 0 no longer competes with step timing
+    display.start_core()
 
-    # Waiters and Timers
-    asyncio.create_task(timer_display_update()) # This will update the display immediately again, however, the previous code should have already set the correcte date/time
+    # Waiters and Timers (the display shows the RTC time right away if it is set, e.g. after a soft reboot)
+    if jmbtime.rtc_set():
+        event_rtc_set.set()
+    else:
+        startup_mark('RTC not set, the display waits for the date and time')
+    asyncio.create_task(timer_display_update())
     asyncio.create_task(waiter_timer_setdt())
     asyncio.create_task(waiter_btn_config_click())
     asyncio.create_task(waiter_btn_config_cancel_click())
     asyncio.create_task(waiter_btn_setdt_click())
     asyncio.create_task(waiter_btn_setdt_cancel_click())
+    asyncio.create_task(waiter_calibrate())
+    asyncio.create_task(waiter_timer_health())
+
+    # Set the Date Time in the background (Wi-Fi and NTP take several seconds)
+    task_setdt = asyncio.create_task(setdt_mode())
+
+    # Buttons respond once the waiters are running
+    await asyncio.sleep_ms(0)
+    startup_mark('Buttons ready')
 
     # Start the Set Date and Time Timer
     timer_setdt.start()
 
+    # Start the Health Timer
+    timer_health.start()
+
     # Infinite loop
     while True:
         # Ensure the program continues to run
@@ -285,30 +547,49 @@ async def main():
 
 #### Globals
 
+# Startup log - milliseconds since the Pico started of each startup event (see startup_mark)
+startup_log = []
+
 # Events
 event_timer_setdt = asyncio.Event()
+event_timer_health = asyncio.Event()
 event_btn_config_click = asyncio.Event()
 event_btn_config_cancel_click = asyncio.Event()
 event_btn_setdt_click = asyncio.Event()
 event_btn_setdt_cancel_click = asyncio.Event()
 event_config_exit = asyncio.Event() # Used in wifi app to indicate when user clicks Exit
+event_calibrate = asyncio.Event() # Used in wifi app and Set Date Time long click to start the display calibration
+event_rtc_set = asyncio.Event() # RTC set (startup, Set Date Time mode, Configuration mode), the display shows the time right away
 
 # Objects
 config = Config()
-display = Display([15,14,13],[1,2,3,4,5])
-timer_setdt = Timer(event_timer_setdt, 3600, 60) # One hour timer (3,600 seconds) wait 1 min (60 sec) between timer checks
+display = Display([15,14,13],[1,2,3,4,5], output=ShiftRegisterPIO)
+calibration = Calibration(display.display_count)
+display.load_calibration(calibration)
+positions = Positions(display.display_count) # Flap positions of the last moves, displays whose position is trusted skip the home search at startup
+display.positions = positions
+display.restore_positions()
+health = Health(display.display_count)
+timer_health = Timer(event_timer_health, 6 * 3600, 60) # Flush health counters every 6 hours (limits flash writes)
 btn_config = Button(18, event_btn_config_click, event_btn_config_cancel_click)
 btn_setdt = Button(19, event_btn_setdt_click, event_btn_setdt_cancel_click)
 jmbtime = JMBTime(config.timezone)
+timer_setdt = Timer(event_timer_setdt, jmbtime.sync_interval, 60) # NTP sync interval, set after each sync (see setdt_mode) wait 1 min (60 sec) between timer checks
 led = LED(16)
-wifiap = WIFIAP(event_config_exit)
+wifiap = WIFIAP(display.display_count, event_config_exit, event_calibrate)
 wifi = WIFI()
 
+# Landing errors of the display updates (see display_update_mode)
+landing_log = []
+
 # Tasks
+task_calibrate = None
 task_config = None
 task_display_update = None
 task_setdt = None
 
+startup_mark(f'Objects created, positions restored for {display.display_count - display.flap_value_current.count(None)} of {display.display_count} displays')
+
 # Start the prgoram
 try:
     asyncio.run(main())
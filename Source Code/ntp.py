@@ -0,0 +1,144 @@
+# Asynchronous Network Time Protocol (NTP) client
+#   Requests are sent to every server at once on non-blocking UDP sockets, replies are polled between short asyncio sleeps
+#   so the buttons, LED, timers and display keep running while waiting (ntptime.settime blocks until its socket times out)
+import asyncio
+import socket
+import struct
+from time import ticks_diff, ticks_ms
+
+class NTP:
+    """
+    NTP client (RFC 5905 client mode): queries several servers concurrently and keeps the reply with the shortest round
+    trip (its offset is the most accurate)
+
+    Each reply gives the four NTP timestamps of the exchange:
+        t1 - client transmit (local clock), t2 - server receive, t3 - server transmit, t4 - client receive (local clock)
+        offset = ((t2 - t1) + (t3 - t4)) / 2 - server clock minus the local clock, exact when the network delay is the same
+            both ways (the error is at most half the delay)
+        delay = (t4 - t1) - (t3 - t2) - network round trip (the time the server held the request is excluded)
+
+    Timestamps are integer microseconds since the NTP epoch (01-Jan-1900 00:00 UTC)
+
+    Methods:
+    query(local_us) - async, queries the servers and returns the best sample (offset, delay, server)
+    to_us(data, index) - microseconds of the NTP timestamp at a byte index of a packet
+    """
+
+    # NTP timestamps count seconds and fractions of 2^32 per second
+    _FRACTION = 1 << 32
+
+    def __init__(self, servers, port=123, timeout_ms=1000, attempts=3, poll_ms=1):
+        """
+        Setup the NTP client
+
+        servers ([str,...]) - host names or IP addresses of the NTP servers
+        port (int) - UDP port of the servers (default: 123)
+        timeout_ms (int) - milliseconds to wait for the replies of an attempt (default: 1000)
+        attempts (int) - requests sent to a server that has not replied (lost packets, default: 3)
+        poll_ms (int) - milliseconds between checks for replies, adds up to poll_ms to the measured delay (default: 1)
+        """
+        self.servers = servers
+        self.port = port
+        self.timeout_ms = timeout_ms
+        self.attempts = attempts
+        self.poll_ms = poll_ms
+
+        # Samples of the last query: (offset_us, delay_us, server) of every valid reply
+        self.samples = []
+
+    async def query(self, local_us):
+        """
+        Send a request to every server, wait for the replies (sending again to servers that did not reply) and return the
+        sample with the shortest delay
+
+        local_us (function) - returns the local clock in microseconds since the NTP epoch (t1 and t4)
+
+        return ((int,int,str)) - (offset_us, delay_us, server) of the best sample, None if no server replied
+        """
+        self.samples = []
+
+        # One non-blocking socket per server (a server that cannot be resolved is skipped)
+        #   [server, address, socket, transmit timestamp of the request waiting for its reply (None = not sent), replied]
+        requests = []
+        for server in self.servers:
+            try:
+                address = socket.getaddrinfo(server, self.port)[0][-1]
+            except OSError:
+                continue
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            requests.append([server, address, sock, None, False])
+
+        try:
+            for _ in range(self.attempts):
+                # Send to the servers that have not replied: LI 0, version 4, mode 3 (client), t1 as the transmit timestamp
+                waiting = 0
+                for request in requests:
+                    if not request[4]:
+                        packet = bytearray(48)
+                        packet[0] = 0x23
+                        t1 = local_us()
+                        struct.pack_into('!II', packet, 40, t1 // 1_000_000, (t1 % 1_000_000) * self._FRACTION // 1_000_000)
+                        try:
+                            request[2].sendto(packet, request[1])
+                            request[3] = packet[40:48]
+                            waiting += 1
+                        except OSError:
+                            pass
+
+                # Poll for replies until every server has replied or the attempt times out
+                start = ticks_ms()
+                while waiting > 0 and ticks_diff(ticks_ms(), start) < self.timeout_ms:
+                    await asyncio.sleep_ms(self.poll_ms)
+                    for request in requests:
+                        if request[3] is None or request[4]:
+                            continue
+                        try:
+                            data = request[2].recv(48)
+                        except OSError:
+                            continue
+                        t4 = local_us()
+                        sample = self._sample(data, request[3], t4)
+                        if sample is not None:
+                            self.samples.append((sample[0], sample[1], request[0]))
+                            request[4] = True
+                            waiting -= 1
+
+                # Servers that did not reply are sent a new request (a late reply to this one no longer matches)
+                if waiting == 0:
+                    break
+        finally:
+            for request in requests:
+                request[2].close()
+
+        if not self.samples:
+            return None
+        return min(self.samples, key=lambda sample: sample[1])
+
+    def _sample(self, data, transmit, t4):
+        """
+        Return (offset_us, delay_us) from a reply, None if the reply is not valid: too short, not from a server (mode 4),
+        unsynchronized (leap indicator 3, stratum 0 = kiss-o'-death or above 15) or not the reply to this request (its
+        originate timestamp must be the transmit timestamp of the request)
+
+        data (bytes) - reply packet
+        transmit (bytes) - transmit timestamp sent in the request (8 bytes)
+        t4 (int) - local clock when the reply was received
+        """
+        if len(data) < 48 or data[0] & 0x07 != 4 or data[0] >> 6 == 3 or not 1 <= data[1] <= 15 or data[24:32] != transmit:
+            return None
+
+        t1 = self.to_us(data, 24)
+        t2 = self.to_us(data, 32)
+        t3 = self.to_us(data, 40)
+        return ((t2 - t1) + (t3 - t4)) // 2, (t4 - t1) - (t3 - t2)
+
+    def to_us(self, data, index):
+        """
+        Return the microseconds since the NTP epoch of the 64-bit NTP timestamp (seconds, fraction) at an index of a packet
+
+        data (bytes) - NTP packet
+        index (int) - byte index of the timestamp
+        """
+        seconds, fraction = struct.unpack_from('!II', data, index)
+        return seconds * 1_000_000 + (fraction * 1_000_000 + self._FRACTION // 2) // self._FRACTION
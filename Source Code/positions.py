@@ -0,0 +1,132 @@
+import json
+
+class Positions:
+    """
+    Handles the positions file: the last confirmed flap of each split-flap display, restored at startup so displays
+    whose position can be trusted do not search for home (see Display.restore_positions)
+    Display writes the file at most every Display.positions_interval_ms (or when a display's position was unknown), the
+    moves in between are appended to a small journal: a record before a move marks the displays about to move and a
+    record after it gives their new flaps. A display still marked as moving at startup (no record of the end of its last
+    move) may have been turning when the power went off
+
+    Properties:
+
+    file (str) - name of the positions file
+
+    journal (str) - name of the journal file, one JSON line per record, emptied each time the positions file is written
+
+    display_count (int) - number of split-flap displays
+
+    flap ([int,...]) - flap index shown by each display (None = unknown)
+
+    phase ([int,...]) - last seq table index energized by each motor (the next step continues the coil sequence)
+
+    home_passes ([int,...]) - passes over Home of each display since its last home search (see Display.home_interval)
+
+    steps_rev ([int,...]) - steps per revolution of each display when saved (positions are not trusted if it changed)
+
+    home_reads ([int,...]) - home offset of each display when saved (positions are not trusted if it changed)
+
+    drive_mode ([str,...]) - drive mode of each display when saved (positions are not trusted if it changed)
+
+    moving ([bool,...]) - True if the display was about to move (the end of the move was not recorded)
+
+    Methods:
+
+    read() - Read values in from positions file, then the records of the journal
+
+    write() - Write current values to positions file and empty the journal
+
+    add(record) - Append a record to the journal (and apply it to the current values)
+    """
+
+    def __init__(self, display_count):
+        """
+        Setup the positions object
+
+        display_count (int) - number of split-flap displays (Display.display_count, from its layout)
+        """
+        self.file = "positions.dat"
+        self.journal = "moves.dat"
+        self.display_count = display_count
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the positions file. If file doesn't exist, every flap is unknown (None)
+        The journal records are applied in order, a record cut short by the power going off ends the journal
+        """
+        self.flap = [None] * self.display_count
+        self.phase = [7] * self.display_count
+        self.home_passes = [0] * self.display_count
+        self.steps_rev = [None] * self.display_count
+        self.home_reads = [None] * self.display_count
+        self.drive_mode = [None] * self.display_count
+        self.moving = [True] * self.display_count
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            for i, display in enumerate(settings['displays'][:self.display_count]):
+                self.flap[i] = display.get('flap', None)
+                self.phase[i] = display.get('phase', 7)
+                self.home_passes[i] = display.get('home_passes', 0)
+                self.steps_rev[i] = display.get('steps_rev', None)
+                self.home_reads[i] = display.get('home_reads', None)
+                self.drive_mode[i] = display.get('drive_mode', None)
+                self.moving[i] = display.get('moving', True)
+        except (OSError, KeyError, ValueError):
+            pass
+
+        try:
+            with open(self.journal, 'r') as f:
+                for line in f:
+                    self._apply(json.loads(line))
+        except (OSError, ValueError, TypeError, IndexError):
+            pass
+
+    def write(self):
+        """
+        Write values to the positions file, then empty the journal (its records are in the file)
+        """
+        settings = {
+            'displays' : [{
+                'flap' : self.flap[i],
+                'phase' : self.phase[i],
+                'home_passes' : self.home_passes[i],
+                'steps_rev' : self.steps_rev[i],
+                'home_reads' : self.home_reads[i],
+                'drive_mode' : self.drive_mode[i],
+                'moving' : self.moving[i]
+            } for i in range(self.display_count)]
+        }
+        with open(self.file, 'w') as f:
+            json.dump(settings, f)
+        with open(self.journal, 'w') as f:
+            pass
+
+    def add(self, record):
+        """
+        Append a record to the journal and apply it to the current values
+
+        record ([[int,...],...]) - one entry per display, first value the display index
+            [index] - the display is about to move
+            [index, flap, phase, home_passes] - the display's move ended (flap None = position unknown)
+        """
+        self._apply(record)
+        with open(self.journal, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def _apply(self, record):
+        """
+        Apply a journal record to the current values (see add)
+        """
+        for entry in record:
+            i = entry[0]
+            if i >= self.display_count:
+                continue
+            if len(entry) == 1:
+                self.moving[i] = True
+            else:
+                self.flap[i], self.phase[i], self.home_passes[i] = entry[1:4]
+                self.moving[i] = False
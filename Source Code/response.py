@@ -1,6 +1,9 @@
 import network
+from calibration import Calibration
 from config import Config
+from health import Health
 from jmbtime import JMBTime
+from timezones import TimeZones
 # from log import Log
 
 class Response:
@@ -8,7 +11,9 @@ class Response:
     Handles Get/Post requests and prepares a web response
 
     Attributes
+    display_count (int) - number of split-flap displays (sizes the calibration and health pages)
     exit_config (bool) - True if user wishes to exit configuration mode
+    calibrate (bool) - True if user wishes to run the display calibration
     http_status (int) - HTTP Status of the response (200 = OK, 404 = Page requested not found)
     body (str) = HTML to insert into the body of the response
 
@@ -18,19 +23,27 @@ class Response:
         /settings   Config settings form (WiFi and NTP use)
         /settime    Manually set date and time
         /log        Log messages
+        /calibrate  Display calibration (measured values and home offsets)
+        /calibrate/run  Run the display calibration
+        /health     Display health counters
         /exit       Exit configuration mode
     
     post(url, kv) - Post request, currently handles:
         /settings/configure     User's responses to the Config settings form
         /settime/configure      User's reseponse to setting date and time manually
+        /calibrate/configure    User's home offsets of each display
         
     """
 
-    def __init__(self):
+    def __init__(self, display_count):
         """
         Initialize the response class
+
+        display_count (int) - number of split-flap displays (Display.display_count, from its layout)
         """
+        self.display_count = display_count
         self.exit_config = False
+        self.calibrate = False
         self.http_status = 200
         self.body = ""
     
@@ -50,6 +63,13 @@ class Response:
             self.body = self._get_settime()
         elif url == '/log':
             self.body = self._get_log()
+        elif url == '/health':
+            self.body = self._get_health()
+        elif url == '/calibrate':
+            self.body = self._get_calibrate()
+        elif url == '/calibrate/run':
+            self.calibrate = True
+            self.body = self._get_calibrate_run()
         elif url == '/exit':
             self.exit_config = True
             self.body = self._get_exit()
@@ -70,6 +90,8 @@ class Response:
             self.body = self._post_configure(kv)
         elif url == '/settime/configure':
             self.body = self._post_settime(kv)
+        elif url == '/calibrate/configure':
+            self.body = self._post_calibrate(kv)
         else:
             self.http_status = 404
             self.body = '<p>Unexpected request</p><p>Return to the <a href="/">Home Page</a></p>'
@@ -81,6 +103,8 @@ class Response:
         html = """<p><a href="/settings">Edit Settings</a></p>
             <p><a href="/settime">Manually set the date and time</a></p>
             <p><a href="/log">View Log</a> - program log messages</p>
+            <p><a href="/calibrate">Calibrate Displays</a></p>
+            <p><a href="/health">Display Health</a> - moves, slips and failures of each display</p>
             <p><a href="/exit">Exit Configuration</a></p>
         """
         return html
@@ -125,23 +149,16 @@ class Response:
         
         html += '/><label for="ntp">Enable automatic date time setting using my wifi information</label></p><p><select name="timezone">'
 
-        timezones = [
-            ['[Select One]', None], 
-            ['Eastern Standard/Daylight Time (EST/EDT)','EST EDT'],
-            ['Central Standard/Daylight Time (CST/CDT)','CST CDT'],
-            ['Mountain Standard/Daylight Time (MST/MDT)','MST MDT'], 
-            ['Mountain Standard Time (MST)','MST'],
-            ['Pacific Standard/Daylight Time (PST/PDT)','PST PDT'],
-            ['Alaska Standard/Daylight Time (AKST/AKDT)','AKST AKDT'],
-            ['Hawaii Standard/Daylight Time (HST/HDT)','HST HDT'],
-            ['Hawaii Standard Time (HST)','HST']
-        ]
-
-        for [k, v] in timezones:
-            if v == config.timezone:
-                html += f'<option value="{v}" selected>{k}</option>'
+        # Time zones of the time zone database (see timezones.py), a time zone of the earlier settings page is shown as its
+        #   IANA name. The options are joined once (hundreds of zones, adding each to html would copy it every time)
+        selected = TimeZones.ALIASES.get(config.timezone, config.timezone)
+        options = ['<option value="None">[Select One]</option>']
+        for zone in TimeZones().zones():
+            if zone == selected:
+                options.append(f'<option selected>{zone}</option>')
             else:
-                html += f'<option value="{v}">{k}</option>'
+                options.append(f'<option>{zone}</option>')
+        html += ''.join(options)
 
         html += '</select></p><p><input type="submit" value="Submit" /></p></form><br /><p><a href="/">Return to Home Page</a></p>'
 
@@ -152,8 +169,8 @@ class Response:
         Settings form to manually set date and time
         """
 
-        # Retrieve the current date time according to the Real Time Clock (RTC)
-        jmbtime = JMBTime()
+        # Retrieve the current date time according to the Real Time Clock (RTC, UTC converted to the configured timezone)
+        jmbtime = JMBTime(Config().timezone)
         dt = jmbtime.get_localtime()
         hr = dt[4] if dt[7] == 'AM' else dt[4]+12
 
@@ -164,10 +181,23 @@ class Response:
             <p><input type="datetime-local" name="dt" value="{dt[0]}-{dt[1]:02}-{dt[2]:02}T{hr:02}:{dt[5]:02}" required></p>
             <p><input type="submit" value="Submit"></p>
             </form>
-            <br />
-            <p><a href="/">Return to Home Page</a></p>
         """
 
+        # RTC drift and the next NTP sync (sync history saved by Set Date Time mode)
+        history = jmbtime.sync_history
+        if history.next_sync is not None:
+            ns = jmbtime._localtime(history.next_sync * 1_000_000)
+            html += f"""<p>Clock drift: {history.drift_ppm:+.1f} ppm ({history.drift_ppm * 0.0864:+.2f} seconds per day, corrected between NTP syncs)</p>
+            <p>NTP sync every {history.interval // 60} minutes, next at {ns[4]}:{ns[5]:02} {ns[7]}</p>
+        """
+
+        # NTP server addresses from the DNS cache (saved by Set Date Time mode)
+        counters = jmbtime.dns_cache.counters
+        if sum(counters.values()) > 0:
+            html += f'<p>NTP server addresses: {counters["hits"]} cached, {counters["stale"]} refreshed while in use, {counters["misses"]} looked up first</p>'
+
+        html += '<br /><p><a href="/">Return to Home Page</a></p>'
+
         return html
     
     def _get_log(self):
@@ -175,6 +205,74 @@ class Response:
         # return '<h2>Log</h2><p>' + log.read() + '</p><p><a href="/">Return to Home Page</a></p>'
         return '<h2>Log</h2><p>To be developed</p><a href="/">Return to Home Page</a></p>'
     
+    def _get_health(self):
+        """
+        Health page: counters of each display (a display with a rising slip or failure count needs attention)
+        """
+
+        # Retrieve the health counters
+        health = Health(self.display_count)
+        c = health.counters
+
+        html = """<h2>Display Health</h2>
+            <table><tr><th>Display</th><th>Moves</th><th>Steps</th><th>Home Searches</th><th>Slips</th><th>Slips per 1,000 Moves</th><th>Retries</th><th>Failures</th></tr>
+        """
+
+        for i in range(health.display_count):
+            html += f'<tr><td>{i+1}</td><td>{c["moves"][i]}</td><td>{c["steps"][i]}</td><td>{c["homing"][i]}</td><td>{c["slips"][i]}</td><td>{health.slip_rate(i):.1f}</td><td>{c["retries"][i]}</td><td>{c["failures"][i]}</td></tr>'
+
+        html += '</table><br /><p><a href="/">Return to Home Page</a></p>'
+
+        return html
+
+    def _get_calibrate(self, error=None):
+        """
+        Calibration page: measured values of each display and form to set the home offsets
+
+        error (str) - message shown above the form when the values submitted were not valid (default: None)
+        """
+
+        # Retrieve current calibration values
+        calibration = Calibration(self.display_count)
+
+        html = '<h2>Calibrate Displays</h2>'
+        if error != None:
+            html += f'<p><b>{error}</b></p>'
+        html += """
+            <p>Calibration turns each display until it passes its magnet three times, measuring the steps per revolution
+            and magnet width from the hall sensor, then turns it at increasing step rates to find its fastest rate without
+            lost steps (max rate). The home offset is the number of steps from the first magnet read to
+            the home flap, increase it if a display stops short of its flap, decrease it if it turns past.</p>
+            <p>Drive mode: Full (two coils, most torque), Wave (one coil, less current and torque) or Half (twice the steps
+            per revolution, smoother). Steps are converted when the mode changes, run calibration again to measure them.</p>
+            <form method="post" action="/calibrate/configure">
+            <table><tr><th>Display</th><th>Drive Mode</th><th>Steps per Revolution</th><th>Magnet Width</th><th>Max Rate</th><th>Home Offset</th></tr>
+        """
+
+        for i in range(calibration.display_count):
+            steps_rev = calibration.steps_rev[i] if calibration.steps_rev[i] != None else 'Not measured'
+            magnet_width = calibration.magnet_width[i] if calibration.magnet_width[i] != None else 'Not measured'
+            rate_max = calibration.rate_max[i] if calibration.rate_max[i] != None else 'Not measured'
+            home_reads = calibration.get_home_reads(i)
+            modes = ''.join([f'<option value="{mode}"{" selected" if mode == calibration.drive_mode[i] else ""}>{mode.title()}</option>' for mode in ('full', 'wave', 'half')])
+            html += f'<tr><td>{i+1}</td><td><select name="mode_{i}">{modes}</select></td><td>{steps_rev}</td><td>{magnet_width}</td><td>{rate_max}</td><td><input type="number" name="home_{i}" value="{home_reads}" min="0" max="4096" /></td></tr>'
+
+        html += '</table><p><input type="submit" value="Save" /></p></form>'
+        html += '<p><a href="/calibrate/run">Run Calibration</a></p><br /><p><a href="/">Return to Home Page</a></p>'
+
+        return html
+
+    def _get_calibrate_run(self):
+        """
+        User started the calibration, the displays turn while the page is shown
+        """
+        html = """<h2>Calibration Started</h2>
+            <p>The displays are turning to measure each display and find its fastest step rate, this takes about 2 minutes.</p>
+            <p><a href="/calibrate">View Calibration</a> once the displays stop.</p>
+        """
+
+        return html
+
     def _get_exit(self):
         """
         User is going to exit, prior to exiting, send a message indicating Configuration mode is exited
@@ -199,8 +297,6 @@ class Response:
         timezone = kv.get('timezone',None)
         if timezone == '' or timezone == 'None':
             timezone = None
-        else: 
-            timezone = timezone.replace('+',' ')
 
         # Update the configuration file
         config = Config()
@@ -233,15 +329,58 @@ class Response:
         h = int(dt[11:13])
         n = int(dt[-2:])
 
-        # Set the Real Time Clock (RTC)
-        jmbtime = JMBTime()
+        # Set the Real Time Clock (RTC, the local time entered is stored as UTC)
+        jmbtime = JMBTime(Config().timezone)
         jmbtime.set_rtc(y, m, d, h, n)
 
-        # TODO: Move the display
+        # The display shows the new time when Configuration mode exits (see config_mode in main.py)
         
         # Indicate success
         html = """<h2>Set Date Time Success</h2>
             <p>Date Time updated successfully.</p>
             <p><a href="/">Home Page</a></p>
         """
-        return html
\ No newline at end of file
+        return html
+
+    def _post_calibrate(self, kv: dict):
+        """
+        Takes the user's home offsets and drive modes and updates the calibration file
+
+        kv (dict) - dictionary of key-value pairs from the form the user completed
+        """
+
+        # Check every value before changing the calibration, the form is shown again with an error message if one is not
+        #   valid (blank home offset = Display default)
+        calibration = Calibration(self.display_count)
+        home_reads = []
+        modes = []
+        for i in range(calibration.display_count):
+            value = kv.get(f'home_{i}', '').strip()
+            try:
+                value = int(value) if value != '' else None
+            except ValueError:
+                value = -1
+            if value != None and not 0 <= value <= 4096:
+                return self._get_calibrate(f'Display {i+1}: the home offset must be a whole number of steps from 0 to 4096')
+            home_reads.append(value)
+
+            mode = kv.get(f'mode_{i}', calibration.drive_mode[i])
+            if mode not in calibration.drive_modes:
+                return self._get_calibrate(f'Display {i+1}: unknown drive mode')
+            modes.append(mode)
+
+        # Update the calibration file (measured values are kept, converted to steps of a new drive mode)
+        for i in range(calibration.display_count):
+            calibration.home_reads[i] = home_reads[i]
+            if modes[i] != calibration.drive_mode[i]:
+                calibration.set_drive_mode(i, modes[i])
+        calibration.write()
+
+        # Notify user of success
+        html = """<h2>Calibration Success</h2>
+            <p>Home offsets and drive modes updated successfully, they are used after exiting configuration.</p>
+            <p><a href="/calibrate">Calibrate Displays</a></p>
+            <p><a href="/">Home Page</a></p>
+        """
+
+        return html
@@ -0,0 +1,218 @@
+# Output backends for the 74HC595 shift register chain
+# Every backend exposes the same write(data) method so the Display class can use any of them:
+#   data ([byte,...]) - one byte per shift register, index 0 = first shift register (left-most displays)
+#   Bytes are sent in reverse order (right-most displays = farthest shift register), least significant bit first
+# Shift registers can be split into several chains sharing the clock and latch, each with its own serial input pin:
+#   pins_sr = [clock, latch, serial chain 0, serial chain 1, ...]
+#   Shift registers are numbered chain by chain (chain_length = shift_register_count / chains, rounded up), e.g. 2 chains
+#   of 6 shift registers: 0-2 = chain 0, 3-5 = chain 1. The chains are shifted at the same time, so a frame takes
+#   8 * chain_length clock pulses however many chains are added
+from machine import Pin, SPI
+import rp2
+from time import sleep_us
+
+class ShiftRegisterBitBang:
+    """
+    Original output path: toggles the clock, latch and serial pins in software (slow, works on any pins)
+
+    Methods:
+    write(data) - shift the bytes through the chain and latch the outputs
+    """
+
+    def __init__(self, pins_sr, shift_register_count, delay_us=200):
+        """
+        Initialize the bit-bang output
+
+        pins_sr ([int,int,int,...]) - Clock (pin 11), Latch (pin 12), Serial Input (pin 14) of each chain
+        shift_register_count (int) - number of shift registers (all chains)
+        delay_us (int) - microseconds to wait between each pin change (default: 200)
+        """
+        self.pin_clock = Pin(pins_sr[0], Pin.OUT)
+        self.pin_latch = Pin(pins_sr[1], Pin.OUT)
+        self.pins_serial = [Pin(pin, Pin.OUT) for pin in pins_sr[2:]]
+        self.shift_register_count = shift_register_count
+        self.chain_count = len(self.pins_serial)
+        self.chain_length = -(-shift_register_count // self.chain_count)
+        self.delay_us = delay_us
+
+    def write(self, data):
+        """
+        Sends the desired bytes through the HC595 chain
+
+        data ([byte,...]) - data to send through shift registers, list of n bytes (n= number of shift registers)
+        """
+        # Loop bytes in reverse to send the right-digits=farthest shift register (of every chain at once)
+        self.pin_latch.low()
+        sleep_us(self.delay_us)
+
+        n = self.shift_register_count
+        length = self.chain_length
+        for i in range(length, 0, -1):
+            for bit in range(8):
+                self.pin_clock.low()
+                sleep_us(self.delay_us)
+                for chain, pin_serial in enumerate(self.pins_serial):
+                    # Registers past the end of a shorter last chain are padding (shifted out of the chain)
+                    r = chain * length + i - 1
+                    byte = data[r] if r < n else 0
+                    pin_serial.value(1 & (byte >> bit))
+                sleep_us(self.delay_us)
+
+                self.pin_clock.high()
+                sleep_us(self.delay_us)
+
+        self.pin_latch.high()
+        sleep_us(self.delay_us)
+
+class ShiftRegisterSPI:
+    """
+    Hardware SPI output: the SPI peripheral clocks the data, the latch pin is pulsed in software once the frame is sent
+
+    Note: Clock and Serial Input must be wired to SCK/TX pins of the selected SPI peripheral (e.g. SPI1: SCK=GP14, TX=GP15)
+        A single chain only (SPI has one data output), use ShiftRegisterPIO or ShiftRegisterBitBang for parallel chains
+
+    Methods:
+    write(data) - shift the bytes through the chain and latch the outputs
+    """
+
+    def __init__(self, pins_sr, shift_register_count, spi_id=1, baudrate=1_000_000):
+        """
+        Initialize the SPI output
+
+        pins_sr ([int,int,int]) - Clock (SCK), Latch (any GPIO), Serial Input (TX)
+        shift_register_count (int) - number of daisy chained shift registers
+        spi_id (int) - SPI peripheral (0 or 1, default: 1)
+        baudrate (int) - SPI clock in Hz (default: 1 MHz)
+        """
+        if len(pins_sr) != 3:
+            raise ValueError('ShiftRegisterSPI drives a single chain')
+        self.spi = SPI(spi_id, baudrate=baudrate, polarity=0, phase=0, bits=8, firstbit=SPI.MSB, sck=Pin(pins_sr[0]), mosi=Pin(pins_sr[2]))
+        self.pin_latch = Pin(pins_sr[1], Pin.OUT, value=0)
+        self.shift_register_count = shift_register_count
+
+        # RP2040 SPI only sends most significant bit first, bytes are bit-reversed to match the bit-bang order
+        self._reverse = bytearray(256)
+        for i in range(256):
+            for bit in range(8):
+                self._reverse[i] |= ((i >> bit) & 1) << (7 - bit)
+
+        # Frame buffer in wire order (reused for every write)
+        self._buf = bytearray(shift_register_count)
+
+    def write(self, data):
+        """
+        Sends the desired bytes through the HC595 chain
+
+        data ([byte,...]) - data to send through shift registers, list of n bytes (n= number of shift registers)
+        """
+        n = self.shift_register_count
+        for i in range(n):
+            self._buf[i] = self._reverse[data[n-1-i]]
+
+        self.spi.write(self._buf)
+
+        # Latch the frame (rising edge of the storage register clock)
+        self.pin_latch.high()
+        self.pin_latch.low()
+
+def _hc595_program(chain_count=1):
+    """
+    Return the PIO program for a number of parallel chains: shifts y+1 bit times (each bit time outputs one bit to the
+    serial input of every chain) with the clock on side-set, then pulses the latch
+
+    Each FIFO word holds 8 // chain_count bit times (least significant bits first)
+    """
+    @rp2.asm_pio(out_init=(rp2.PIO.OUT_LOW,) * chain_count, set_init=rp2.PIO.OUT_LOW, sideset_init=rp2.PIO.OUT_LOW, out_shiftdir=rp2.PIO.SHIFT_RIGHT, autopull=True, pull_thresh=chain_count * (8 // chain_count))
+    def program():
+        wrap_target()
+        mov(x, y)                       .side(0)
+        label("bitloop")
+        out(pins, chain_count)          .side(0) [1]
+        jmp(x_dec, "bitloop")           .side(1) [1]
+        set(pins, 1)                    .side(0) [1]
+        set(pins, 0)                    .side(0)
+        wrap()
+
+    return program
+
+class ShiftRegisterPIO:
+    """
+    PIO state machine output: the state machine clocks and latches each frame, the CPU only places bytes in the FIFO
+
+    Works on any pins (no rewiring needed), frames are shifted in microseconds and write() does not wait for completion
+    Parallel chains (up to 8) shift at the same time, their serial inputs must be consecutive GPIO pins
+
+    Methods:
+    write(data) - shift the bytes through the chain and latch the outputs
+    """
+
+    def __init__(self, pins_sr, shift_register_count, sm_id=0, freq=2_000_000):
+        """
+        Initialize the PIO output
+
+        pins_sr ([int,int,int,...]) - Clock (pin 11), Latch (pin 12), Serial Input (pin 14) of each chain (consecutive pins)
+        shift_register_count (int) - number of shift registers (all chains)
+        sm_id (int) - state machine to use (0-7, default: 0)
+        freq (int) - state machine frequency in Hz, 4 cycles per bit (default: 2 MHz = 500 kHz shift clock)
+        """
+        pins_serial = pins_sr[2:]
+        chain_count = len(pins_serial)
+        if not 1 <= chain_count <= 8 or list(pins_serial) != list(range(pins_serial[0], pins_serial[0] + chain_count)):
+            raise ValueError('ShiftRegisterPIO needs 1 to 8 serial inputs on consecutive pins')
+
+        self.shift_register_count = shift_register_count
+        self.chain_count = chain_count
+        self.chain_length = -(-shift_register_count // chain_count)
+        self.sm = rp2.StateMachine(sm_id, _hc595_program(chain_count), freq=freq, sideset_base=Pin(pins_sr[0]), set_base=Pin(pins_sr[1]), out_base=Pin(pins_serial[0]))
+
+        # Bit times per FIFO word, FIFO words per shift register byte and per frame
+        #   Frames start with padding bit times (shifted out of the chains) so every frame fills whole words
+        per_word = 8 // chain_count
+        self._groups = 8 // per_word
+        words = -(-8 * self.chain_length // per_word)
+        self._pad = words - self.chain_length * self._groups
+
+        # Spread - the FIFO words of each shift register byte for chain 0 (chain c = shifted left by c), one bit per bit time
+        self._spread = bytearray(256 * self._groups)
+        for value in range(256):
+            for bit in range(8):
+                self._spread[value * self._groups + bit // per_word] |= ((value >> bit) & 1) << (bit % per_word * chain_count)
+
+        # Load the number of bit times per frame (minus 1) into the y register
+        self.sm.put(words * per_word - 1)
+        self.sm.exec("pull()")
+        self.sm.exec("mov(y, osr)")
+        self.sm.exec("out(null, 32)") # Empty the OSR so the first data word is auto-pulled
+        self.sm.active(1)
+
+        # Frame buffer in wire order (reused for every write), each byte is placed in the FIFO as one word
+        self._buf = bytearray(words)
+
+    def write(self, data):
+        """
+        Sends the desired bytes through the HC595 chains
+
+        data ([byte,...]) - data to send through shift registers, list of n bytes (n= number of shift registers)
+        """
+        buf = self._buf
+        spread = self._spread
+        groups = self._groups
+        n = self.shift_register_count
+        length = self.chain_length
+        if self.chain_count == 1:
+            # Single chain: one byte per word, in reverse order
+            for i in range(n):
+                buf[i] = data[n-1-i]
+        else:
+            for i in range(len(buf)):
+                buf[i] = 0
+            for chain in range(self.chain_count):
+                for q in range(length):
+                    r = chain * length + length - 1 - q
+                    if r < n:
+                        s = data[r] * groups
+                        o = self._pad + q * groups
+                        for g in range(groups):
+                            buf[o + g] |= spread[s + g] << chain
+
+        self.sm.put(buf)
@@ -0,0 +1,89 @@
+import json
+
+class SyncHistory:
+    """
+    Handles the NTP sync history file: the offsets measured by the last syncs, the RTC drift estimated from them and the
+    adapted sync interval (see JMBTime.set_rtc_ntp). The drift is a property of the Pico's crystal, so it is kept across
+    restarts and corrects the clock from the first sync after a restart
+
+    Properties:
+
+    file (str) - name of the sync history file
+
+    size (int) - number of syncs kept
+
+    syncs ([[int,int,int,int],...]) - [utc, offset_us, delay_us, elapsed] of each sync, oldest first
+        utc - NTP time of the sync, seconds since the NTP epoch (01-Jan-1900)
+        offset_us - NTP time minus the RTC (the RTC was set to NTP time elapsed seconds before)
+        delay_us - round trip to the NTP server
+        elapsed - seconds since the previous sync
+
+    drift_ppm (float) - RTC drift, microseconds the RTC gains per second (negative = loses)
+
+    interval (int) - seconds between NTP syncs
+
+    next_sync (int) - RTC time the next sync is due, seconds since the NTP epoch (None = no sync yet)
+
+    Methods:
+
+    read() - Read values in from sync history file
+
+    write() - Write current values to sync history file
+
+    add(utc, offset_us, delay_us, elapsed) - Add a sync to the history (the oldest is removed once there are size syncs)
+    """
+
+    def __init__(self, size=8):
+        """
+        Setup the sync history object
+
+        size (int) - number of syncs kept (default: 8)
+        """
+        self.file = "sync.dat"
+        self.size = size
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the sync history file. If file doesn't exist, there is no drift and syncs are an hour apart
+        """
+        self.syncs = []
+        self.drift_ppm = 0.0
+        self.interval = 3600
+        self.next_sync = None
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            self.syncs = settings.get('syncs', [])[-self.size:]
+            self.drift_ppm = float(settings.get('drift_ppm', 0.0))
+            self.interval = int(settings.get('interval', 3600))
+            self.next_sync = settings.get('next_sync', None)
+        except (OSError, ValueError):
+            pass
+
+    def write(self):
+        """
+        Write values to the sync history file
+        """
+        settings = {
+            'syncs' : self.syncs,
+            'drift_ppm' : self.drift_ppm,
+            'interval' : self.interval,
+            'next_sync' : self.next_sync
+        }
+        with open(self.file, 'w') as f:
+            json.dump(settings, f)
+
+    def add(self, utc, offset_us, delay_us, elapsed):
+        """
+        Add a sync to the history
+
+        utc (int) - NTP time of the sync (seconds since the NTP epoch)
+        offset_us (int) - NTP time minus the RTC
+        delay_us (int) - round trip to the NTP server
+        elapsed (int) - seconds since the previous sync
+        """
+        self.syncs.append([utc, offset_us, delay_us, elapsed])
+        if len(self.syncs) > self.size:
+            self.syncs.pop(0)
@@ -0,0 +1,128 @@
+import struct
+
+class TimeZones:
+    """
+    Reads the time zone database file (compiled from the IANA time zone database by Documentation/build_timezones.py).
+    Only the index entries searched and the selected zone's record are read from the file, so loading a zone holds a few
+    hundred bytes at most
+
+    File layout (little-endian, offsets in minutes, times in UTC minutes since the NTP epoch 01-Jan-1900):
+
+        header - b'TZDB', version (1 byte), unused (1 byte), number of zones (2 bytes)
+        index - per zone sorted by name: file position of the name (4 bytes), file position of the record (4 bytes)
+        names - per zone: length (1 byte), name (UTF-8)
+        records - per zone:
+            offset before the first transition (2 bytes), number of transitions (2 bytes)
+            transitions - time (4 bytes), offset from then on (2 bytes)
+            rule (after the last transition) - standard offset (2 bytes), daylight offset (2 bytes), daylight savings
+                start and end: month (1 byte, 0 = no daylight savings), week (1 byte, 1-5, 5 = last), weekday (1 byte,
+                0=Sunday), minutes after midnight local time (2 bytes, standard time for the start, daylight for the end)
+
+    Properties:
+
+    file (str) - name of the time zone database file
+
+    ALIASES (dict) - time zones of the earlier settings page and their IANA names
+
+    Methods:
+
+    zones() - Generator of the time zone names in the file (sorted), nothing if the file doesn't exist
+
+    load(name) - Return the record of a time zone (see load), None if the time zone or the file doesn't exist
+    """
+
+    MAGIC = b'TZDB'
+    VERSION = 1
+
+    ALIASES = {
+        'EST EDT': 'America/New_York',
+        'CST CDT': 'America/Chicago',
+        'MST MDT': 'America/Denver',
+        'MST': 'America/Phoenix',
+        'PST PDT': 'America/Los_Angeles',
+        'AKST AKDT': 'America/Anchorage',
+        'HST HDT': 'America/Adak',
+        'HST': 'Pacific/Honolulu'
+    }
+
+    def __init__(self):
+        """
+        Setup the time zones object
+        """
+        self.file = "timezones.dat"
+
+    def zones(self):
+        """
+        Generator of the time zone names in the file, sorted (the names follow the index in the same order)
+        """
+        try:
+            with open(self.file, 'rb') as f:
+                count = self._header(f)
+                if count == 0:
+                    return
+                f.seek(8)
+                f.seek(struct.unpack('<I', f.read(4))[0])
+                for _ in range(count):
+                    yield f.read(f.read(1)[0]).decode('utf-8')
+        except (OSError, ValueError):
+            return
+
+    def load(self, name):
+        """
+        Return the record of a time zone, the index is searched by seeking (binary search) and only the zone's record
+        is read
+
+        name (str) - IANA time zone name (or one of the ALIASES)
+
+        return (tuple) - (initial, transitions, rule), None if the time zone or the file doesn't exist
+            initial (int) - seconds ahead of UTC before the first transition
+            transitions (((int,int),...)) - (UTC seconds since the NTP epoch, seconds ahead of UTC from then on)
+            rule ((int,int,(int,int,int,int),(int,int,int,int))) - standard and daylight seconds ahead of UTC, daylight
+                savings start and end (month, week, weekday, seconds after midnight local time), the start and end are
+                None if there is no daylight savings
+        """
+        name = self.ALIASES.get(name, name).encode('utf-8')
+        try:
+            with open(self.file, 'rb') as f:
+                low, high = 0, self._header(f)
+                while low < high:
+                    middle = (low + high) // 2
+                    f.seek(8 + middle * 8)
+                    name_pos, record_pos = struct.unpack('<II', f.read(8))
+                    f.seek(name_pos)
+                    entry = f.read(f.read(1)[0])
+                    if entry == name:
+                        return self._record(f, record_pos)
+                    if entry < name:
+                        low = middle + 1
+                    else:
+                        high = middle
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _header(self, f):
+        """
+        Return the number of zones in the file (ValueError if it is not a time zone database)
+        """
+        magic, version, _, count = struct.unpack('<4sBBH', f.read(8))
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError('Not a time zone database: ' + self.file)
+        return count
+
+    def _record(self, f, pos):
+        """
+        Return the record (see load) at a position of the file
+        """
+        f.seek(pos)
+        initial, count = struct.unpack('<hH', f.read(4))
+        transitions = []
+        for _ in range(count):
+            t, offset = struct.unpack('<Ih', f.read(6))
+            transitions.append((t * 60, offset * 60))
+        std, dst, m1, w1, d1, t1, m2, w2, d2, t2 = struct.unpack('<hhBBBhBBBh', f.read(14))
+        if m1 == 0:
+            rule = (std * 60, std * 60, None, None)
+        else:
+            rule = (std * 60, dst * 60, (m1, w1, d1, t1 * 60), (m2, w2, d2, t2 * 60))
+        return (initial * 60, tuple(transitions), rule)
@@ -1,10 +1,32 @@
 import asyncio
+import binascii
 import network
 from config import Config
+from time import ticks_diff, ticks_ms, time
+from wificache import WIFICache
 
 class WIFI:
     """
     Class for connecting to a wifi network
+        The access point (BSSID, channel) and IP settings of the last connection are cached (see wificache.py): the next
+        connection joins that access point directly, reusing the IP address while the DHCP lease is fresh (fast path,
+        every other connection gets its IP settings from DHCP), and falls back to a scan for the strongest access point of
+        the network. The status is checked every poll_ms and the time to connect of each attempt is logged and kept in
+        the cache (wifi.dat) to compare the paths, the file is written when the access point or IP settings change
+
+    Properties:
+    wlan (WLAN) - station interface
+    cache (WIFICache) - access point and IP settings of the last connection, time of each attempt
+    poll_ms (int) - milliseconds between checks of the connection status
+    fast_timeout_ms (int) - milliseconds to wait for the cached access point before falling back to a scan
+    timeout_ms (int) - milliseconds to wait for a connection through a scan (including the scan)
+    lease_s (int) - seconds the cached IP address is reused (shorter than the DHCP lease time of most routers)
+    static (bool) - True if the current connection uses the cached IP settings (see lease_expired)
+
+    Methods:
+    connect(log) - async, connects to the configured network, returns Success or Failure
+    disconnect() - disconnects and deactivates the network interface
+    lease_expired() - True if the current connection uses the cached IP settings past lease_s (connect again for DHCP)
     """
 
     def __init__(self):
@@ -13,6 +35,14 @@ class WIFI:
         """
         # Setup the wlan object
         self.wlan = network.WLAN(network.STA_IF)
+
+        # Fast reconnect
+        self.cache = WIFICache()
+        self.poll_ms = 50
+        self.fast_timeout_ms = 5000
+        self.timeout_ms = 10_000
+        self.lease_s = 3600     # 1 hour
+        self.static = False
     
     def disconnect(self, print_debug=False):
         """
@@ -23,11 +53,20 @@ class WIFI:
         if self.wlan.isconnected():
             self.wlan.disconnect()
         self.wlan.active(False)
+        self.static = False
     
         # Debug
         if print_debug:
             print('Wifi Disconnected')
 
+    def lease_expired(self):
+        """
+        Return True if the current connection uses the cached IP settings and they are older than lease_s, the address may
+        be given to another device once its lease ends (disconnect and connect again to get the IP settings from DHCP)
+        """
+        saved = self.cache.saved
+        return self.static and (saved is None or not 0 <= time() - saved < self.lease_s)
+
     async def connect(self, log):
         """
         Connects to wifi and returns an indicator status
@@ -42,37 +81,122 @@ class WIFI:
             log.write('No WIFI configuration settings found')
             return 'Failure'
 
-        # Activate the network interface and connect to the wireless network
+        # Activate the network interface
         self.wlan.active(True)
-        self.wlan.connect(ssid=config.ssid, key=str(config.password))
-
+        key = str(config.password)
         log.write(f'Connecting to wifi network: {config.ssid}')
 
-        # Wait a max of 10 seconds for a connection
-        i = 10
-
-        while i > 0:
-            # Check if connected
-            if self.wlan.status() < 0 or self.wlan.status() >= 3:
-                break # Connected
-            i -= 1
+        # Fast path - the access point of the last connection, with its IP address while the lease is fresh (the clock
+        #   going back, e.g. the RTC reset by a restart, means the age of the lease is not known)
+        cache = self.cache
+        status = None
+        if cache.ssid == config.ssid and cache.bssid is not None:
+            static = cache.ifconfig is not None and cache.saved is not None and 0 <= time() - cache.saved < self.lease_s
+            if static:
+                self.wlan.ifconfig(tuple(cache.ifconfig))
+            status = await self._attempt(log, 'fast', ticks_ms(), config.ssid, key, cache.bssid, cache.channel,
+                                         self.fast_timeout_ms, static)
+            if status != 3:
+                self.wlan.disconnect()
 
-            await asyncio.sleep(1)
+        # Full path - scan for the strongest access point of the network (a hidden network is joined by name), the time
+        #   to connect includes the scan
+        if status != 3:
+            start = ticks_ms()
+            bssid = None
+            channel = None
+            rssi_best = None
+            for (ssid, ap_bssid, ap_channel, rssi, security, hidden) in self.wlan.scan():
+                if ssid.decode('utf-8') == config.ssid and (rssi_best is None or rssi > rssi_best):
+                    bssid = binascii.hexlify(ap_bssid).decode()
+                    channel = ap_channel
+                    rssi_best = rssi
+            path = 'ssid' if bssid is None else 'scan'
+            status = await self._attempt(log, path, start, config.ssid, key, bssid, channel, self.timeout_ms, False)
         
         # Determine final status to return
-        if self.wlan.status() != 3:
+        if status != 3:
             # Error attempting to connect - log the error
-            if self.wlan.status() == -1:
+            if status == -1:
                 log.write('Error connecting to wifi network: (-1) CYW43_LINK_FAIL - Connection failed')
-            elif self.wlan.status() == -2:
+            elif status == -2:
                 log.write('Error connecting to wifi network: (-2) CYW43_LINK_NONET - No matching SSID found (could be out of range, or down)')
-            elif self.wlan.status() == -3:
+            elif status == -3:
                 log.write('Error connecting to wifi network: (-3) CYW43_LINK_BADAUTH - Authenticatation failure')
             else:
-                log.write('Error connecting to wifi network: Error status code {}'.format(self.wlan.status()))
+                log.write('Error connecting to wifi network: Error status code {}'.format(status))
             
             return 'Failure'
         else:
             # Connected
             log.write('Successfully connected to wifi')
             return 'Success'
+
+    async def _attempt(self, log, path, start, ssid, key, bssid, channel, timeout_ms, static):
+        """
+        Connects to the network (to an access point if bssid is given), checks the status every poll_ms until connected,
+        an error or the timeout, then logs the time to connect and updates the cache (written if the access point or IP
+        settings changed)
+
+        log (Log) - Log object to write the time to connect
+        path (str) - fast, scan or ssid (see WIFICache.attempts)
+        start (int) - ticks_ms() at the start of the attempt
+        ssid (str) - network name
+        key (str) - network password
+        bssid (str) - MAC address of the access point (hex, None = any access point of the network)
+        channel (int) - channel of the access point (logged)
+        timeout_ms (int) - milliseconds from the start to wait for the connection
+        static (bool) - True if the cached IP settings are used (the IP settings are only cached when DHCP gave them)
+
+        return (int) - WLAN status (3 = connected, negative = error, 1-2 = timed out while connecting)
+        """
+        # IP settings from DHCP unless the cached settings are used (the interface keeps static settings set earlier)
+        if not static:
+            self._dhcp()
+        self.static = False
+        if bssid is None:
+            self.wlan.connect(ssid, key)
+        else:
+            self.wlan.connect(ssid, key, bssid=binascii.unhexlify(bssid))
+
+        while True:
+            status = self.wlan.status()
+            if status < 0 or status >= 3 or ticks_diff(ticks_ms(), start) >= timeout_ms:
+                break
+            await asyncio.sleep_ms(self.poll_ms)
+        ms = ticks_diff(ticks_ms(), start)
+
+        cache = self.cache
+        cache.add(path, ms, status)
+        changed = False
+        if status == 3:
+            self.static = static
+            changed = (ssid, bssid, channel) != (cache.ssid, cache.bssid, cache.channel)
+            cache.ssid = ssid
+            cache.bssid = bssid
+            cache.channel = channel
+            if not static:
+                ifconfig = list(self.wlan.ifconfig())
+                changed = changed or ifconfig != cache.ifconfig
+                cache.ifconfig = ifconfig
+                cache.saved = time()
+            ip = 'cached IP address' if static else 'DHCP'
+            log.write(f'Connected to wifi in {ms} ms ({path}: access point {bssid}, channel {channel}, {ip})')
+        else:
+            log.write(f'Wifi connection failed after {ms} ms ({path}: access point {bssid}, channel {channel}, status {status})')
+
+        # Write the cache only when the access point or IP settings change (limits flash writes, the attempts and lease
+        #   time in between are written with the next change)
+        if changed:
+            cache.write()
+        return status
+
+    def _dhcp(self):
+        """
+        Gets the IP settings from DHCP instead of static settings set earlier (firmware without ifconfig('dhcp') keeps the
+        static settings until it restarts)
+        """
+        try:
+            self.wlan.ifconfig('dhcp')
+        except (OSError, TypeError, ValueError):
+            pass
@@ -7,16 +7,22 @@ class WIFIAP:
     Configures wifi as an Access Point
     """
 
-    def __init__(self, event_config_exit):
+    def __init__(self, display_count, event_config_exit, event_calibrate=None):
         """
         Setup the AP network
 
+        display_count (int) - number of split-flap displays (shown on the calibration and health pages)
+
         event_config_exit (asyncio.Event) - Event for indicating to the program the configuration mode is exiting
+
+        event_calibrate (asyncio.Event) - Event for indicating to the program the user started the display calibration
         """
         self.ssid = 'WifiSetup'
         self.ap = network.WLAN(network.AP_IF)
         self.ap.config(ssid=self.ssid)
         self.event_config_exit = event_config_exit
+        self.event_calibrate = event_calibrate
+        self.display_count = display_count
     
     async def start_server(self, print_status=False):
         """
@@ -58,7 +64,7 @@ class WIFIAP:
         request_header = request_line.decode('utf-8').split(' ')
 
         # Initialize the response object
-        resp = Response()
+        resp = Response(self.display_count)
 
         if request_header[0] == 'GET':
             # Ignore remaining request header information
@@ -123,6 +129,10 @@ class WIFIAP:
             # Set the exit event
             self.event_config_exit.set()
 
+        if resp.calibrate and self.event_calibrate != None:
+            # Set the calibrate event
+            self.event_calibrate.set()
+
     
     def _http_header(self, status_code=200, content_length=None ):
         """
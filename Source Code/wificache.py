@@ -0,0 +1,97 @@
+import json
+
+class WIFICache:
+    """
+    Handles the Wi-Fi cache file: the access point and IP settings of the last successful connection, used to reconnect
+    without a scan and without waiting for DHCP (see WIFI.connect), and the time each connection attempt took (written
+    with the next change of the access point or IP settings)
+
+    Properties:
+
+    file (str) - name of the Wi-Fi cache file
+
+    size (int) - number of connection attempts kept
+
+    ssid (str) - network the access point belongs to (the cache is only used for the configured network)
+
+    bssid (str) - MAC address of the access point (hex, None = no connection yet)
+
+    channel (int) - channel of the access point
+
+    ifconfig ([str,str,str,str]) - IP address, subnet mask, gateway and DNS server given by DHCP
+
+    saved (int) - time.time() the IP settings were given (the IP address is reused while the lease is fresh)
+
+    attempts ([[str,int,int],...]) - [path, ms, status] of each connection attempt, oldest first
+        path - fast (cached access point), scan (access point found by a scan) or ssid (connect by network name)
+        ms - milliseconds from the start of the attempt to connected or giving up
+        status - WLAN status at the end of the attempt (3 = connected, negative = error)
+
+    Methods:
+
+    read() - Read values in from Wi-Fi cache file
+
+    write() - Write current values to Wi-Fi cache file
+
+    add(path, ms, status) - Add a connection attempt (the oldest is removed once there are size attempts)
+    """
+
+    def __init__(self, size=20):
+        """
+        Setup the Wi-Fi cache object
+
+        size (int) - number of connection attempts kept (default: 20)
+        """
+        self.file = "wifi.dat"
+        self.size = size
+        self.read()
+
+    def read(self):
+        """
+        Read in values from the Wi-Fi cache file. If file doesn't exist, there is no cached access point
+        """
+        self.ssid = None
+        self.bssid = None
+        self.channel = None
+        self.ifconfig = None
+        self.saved = None
+        self.attempts = []
+        try:
+            with open(self.file, 'r') as f:
+                settings = json.load(f)
+
+            self.ssid = settings.get('ssid', None)
+            self.bssid = settings.get('bssid', None)
+            self.channel = settings.get('channel', None)
+            self.ifconfig = settings.get('ifconfig', None)
+            self.saved = settings.get('saved', None)
+            self.attempts = settings.get('attempts', [])[-self.size:]
+        except (OSError, ValueError):
+            pass
+
+    def write(self):
+        """
+        Write values to the Wi-Fi cache file
+        """
+        settings = {
+            'ssid' : self.ssid,
+            'bssid' : self.bssid,
+            'channel' : self.channel,
+            'ifconfig' : self.ifconfig,
+            'saved' : self.saved,
+            'attempts' : self.attempts
+        }
+        with open(self.file, 'w') as f:
+            json.dump(settings, f)
+
+    def add(self, path, ms, status):
+        """
+        Add a connection attempt
+
+        path (str) - fast, scan or ssid
+        ms (int) - milliseconds the attempt took
+        status (int) - WLAN status at the end of the attempt
+        """
+        self.attempts.append([path, ms, status])
+        if len(self.attempts) > self.size:
+            self.attempts.pop(0)